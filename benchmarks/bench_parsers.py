@@ -0,0 +1,92 @@
+"""
+Benchmark HTML parsing backends on saved page snapshots.
+
+Compares the original full-tree BeautifulSoup parse with two find_all passes
+against every installed backend in src/html_parsers.py. Each measurement runs
+in a fresh process so peak RSS is not polluted by earlier runs.
+
+Usage:
+    python -m benchmarks.bench_parsers [snapshot.html ...] [--cards N] [--repeat N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.snapshots import feed_snapshot  # noqa: E402
+from src.html_parsers import available_backends, harvest_links  # noqa: E402
+
+def baseline_harvest(html):
+    """The original extract_urls_from_page parse: full tree plus two find_all passes."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    hrefs = []
+    for div in soup.find_all('div', class_="_3qn7"):
+        hrefs.extend(link.get('href') for link in div.find_all('a'))
+    hrefs.extend(link.get('href') for link in soup.find_all('a', target="_blank"))
+    return hrefs
+
+def _measure(backend, html, repeat, queue):
+    """Run one backend in this (fresh) process and report timings and peak RSS."""
+    timings = []
+    links = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hrefs = baseline_harvest(html) if backend == "baseline" else harvest_links(html, backend)
+        timings.append(time.perf_counter() - start)
+        links = len(hrefs)
+    # ru_maxrss is in kilobytes on Linux
+    queue.put((timings, links, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def run(html, backends, repeat):
+    """Benchmark each backend on a document.
+
+    Returns:
+        list: One dict per backend with "backend", "median_s", "links" and "peak_rss_mb"
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        queue = context.Queue()
+        process = context.Process(target=_measure, args=(backend, html, repeat, queue))
+        process.start()
+        timings, links, peak_rss = queue.get()
+        process.join()
+        results.append({
+            "backend": backend,
+            "median_s": statistics.median(timings),
+            "links": links,
+            "peak_rss_mb": peak_rss,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parsing backends.")
+    parser.add_argument("snapshots", nargs="*", help="saved page_source HTML files")
+    parser.add_argument("--cards", type=int, default=10000,
+                        help="cards in the synthetic feed used when no snapshot is given")
+    parser.add_argument("--repeat", type=int, default=3, help="parses per backend")
+    args = parser.parse_args()
+
+    documents = []
+    for path in args.snapshots:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            documents.append((path, f.read()))
+    if not documents:
+        documents.append((f"synthetic feed, {args.cards} cards", feed_snapshot(args.cards)))
+
+    backends = ["baseline"] + list(available_backends())
+    for name, html in documents:
+        print(f"\n{name} ({len(html) / 1e6:.1f} MB)")
+        print(f"{'backend':<12} {'median s':>10} {'links':>8} {'peak RSS MB':>12}")
+        for result in run(html, backends, args.repeat):
+            print(f"{result['backend']:<12} {result['median_s']:>10.3f} {result['links']:>8} {result['peak_rss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+WebDriver stand-in that replays a saved feed snapshot.
+
+Lets extract_urls_from_page run end to end without a browser: the page is
+"scrolled" by revealing the snapshot's cards in batches, in-browser harvests
+return the links of newly revealed cards and page_source returns the revealed
+part of the snapshot.
+"""
+
+import re
+from src.html_parsers import harvest_links
+
+# Opening tag of a card container in the generated snapshots
+_CARD_START = re.compile(r'<div class="x1dr75xp xh8yej3">')
+
+class _Element:
+    """Minimal WebElement returned by find_element()."""
+
+    def __init__(self, text=""):
+        self.text = text
+
+class ReplayDriver:
+    """Replays a feed snapshot through the calls extract_urls_from_page makes."""
+
+    def __init__(self, html, results_count=None, cards_per_scroll=100, links_per_card=2):
+        """Create the driver.
+
+        Args:
+            html: Feed snapshot HTML
+            results_count: Count shown in the results heading, defaults to the number of cards
+            cards_per_scroll: Cards revealed by each scroll
+            links_per_card: Harvested links per card, used to convert between links and cards
+        """
+        self.html = html
+        self.hrefs = harvest_links(html)
+        self.links_per_card = links_per_card
+        self.total_cards = max(1, len(self.hrefs) // links_per_card)
+        self.results_count = results_count or self.total_cards
+        self.cards_per_scroll = cards_per_scroll
+        self.loaded_cards = min(cards_per_scroll, self.total_cards)
+        self.harvested = 0
+        self.recorded = 0
+        starts = [match.start() for match in _CARD_START.finditer(html)]
+        self.cards = [html[start:end] for start, end in zip(starts, starts[1:] + [html.rfind("</div>") + 6])]
+        self.current_url = ""
+
+    def find_element(self, by, value):
+        if "results" in value:
+            return _Element(f"~{self.results_count:,} results")
+        return _Element()
+
+    def execute_script(self, script, *args):
+        if "fbAdHarvestSeen" in script:
+            end = self.loaded_cards * self.links_per_card
+            fresh = self.hrefs[self.harvested:end]
+            self.harvested = end
+            return {"hrefs": fresh, "pruned": 0, "seen": end}
+        if "data-ad-recorded" in script:
+            fresh = self.cards[self.recorded:self.loaded_cards]
+            self.recorded = max(self.recorded, self.loaded_cards)
+            return fresh
+        if "return 1" in script:
+            return 1
+        return [self.loaded_cards, self.loaded_cards * 400]
+
+    def execute_async_script(self, script, *args):
+        self.loaded_cards = min(self.loaded_cards + self.cards_per_scroll, self.total_cards)
+        return {"cards": self.loaded_cards, "height": self.loaded_cards * 400}
+
+    @property
+    def page_source(self):
+        return self.html
+
+    def get(self, url):
+        # A new page load starts again from the first batch of cards
+        self.current_url = url
+        self.loaded_cards = min(self.cards_per_scroll, self.total_cards)
+        self.harvested = 0
+        self.recorded = 0
+
+    def quit(self):
+        pass
@@ -0,0 +1,272 @@
+"""
+Offline benchmark harness for the Facebook Ad Scraper.
+
+Replays stored snapshots through extract_urls_from_page, process_href and
+parse_phone_from_html (and, with --selenium, through a real Chrome session
+against the local infinite-scroll server), times per-href against batched
+link processing on a synthetic 100k-anchor feed, then reports throughput,
+p50/p95 latency and peak memory. Results can be saved as a baseline and later runs
+diffed against it to catch regressions.
+
+Usage:
+    python -m benchmarks.run [--sizes small,10k] [--anchors N] [--save-baseline FILE] [--compare FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replay import ReplayDriver  # noqa: E402
+from benchmarks.snapshots import FEED_SIZES, ensure_snapshots, page_snapshots, synthetic_hrefs  # noqa: E402
+from src.config import SCRAPER_SETTINGS  # noqa: E402
+from src.html_parsers import harvest_links  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def measure(name, operation, inputs, items_per_input=1, repeat=3):
+    """Time an operation over inputs and measure its peak Python memory.
+
+    Args:
+        name: Benchmark name used in reports and baselines
+        operation: Callable taking one input
+        inputs: Sequence of inputs; each call is one latency sample
+        items_per_input: Items processed per call, used for throughput
+        repeat: Passes over inputs
+
+    Returns:
+        dict: Metrics with keys "name", "items", "seconds", "throughput",
+              "p50_ms", "p95_ms" and "peak_mem_mb"
+    """
+    latencies = []
+    # Silence the scraper's progress prints so they do not dominate timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for item in inputs:
+                call_start = time.perf_counter()
+                operation(item)
+                latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+
+        # Peak memory is measured on a separate pass, tracemalloc slows calls down
+        tracemalloc.start()
+        for item in inputs:
+            operation(item)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    items = len(inputs) * items_per_input * repeat
+    return {
+        "name": name,
+        "items": items,
+        "seconds": elapsed,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "peak_mem_mb": peak / 1e6,
+    }
+
+def offline_benchmarks(sizes, repeat):
+    """Run the browser-free benchmarks over the feed and page snapshots."""
+    from phone_extractor import parse_phone_from_html
+    from src.parallel_parse import parallel_harvest_pairs, parse_workers
+    from src.scraper_utils import extract_urls_from_page, process_href
+
+    results = []
+    for path in ensure_snapshots(sizes):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        label = os.path.splitext(os.path.basename(path))[0]
+        hrefs = harvest_links(html)
+
+        results.append(measure(f"harvest_links[{label}]", harvest_links, [html], len(hrefs), repeat))
+        results.append(measure(
+            f"process_href[{label}]",
+            lambda batch: [process_href(href, "bench", set()) for href in batch],
+            [hrefs[i:i + 1000] for i in range(0, len(hrefs), 1000)],
+            1000,
+            repeat,
+        ))
+        workers = max(2, parse_workers())
+        # Started once outside the timings, a crawl keeps its parse pool for the whole run
+        parallel_harvest_pairs(html, "bench", workers)
+        results.append(measure(f"parallel_harvest_pairs[{label},{workers}p]",
+                               lambda html: parallel_harvest_pairs(html, "bench", workers), [html], len(hrefs), repeat))
+        for mode in ("stream", "page_source"):
+            def extract(_, mode=mode):
+                previous = SCRAPER_SETTINGS["harvest_mode"]
+                SCRAPER_SETTINGS["harvest_mode"] = mode
+                try:
+                    extract_urls_from_page(ReplayDriver(html), "bench", set())
+                finally:
+                    SCRAPER_SETTINGS["harvest_mode"] = previous
+            results.append(measure(f"extract_urls_from_page[{label},{mode}]", extract, [None], len(hrefs), repeat))
+
+    pages = [html for _, html in page_snapshots()]
+    results.append(measure("parse_phone_from_html[pages]", lambda html: parse_phone_from_html(html, "bench"), pages, 1, repeat))
+    return results
+
+def link_benchmarks(anchors, repeat):
+    """Compare per-href and batched link processing on a synthetic feed of `anchors` hrefs.
+
+    The canonicalization cache is cleared before every call, so each pass pays
+    for its URL parsing like the first feed of a run does.
+    """
+    from src.scraper_utils import process_href, process_hrefs
+    from src.url_utils import canonicalize_url
+
+    hrefs = synthetic_hrefs(anchors)
+
+    def per_href(batch):
+        canonicalize_url.cache_clear()
+        pairs = set()
+        for href in batch:
+            process_href(href, "bench", pairs)
+
+    def batched(batch):
+        canonicalize_url.cache_clear()
+        process_hrefs(batch, "bench", set())
+
+    label = f"synthetic_{anchors // 1000}k" if anchors >= 1000 else f"synthetic_{anchors}"
+    return [
+        measure(f"process_href[{label}]", per_href, [hrefs], anchors, repeat),
+        measure(f"process_hrefs[{label}]", batched, [hrefs], anchors, repeat),
+    ]
+
+def selenium_benchmarks(cards, repeat):
+    """Time the real Selenium path against the local infinite-scroll server."""
+    from benchmarks.server import start_server
+    from phone_extractor import extract_phone_from_url, setup_phone_driver
+    from src.browser import quit_driver, setup_driver
+    from src.rate_limiter import RATE_LIMITER
+    from src.scraper_utils import extract_urls_from_page
+
+    # The local server needs no pacing, time the browser rather than the limiter
+    RATE_LIMITER.settings = dict(RATE_LIMITER.settings, rate=1e6, max_rate=1e6, burst=1e6)
+    server, base_url = start_server()
+    results = []
+    driver = setup_driver()
+    try:
+        def crawl(url):
+            driver.get(url)
+            extract_urls_from_page(driver, "bench", set())
+        results.append(measure(f"selenium.extract_urls_from_page[{cards}]", crawl,
+                               [f"{base_url}/feed?cards={cards}&batch=100"], cards, repeat))
+    finally:
+        quit_driver(driver)
+
+    # Search-JSON discovery against the mock async search endpoint
+    driver = setup_driver(capture_network=True)
+    try:
+        for mode in ("network", "replay"):
+            def crawl(url, mode=mode):
+                previous = SCRAPER_SETTINGS["harvest_mode"]
+                SCRAPER_SETTINGS["harvest_mode"] = mode
+                try:
+                    driver.get(url)
+                    extract_urls_from_page(driver, "bench", set())
+                finally:
+                    SCRAPER_SETTINGS["harvest_mode"] = previous
+            results.append(measure(f"selenium.extract_urls_from_page[{cards},{mode}]", crawl,
+                                   [f"{base_url}/feed?cards={cards}&batch=100&source=api"], cards, repeat))
+    finally:
+        quit_driver(driver)
+
+    driver = setup_phone_driver()
+    try:
+        urls = [f"{base_url}/page/{i}?layout={('span', 'json', 'none')[i % 3]}" for i in range(30)]
+        results.append(measure("selenium.extract_phone_from_url[pages]",
+                               lambda url: extract_phone_from_url(driver, url), urls, 1, repeat))
+    finally:
+        quit_driver(driver)
+        server.shutdown()
+    return results
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<58} {'throughput':>11} {'p95':>9} {'memory':>9}")
+    for result in results:
+        base = baseline.get(result["name"])
+        if not base:
+            print(f"{result['name']:<58} {'(new)':>11}")
+            continue
+        throughput = _change(result["throughput"], base["throughput"])
+        p95 = _change(result["p95_ms"], base["p95_ms"])
+        memory = _change(result["peak_mem_mb"], base["peak_mem_mb"])
+        regressed = throughput < -threshold or p95 > threshold or memory > threshold
+        if regressed:
+            regressions.append(result["name"])
+        print(f"{result['name']:<58} {throughput:>+10.1f}% {p95:>+8.1f}% {memory:>+8.1f}%"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def _change(current, base):
+    """Return the percentage change from base to current."""
+    return 100.0 * (current - base) / base if base else 0.0
+
+def print_results(results):
+    """Print a results table."""
+    print(f"\n{'benchmark':<58} {'items/s':>12} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>8}")
+    for result in results:
+        print(f"{result['name']:<58} {result['throughput']:>12.0f} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['peak_mem_mb']:>8.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline scraper benchmarks.")
+    parser.add_argument("--sizes", default="small,10k",
+                        help=f"comma separated feed sizes from {sorted(FEED_SIZES)} (default: small,10k)")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per benchmark")
+    parser.add_argument("--anchors", type=int, default=100000,
+                        help="hrefs in the synthetic link processing benchmark (default: 100000, 0 skips it)")
+    parser.add_argument("--selenium", action="store_true",
+                        help="also time the real Chrome path against the local infinite-scroll server")
+    parser.add_argument("--selenium-cards", type=int, default=2000, help="feed size served to Chrome")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="FILE",
+                        help=f"write results as a baseline (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="FILE",
+                        help="diff results against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change counted as a regression (default: 10)")
+    args = parser.parse_args(argv)
+
+    results = offline_benchmarks([size.strip() for size in args.sizes.split(",") if size.strip()], args.repeat)
+    if args.anchors:
+        results += link_benchmarks(args.anchors, args.repeat)
+    if args.selenium:
+        results += selenium_benchmarks(args.selenium_cards, 1)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({result["name"]: result for result in results}, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold}%")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
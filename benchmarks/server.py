@@ -0,0 +1,150 @@
+"""
+Local static server emulating the Ad Library's infinite scroll.
+
+Routes:
+    /feed?cards=N&batch=B&layout=L   results page that appends B cards each time it is scrolled to the bottom
+    /cards?offset=O&count=C&layout=L HTML fragment with the next cards
+    /feed?cards=N&batch=B&source=api  same feed, loading further ads from the JSON search endpoint
+    /ads/library/async/search_ads/?forward_cursor=C&count=B&cards=N
+                                     paginated search JSON, like the Ad Library's (GET or POST)
+    /page/<i>?layout=L               Facebook page snapshot (see snapshots.PAGE_LAYOUTS)
+
+Usage:
+    python -m benchmarks.server [--port 8000]
+"""
+
+import argparse
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.snapshots import feed_cards, feed_snapshot, page_snapshot, parse_search_cursor, search_payload  # noqa: E402
+
+# Appends the next batch of cards once the page is scrolled to the bottom,
+# the same way the Ad Library grows its feed
+INFINITE_SCROLL_JS = """
+<script>
+(function () {
+    const total = %(total)d, batch = %(batch)d, layout = "%(layout)s";
+    let loaded = %(loaded)d, loading = false;
+    window.addEventListener("scroll", function () {
+        if (loading || loaded >= total) return;
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - 50) return;
+        loading = true;
+        const count = Math.min(batch, total - loaded);
+        fetch("/cards?offset=" + loaded + "&count=" + count + "&layout=" + layout)
+            .then((response) => response.text())
+            .then((html) => {
+                document.getElementById("feed").insertAdjacentHTML("beforeend", html);
+                loaded += count;
+                loading = false;
+            });
+    });
+})();
+</script>
+"""
+
+# Same, but fetches the next ads as search JSON and renders them, so the
+# network harvester has responses to read
+SEARCH_SCROLL_JS = """
+<script>
+(function () {
+    const total = %(total)d, batch = %(batch)d;
+    let cursor = "%(cursor)s", loading = false;
+    window.addEventListener("scroll", function () {
+        if (loading || !cursor) return;
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - 50) return;
+        loading = true;
+        fetch("/ads/library/async/search_ads/?count=" + batch + "&cards=" + total,
+              {method: "POST", headers: {"Content-Type": "application/x-www-form-urlencoded"},
+               body: "forward_cursor=" + encodeURIComponent(cursor) + "&__a=1"})
+            .then((response) => response.text())
+            .then((text) => {
+                const payload = JSON.parse(text.replace("for (;;);", "")).payload;
+                const html = payload.results.map((group) => group.map((ad) =>
+                    '<div class="x1dr75xp"><div class="_3qn7"><a target="_blank" href="' +
+                    ad.snapshot.page_profile_uri + '">' + ad.pageName + '</a></div></div>').join("")).join("");
+                document.getElementById("feed").insertAdjacentHTML("beforeend", html);
+                cursor = payload.forwardCursor;
+                loading = false;
+            });
+    });
+})();
+</script>
+"""
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    """Serves generated feed and page snapshots."""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        layout = query.get("layout", "cards")
+        if parts.path == "/feed":
+            total = int(query.get("cards", 1000))
+            batch = int(query.get("batch", 30))
+            if query.get("source") == "api":
+                script = SEARCH_SCROLL_JS % {"total": total, "batch": batch, "cursor": f"AQHR{batch:08d}" if batch < total else ""}
+            else:
+                script = INFINITE_SCROLL_JS % {"total": total, "batch": batch, "layout": layout, "loaded": batch}
+            # The heading reports the full result count, the body only holds the first batch
+            body = feed_snapshot(min(batch, total), layout, script).replace(f"~{min(batch, total):,} results", f"~{total:,} results")
+        elif parts.path == "/cards":
+            body = feed_cards(int(query.get("offset", 0)), int(query.get("count", 30)), layout)
+        elif parts.path == "/ads/library/async/search_ads/":
+            self._send(search_payload(parse_search_cursor(query.get("forward_cursor")), int(query.get("count", 30)),
+                                      int(query.get("cards", 1000))), "application/x-javascript")
+            return
+        elif parts.path.startswith("/page/"):
+            body = page_snapshot(int(parts.path.rsplit("/", 1)[-1] or 0), query.get("layout", "span"))
+        else:
+            self.send_error(404)
+            return
+        self._send(body)
+
+    def do_POST(self):
+        # Form fields of a POST count as query parameters, like the real endpoint accepts both
+        length = int(self.headers.get("Content-Length") or 0)
+        form = self.rfile.read(length).decode("utf-8") if length else ""
+        if form:
+            self.path += ("&" if "?" in self.path else "?") + form
+        self.do_GET()
+
+    def _send(self, body, content_type="text/html"):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port=0):
+    """Start the snapshot server on a background thread.
+
+    Args:
+        port: Port to listen on, 0 picks a free one
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() to stop it
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), SnapshotHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Ad Library snapshots with infinite scroll.")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    server, base_url = start_server(args.port)
+    print(f"Serving snapshots at {base_url}/feed?cards=10000 (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,156 @@
+"""
+Ad Library feed and Facebook page snapshots for offline benchmarks.
+
+Snapshots are generated deterministically so every machine benchmarks the same
+documents. Real pages saved from a browser (driver.page_source) can be dropped
+into benchmarks/snapshots/recorded/ as feed_*.html or page_*.html and are
+picked up alongside the generated ones.
+"""
+
+import glob
+import json
+import os
+from src.phone_numbers import PHONE_OUTER_DIV_CLASS, PHONE_SPAN_CLASS
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+RECORDED_DIR = os.path.join(SNAPSHOT_DIR, "recorded")
+
+FEED_SIZES = {"small": 200, "10k": 10000, "50k": 50000}
+FEED_LAYOUTS = ("cards", "blank_only")
+PAGE_LAYOUTS = ("span", "json", "none")
+
+def feed_cards(start, count, layout="cards"):
+    """Return the HTML of `count` ad cards starting at index `start`.
+
+    Args:
+        start: Index of the first card
+        count: Number of cards
+        layout: "cards" wraps the page link in a div._3qn7 card, "blank_only"
+                only marks links with target="_blank" (newer Ad Library markup)
+    """
+    card_class = "_3qn7 _61-0 _2fyi _3qng" if layout == "cards" else "x1dr75xp"
+    parts = []
+    for i in range(start, start + count):
+        # Every third advertiser repeats so deduplication has work to do
+        page = i - i % 3
+        parts.append(
+            f'<div class="x1dr75xp xh8yej3"><div class="{card_class}">'
+            f'<a href="https://www.facebook.com/page{page}/" target="_blank" class="xt0psk2">Page {page}</a>'
+            f'<span class="x8t9es0">Library ID: {1000000 + i}</span>'
+            f'<span>Started running on {1 + i % 28} Jan 2025</span><span>{"Active" if i % 4 else "Inactive"}</span></div>'
+            f'<div class="x6s0dn4"><a href="https://l.facebook.com/l.php?u=https%3A%2F%2Fm.facebook.com%2Fpage{page}%2F&amp;h=AT{i}"'
+            f' target="_blank">Shop now</a><img src="/img/{i}.jpg"><p>Ad copy for card {i}, '
+            f'call us today for the best prices in Dhaka.</p></div></div>'
+        )
+    return "".join(parts)
+
+def synthetic_hrefs(count, pages=None):
+    """Return `count` feed href values as harvested from a long feed, in feed order.
+
+    Like real feeds, each advertiser shows up on several cards and is linked in
+    several forms: a clean page link, a mobile link with tracking parameters and a
+    link-shim redirect. Some hrefs are outbound shop links or missing.
+
+    Args:
+        count: Number of hrefs
+        pages: Distinct advertiser pages, defaults to count // 6
+    """
+    pages = pages or max(1, count // 6)
+    hrefs = []
+    for i in range(count):
+        page = (i * 7919) % pages
+        variant = i % 5
+        if variant == 0:
+            hrefs.append(f"https://www.facebook.com/page{page}")
+        elif variant == 1:
+            hrefs.append(f"https://m.facebook.com/page{page}/?ref=ads&fbclid=IwAR{page}")
+        elif variant == 2:
+            hrefs.append(f"https://l.facebook.com/l.php?u=https%3A%2F%2Fwww.facebook.com%2Fpage{page}%2F&h=AT{page}")
+        elif variant == 3:
+            hrefs.append(f"https://shop{page % 50}.example.com/item/{page}?utm_source=facebook")
+        else:
+            hrefs.append(None if page % 2 else f"https://www.facebook.com/page{page}/")
+    return hrefs
+
+def search_payload(offset, count, total):
+    """Return an Ad Library async search response holding ads [offset, offset + count).
+
+    The ads advertise the same pages as feed_cards() and the response is
+    paginated with an opaque forwardCursor, like the real endpoint.
+    """
+    end = min(offset + count, total)
+    results = []
+    for i in range(offset, end):
+        page = i - i % 3
+        results.append([{
+            "adArchiveID": str(1000000 + i),
+            "pageID": str(100000 + page),
+            "pageName": f"Page {page}",
+            "isActive": bool(i % 4),
+            "snapshot": {"page_profile_uri": f"https://www.facebook.com/page{page}/", "page_name": f"Page {page}",
+                         "link_url": f"https://l.facebook.com/l.php?u=https%3A%2F%2Fm.facebook.com%2Fpage{page}%2F"},
+        }])
+    payload = {"results": results, "totalCount": total, "isResultComplete": end >= total,
+               "forwardCursor": f"AQHR{end:08d}" if end < total else None}
+    return "for (;;);" + json.dumps({"__ar": 1, "payload": payload})
+
+def parse_search_cursor(cursor):
+    """Return the result offset encoded in a search_payload() cursor."""
+    return int(cursor[4:]) if cursor else 0
+
+def feed_snapshot(cards, layout="cards", script=""):
+    """Return a full Ad Library results page holding `cards` ad cards."""
+    return (
+        '<html><head><title>Ad Library</title></head><body>'
+        '<a href="https://www.facebook.com/ads/library/">Ad Library</a>'
+        f'<div role="heading">~{cards:,} results</div><div id="feed">{feed_cards(0, cards, layout)}</div>'
+        f'{script}</body></html>'
+    )
+
+def page_snapshot(index, layout="span"):
+    """Return a Facebook page snapshot whose phone number is found by `layout`.
+
+    Args:
+        index: Page index, used to vary the number
+        layout: "span" puts the number in the atomic-class span, "json" in an
+                embedded JSON blob and "none" omits it
+    """
+    number = f"+880 17{index % 100:02d}-{index % 1000000:06d}"
+    filler = "".join(f'<div class="x1n2onr6"><span>Post {i}</span></div>' for i in range(300))
+    if layout == "span":
+        contact = f'<div class="{PHONE_OUTER_DIV_CLASS}"><div><span class="{PHONE_SPAN_CLASS}">{number}</span></div></div>'
+    elif layout == "json":
+        contact = f'<script type="application/json">{{"page":{{"phone":"{number}"}}}}</script>'
+    else:
+        contact = ""
+    return f'<html><head><title>Page {index}</title></head><body>{filler}{contact}</body></html>'
+
+def ensure_snapshots(sizes=None, directory=SNAPSHOT_DIR):
+    """Write the generated feed snapshots to disk if they are missing.
+
+    Args:
+        sizes: Names from FEED_SIZES to generate, defaults to all of them
+        directory: Output directory
+
+    Returns:
+        list: Paths of the feed snapshots, including recorded ones
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size in sizes or FEED_SIZES:
+        for layout in FEED_LAYOUTS:
+            path = os.path.join(directory, f"feed_{size}_{layout}.html")
+            if not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(feed_snapshot(FEED_SIZES[size], layout))
+            paths.append(path)
+    return paths + sorted(glob.glob(os.path.join(RECORDED_DIR, "feed_*.html")))
+
+def page_snapshots(count=30):
+    """Return (name, html) pairs of page snapshots, cycling through PAGE_LAYOUTS, plus recorded pages."""
+    pages = [(f"page_{i}_{PAGE_LAYOUTS[i % len(PAGE_LAYOUTS)]}", page_snapshot(i, PAGE_LAYOUTS[i % len(PAGE_LAYOUTS)]))
+             for i in range(count)]
+    for path in sorted(glob.glob(os.path.join(RECORDED_DIR, "page_*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
@@ -0,0 +1,83 @@
+"""
+Single command-line entry point for the Facebook Ad Scraper.
+
+Settings from src/config.py can be overridden by a TOML or YAML config file
+and by --set options, without editing code. The overrides are applied
+before the command's module is imported, and each command imports only what
+it needs: merge, reparse and config never load Selenium, so they start in
+milliseconds and parameter sweeps can be scripted around any command.
+
+Usage:
+    python cli.py [--config FILE] [--set NAME.KEY=VALUE ...] COMMAND [ARGS...]
+
+Commands:
+    discover   crawl the Ad Library for Facebook page URLs (main.py)
+    extract    extract phone numbers from page URLs (phone_extractor.py)
+    pipeline   discover and extract in one streaming run (pipeline.py)
+    merge      merge output files into one sorted, deduplicated file (main.py --merge)
+    reparse    re-run the extractors over cached snapshots (reparse.py)
+    bench      run the offline benchmarks (benchmarks/run.py)
+    config     print the effective settings and exit
+
+ARGS are passed on to the command, e.g. `python cli.py discover --help`.
+
+Example:
+    python cli.py --config scraper.toml --set scraper.pool_size=2 --set categories=cloth,Fashion discover --resume
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+from src import config
+
+# Command -> (module, function taking argv, arguments prepended to ARGS, help)
+COMMANDS = {
+    "discover": ("main", "run_cli", [], "crawl the Ad Library for Facebook page URLs"),
+    "extract": ("phone_extractor", "run_cli", [], "extract phone numbers from page URLs"),
+    "pipeline": ("pipeline", "run_cli", [], "discover and extract in one streaming run"),
+    "merge": ("main", "run_cli", ["--merge"], "merge output files into one sorted, deduplicated file"),
+    "reparse": ("reparse", "run_cli", [], "re-run the extractors over cached snapshots"),
+    "bench": ("benchmarks.run", "main", [], "run the offline benchmarks"),
+    "config": (None, None, [], "print the effective settings and exit"),
+}
+
+def effective_settings():
+    """Return every setting of src/config.py with its current value."""
+    return {name: value for name, value in vars(config).items()
+            if name.isupper() and not name.startswith("_") and not callable(value)}
+
+def run(argv=None):
+    """Apply the config file and overrides, then run the command and return its exit code."""
+    parser = argparse.ArgumentParser(
+        description="Facebook Ad Scraper: "
+                    + "; ".join(f"{name}: {entry[3]}" for name, entry in COMMANDS.items()),
+        usage="%(prog)s [--config FILE] [--set NAME.KEY=VALUE ...] COMMAND [ARGS...]")
+    parser.add_argument("--config", default=os.environ.get("SCRAPER_CONFIG"),
+                        help="TOML (.toml) or YAML (.yaml, .yml) settings file (default: $SCRAPER_CONFIG)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME.KEY=VALUE", dest="overrides",
+                        help="override a setting after the config file, e.g. scraper.pool_size=2 or "
+                             "categories=cloth,Fashion; repeatable")
+    parser.add_argument("command", choices=sorted(COMMANDS), help="command to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed on to the command")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.config:
+            config.apply_settings(config.load_config(args.config))
+        for override in args.overrides:
+            config.apply_settings(config.parse_override(override))
+    except (OSError, ImportError, TypeError, ValueError) as e:
+        parser.error(str(e))
+
+    module_name, function_name, prefix, _ = COMMANDS[args.command]
+    if module_name is None:
+        print(json.dumps(effective_settings(), indent=2, default=str))
+        return 0
+    # Imported only now, so the command's module sees the overridden settings
+    command = getattr(importlib.import_module(module_name), function_name)
+    return command(prefix + args.args) or 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -2,61 +2,382 @@
 Main module for the Facebook Ad Scraper.
 """
 
+import argparse
+import logging
+import os
+import threading
 import time
-from src.config import CATEGORIES, BASE_URL, SCRAPER_SETTINGS
-from src.browser import setup_driver
-from src.scraper_utils import extract_urls_from_page
-from src.data_handler import save_to_csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+from src.config import (
+    SCRAPER_SETTINGS, CHECKPOINT_FILE, LOG_LEVEL, MEMORY_SETTINGS, OUTPUT_DIR, OUTPUT_SETTINGS, RECORD_SETTINGS,
+    applied_settings, apply_settings,
+)
+from src.ad_records import AdRecordStore
+from src.checkpoint import CheckpointStore
+from src.memory_guard import MemoryGuard
+from src.metrics import METRICS, default_metrics_path
+from src.output_formats import FORMATS, format_extension
+from src.rate_limiter import RATE_LIMITER, is_throttle_url, jittered_backoff
+from src.shards import Shard, estimate_costs, expand_shards, parse_shard_slice, schedule_shards, slice_shards
+from src.url_index import UrlIndex
+from src.watchdog import run_self_healing
+from src.data_handler import PairsOutput, merge_outputs
 
-def main():
-    """Main function to run the Facebook Ad Scraper."""
+def scrape_category(pool, category, unique_category_url_pairs, pairs_lock, checkpoint=None, on_pairs=None):
+    """Scrape a single category in the default country, status and media type.
+
+    See scrape_shard() for the arguments.
+
+    Returns:
+        bool: True if the category was processed, False if every attempt failed
+    """
+    return scrape_shard(pool, Shard.for_category(category), unique_category_url_pairs, pairs_lock,
+                        checkpoint, on_pairs)["ok"]
+
+def scrape_shard(pool, shard, unique_category_url_pairs, pairs_lock, checkpoint=None, on_pairs=None, on_records=None):
+    """Scrape a single shard using a driver checked out from the pool.
+
+    Args:
+        pool: DriverPool to borrow a driver from
+        shard: The Shard being processed
+        unique_category_url_pairs: Shared set of (category, URL) pairs
+        pairs_lock: Lock guarding unique_category_url_pairs
+        checkpoint: Optional CheckpointStore that harvested pairs are flushed to
+        on_pairs: Optional callable invoked with every batch of newly harvested pairs,
+            from the scraping thread, while the feed is still being scrolled
+        on_records: Optional callable invoked with lists of AdRecord objects read from the feed's cards
+
+    Returns:
+        dict: "key", "ok", "results" (count shown in the results heading, or None),
+              "pairs", "seconds" and, when MEMORY_SETTINGS["enabled"], the memory
+              peaks "peak_browser_mb" and "peak_python_mb" and the tab and driver "recycles".
+              A feed that cannot be finished under the memory limit fails the shard
+    """
+    # Selenium is only imported once a crawl starts, so --merge and --list-shards start instantly
+    from selenium.common.exceptions import TimeoutException
+    from src.scraper_utils import extract_urls_from_page
+
+    category = shard.category
+    label = shard.key
+    print(f"\nProcessing shard: {label}")
+    url = shard.url
+    start = time.monotonic()
+    outcome = {"key": label, "ok": False, "results": None, "pairs": 0, "seconds": 0.0}
+    # Long feeds are scrolled in tabs that are recycled before they exhaust the runner's memory
+    memory_guard = MemoryGuard(label) if MEMORY_SETTINGS["enabled"] else None
+
+    # Try to load the page with retries, backing off with jitter between attempts
+    max_retries = SCRAPER_SETTINGS["max_retries"]
+    if checkpoint:
+        checkpoint.mark_started(label)
+
+    def on_progress(pairs):
+        if checkpoint:
+            checkpoint.record_pairs(label, pairs)
+        if on_pairs:
+            on_pairs(pairs)
+    for attempt in range(max_retries):
+        # Pairs this shard checkpointed in an interrupted run or a failed attempt are kept;
+        # sibling shards of the category restore their own
+        category_pairs = checkpoint.load_pairs(label) if checkpoint else set()
+        restored = len(category_pairs)
+
+        def crawl(driver):
+            # Wait for the shared per-domain limiter instead of sleeping a fixed delay
+            RATE_LIMITER.acquire(url)
+            print(f"[{label}] Attempt {attempt+1}/{max_retries} to load URL: {url}")
+            with METRICS.timer("page_load", category=label):
+                driver.get(url)
+            if is_throttle_url(driver.current_url):
+                RATE_LIMITER.penalize(url, "checkpoint")
+                raise RuntimeError(f"Redirected to {driver.current_url}")
+
+            # Extract URLs from the loaded page into a shard-local set; a driver restarted
+            # after a crash keeps filling it, so links harvested before the crash are not reported twice
+            return extract_urls_from_page(driver, category, category_pairs, on_progress=on_progress,
+                                          memory_guard=memory_guard, on_records=on_records)
+
+        try:
+            outcome["results"] = run_self_healing(pool, crawl, label)
+
+            if len(category_pairs) > restored:
+                RATE_LIMITER.success(url)
+            else:
+                RATE_LIMITER.penalize(url, "empty")
+
+            # Merge into the shared set only once the shard succeeded
+            with pairs_lock:
+                unique_category_url_pairs.update(category_pairs)
+            if checkpoint:
+                checkpoint.mark_done(label)
+            METRICS.incr("shards_done")
+            print(f"[{label}] Collected {len(category_pairs)} (category, URL) pairs")
+            outcome.update(ok=True, pairs=len(category_pairs), seconds=time.monotonic() - start)
+            _report_memory(label, memory_guard, outcome)
+            return outcome
+
+        except TimeoutException as e:
+            RATE_LIMITER.penalize(url, "timeout")
+            print(f"[{label}] Timed out on attempt {attempt+1}: {e.msg}")
+        except Exception as e:
+            print(f"[{label}] Error on attempt {attempt+1}: {e}")
+        if attempt < max_retries - 1:
+            delay = jittered_backoff(attempt, SCRAPER_SETTINGS["retry_delay"], SCRAPER_SETTINGS["retry_backoff"])
+            print(f"[{label}] Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+
+    if checkpoint:
+        checkpoint.mark_failed(label)
+    METRICS.incr("shards_failed")
+    print(f"Failed to process shard '{label}' after {max_retries} attempts")
+    outcome["seconds"] = time.monotonic() - start
+    _report_memory(label, memory_guard, outcome)
+    return outcome
+
+def _report_memory(label, memory_guard, outcome):
+    """Add the shard's memory peaks to its outcome and the run metrics."""
+    if memory_guard is None:
+        return
+    outcome.update(memory_guard.report())
+    print(f"[{label}] Peak memory: browser {outcome['peak_browser_mb']:.0f} MB, "
+          f"python {outcome['peak_python_mb']:.0f} MB, {outcome['recycles']} recycles")
+
+def crawl_shards_threaded(shards, unique_category_url_pairs, checkpoint, on_pairs=None, on_records=None):
+    """Crawl shards on a thread pool sharing one DriverPool.
+
+    Args:
+        on_pairs: Optional callable receiving every batch of harvested pairs as it is found
+        on_records: Optional callable receiving the ad records read from the feeds
+
+    Returns:
+        list: scrape_shard() outcomes, in completion order
+    """
+    from src.driver_pool import DriverPool
+    pairs_lock = threading.Lock()
+    outcomes = []
+    with DriverPool() as pool:
+        print(f"Crawling {len(shards)} shards with up to {pool.size} drivers")
+        # Page loads are paced by the shared rate limiter, so workers move straight on to their next shard
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = {executor.submit(scrape_shard, pool, shard, unique_category_url_pairs, pairs_lock,
+                                       checkpoint, on_pairs, on_records): shard
+                       for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    print(f"Worker for shard '{futures[future].key}' crashed: {e}")
+    return outcomes
+
+# Driver pool and checkpoint of a crawl worker process, set up by _init_worker_process
+_worker = {}
+
+def _init_worker_process(checkpoint_file, settings=None):
+    """Give a crawl worker process its own driver and checkpoint connection."""
+    from src.driver_pool import DriverPool
+    # Settings changed by a config file or on the command line are not inherited by spawned processes
+    apply_settings(settings or {})
+    # A forked worker starts with a copy of the parent's metrics, which the parent already has
+    METRICS.reset()
+    _worker["pool"] = DriverPool(size=1)
+    _worker["checkpoint"] = CheckpointStore(checkpoint_file)
+    _worker["lock"] = threading.Lock()
+    # multiprocessing runs finalizers, not atexit handlers, when a worker exits
+    Finalize(None, _worker["pool"].close, exitpriority=10)
+    Finalize(None, _worker["checkpoint"].close, exitpriority=5)
+
+def _scrape_in_worker_process(shard):
+    """Scrape one shard in a worker process and return (outcome, pairs, ad records, metrics).
+
+    The metrics are a METRICS.drain() snapshot of what the worker recorded for the shard.
+    """
+    pairs = set()
+    records = []
+    outcome = scrape_shard(_worker["pool"], shard, pairs, _worker["lock"], _worker["checkpoint"],
+                           on_records=records.extend if RECORD_SETTINGS["enabled"] else None)
+    return outcome, pairs, records, METRICS.drain()
+
+def crawl_shards_in_processes(shards, unique_category_url_pairs, checkpoint_file, processes, on_pairs=None,
+                              on_records=None):
+    """Crawl shards across worker processes, one Chrome instance each.
+
+    Shards are submitted in schedule order, so the most expensive ones start
+    first and the rest are picked up by whichever process frees up. The
+    timers, counters and gauges each worker records for a shard are merged
+    into this process's METRICS, so the run summary covers every process;
+    those of a worker that crashed are lost.
+
+    Args:
+        on_pairs: Optional callable receiving the pairs of each shard as it completes
+        on_records: Optional callable receiving the ad records of each shard as it completes
+
+    Returns:
+        list: scrape_shard() outcomes, in completion order
+    """
+    outcomes = []
+    print(f"Crawling {len(shards)} shards in {processes} worker processes")
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker_process,
+                             initargs=(checkpoint_file, applied_settings())) as executor:
+        futures = {executor.submit(_scrape_in_worker_process, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            try:
+                outcome, pairs, records, metrics = future.result()
+            except Exception as e:
+                print(f"Worker for shard '{futures[future].key}' crashed: {e}")
+                continue
+            METRICS.merge(metrics)
+            unique_category_url_pairs.update(pairs)
+            if on_pairs:
+                on_pairs(pairs)
+            if on_records and records:
+                on_records(records)
+            outcomes.append(outcome)
+    return outcomes
+
+def print_shard_status(shards, costs, checkpoint, outcomes=()):
+    """Print each shard's estimated cost, status, harvested pair count and, for shards
+    crawled in this run, peak browser memory."""
+    progress = checkpoint.progress()
+    peaks = {outcome["key"]: outcome.get("peak_browser_mb") for outcome in outcomes}
+    print(f"\n{'shard':<48} {'est. results':>12} {'status':>12} {'pairs':>7} {'peak MB':>8}")
+    for shard in shards:
+        status, harvested = progress.get(shard.key, ("pending", 0))
+        peak = f"{peaks[shard.key]:.0f}" if peaks.get(shard.key) else "-"
+        print(f"{shard.key:<48} {costs.get(shard.key, 0):>12,.0f} {status:>12} {harvested:>7} {peak:>8}")
+
+def main(resume=False, checkpoint_file=CHECKPOINT_FILE, metrics_file=None, trace_file=None, shard_slice=None,
+         processes=None, list_only=False, output_format=None):
+    """Main function to run the Facebook Ad Scraper.
+
+    Args:
+        resume: Continue the run recorded in the checkpoint instead of starting over
+        checkpoint_file: Path of the checkpoint database
+        metrics_file: Run summary path (.json or .prom), defaults to a timestamped JSON file in metrics/
+        trace_file: Optional JSONL file receiving every timed event
+        shard_slice: Optional (i, n) tuple; only crawl slice i of n cost-balanced slices
+        processes: Crawl in this many worker processes instead of threads
+        list_only: Print the shard schedule and status without crawling
+        output_format: "csv", "csv.gz" or "parquet", defaults to OUTPUT_SETTINGS["format"]
+    """
     # Set to store unique (category, Facebook page URL) tuples
     unique_category_url_pairs = set()
-    driver = None
-    
+    checkpoint = None
+    ad_records = AdRecordStore() if RECORD_SETTINGS["enabled"] else None
+    on_records = ad_records.add if ad_records is not None else None
+
+    METRICS.reset()
+    if trace_file:
+        METRICS.start_trace(trace_file)
+
     try:
         print("Starting Facebook Ad Scraper...")
-        driver = setup_driver()
-        
-        # Iterate through each category
-        for category in CATEGORIES:
-            print(f"\nProcessing category: {category}")
-            # Construct the URL for the current category
-            url = BASE_URL.format(CATEGORY=category)
-            
-            # Try to load the page with retries
-            max_retries = SCRAPER_SETTINGS["max_retries"]
-            for attempt in range(max_retries):
-                try:
-                    print(f"Attempt {attempt+1}/{max_retries} to load URL: {url}")
-                    driver.get(url)
-                    
-                    # Extract URLs from the loaded page
-                    extract_urls_from_page(driver, category, unique_category_url_pairs)
-                    
-                    # If successful, break the retry loop
-                    break
-                    
-                except Exception as e:
-                    print(f"Error on attempt {attempt+1}: {e}")
-                    if attempt < max_retries - 1:
-                        print(f"Retrying in {SCRAPER_SETTINGS['retry_delay']} seconds...")
-                        time.sleep(SCRAPER_SETTINGS["retry_delay"])
-                    else:
-                        print(f"Failed to process category '{category}' after {max_retries} attempts")
-            
-            # Add a delay between categories to avoid rate limiting
-            time.sleep(SCRAPER_SETTINGS["category_delay"])
-        
-        # Save the unique (category, URL) pairs to a CSV file
-        save_to_csv(unique_category_url_pairs)
-        
+        checkpoint = CheckpointStore(checkpoint_file)
+        with UrlIndex() as url_index:
+            shards = expand_shards()
+            costs = estimate_costs(shards, url_index.shard_stats())
+            if shard_slice:
+                shards = slice_shards(shards, shard_slice[0], shard_slice[1], costs)
+                print(f"Shard slice {shard_slice[0]}/{shard_slice[1]}: {len(shards)} shards, "
+                      f"~{sum(costs[shard.key] for shard in shards):,.0f} estimated results")
+            else:
+                shards = schedule_shards(shards, costs)
+        if list_only:
+            print_shard_status(shards, costs, checkpoint)
+            return
+
+        if resume:
+            done = checkpoint.completed_categories()
+            unique_category_url_pairs = checkpoint.load_pairs()
+            skipped = len([shard for shard in shards if shard.key in done])
+            shards = [shard for shard in shards if shard.key not in done]
+            print(f"Resuming from {checkpoint_file}: {skipped} shards done, "
+                  f"{len(unique_category_url_pairs)} pairs restored, {len(shards)} shards left")
+        else:
+            checkpoint.reset()
+
+        # Pairs are streamed to the output file as they are harvested, with
+        # pages no earlier run has seen also going to a delta file, so an
+        # interrupted run keeps everything found so far
+        suffix = f"_shard{shard_slice[0]}of{shard_slice[1]}" if shard_slice else ""
+        with UrlIndex() as url_index, PairsOutput(url_index=url_index, suffix=suffix, fmt=output_format) as output:
+            print(f"Writing (category, URL) pairs to {output.path}")
+            output.write(unique_category_url_pairs)
+            if processes and processes > 1:
+                outcomes = crawl_shards_in_processes(shards, unique_category_url_pairs, checkpoint_file, processes,
+                                                     on_pairs=output.write, on_records=on_records)
+            else:
+                outcomes = crawl_shards_threaded(shards, unique_category_url_pairs, checkpoint,
+                                                 on_pairs=output.write, on_records=on_records)
+
+            # Include pairs checkpointed for shards that ultimately failed. Shard
+            # statistics refine the cost estimates of the next run.
+            output.write(checkpoint.load_pairs())
+            for outcome in outcomes:
+                if outcome["ok"]:
+                    url_index.record_shard(outcome["key"], outcome["results"], outcome["pairs"], outcome["seconds"])
+        print_shard_status(shards, costs, checkpoint, outcomes)
+
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        if driver:
-            driver.quit()
+        # Records are only held in memory, write what was read even if the crawl failed or was interrupted
+        if ad_records:
+            try:
+                ad_records.write()
+            except Exception as e:
+                print(f"Error writing ad records: {e}")
+        if checkpoint:
+            checkpoint.close()
+        METRICS.stop_trace()
+        print(f"Run summary written to {METRICS.write(metrics_file or default_metrics_path('scrape'))}")
         print("\nScript finished.")
 
+def run_cli(argv=None):
+    """Run the scraper from command-line arguments (sys.argv[1:] by default) and return the exit code."""
+    parser = argparse.ArgumentParser(description="Scrape Facebook page URLs from the Ad Library.")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted run, skipping shards that already finished")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help=f"checkpoint database path (default: {CHECKPOINT_FILE})")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="only crawl slice I of N cost-balanced shard slices, e.g. 2/4 on the second of four runners")
+    parser.add_argument("--processes", type=int,
+                        help="crawl in this many worker processes (one Chrome each) instead of threads")
+    parser.add_argument("--format", choices=sorted(FORMATS),
+                        help=f"output file format (default: {OUTPUT_SETTINGS['format']}); parquet needs pyarrow")
+    parser.add_argument("--merge", nargs="*", metavar="FILE",
+                        help="merge output files (default: every ad_* file in contents/) into one sorted, "
+                             "deduplicated file with bounded memory, then exit")
+    parser.add_argument("--output", help="merged file path for --merge (default: contents/merged.<format>)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="store every harvested feed in the snapshot cache for reparse.py")
+    parser.add_argument("--records", action="store_true",
+                        help="also keep every ad card (library ID, dates, status, platforms, page, copy) and write "
+                             "them to contents/ads_<date>.parquet")
+    parser.add_argument("--list-shards", action="store_true",
+                        help="print the shard schedule with estimated costs and status, then exit")
+    parser.add_argument("--metrics", help="run summary path, .prom for a Prometheus textfile (default: metrics/scrape_<time>.json)")
+    parser.add_argument("--trace", help="write every timed event to this JSONL file")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="DEBUG also prints every harvested link")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    if args.snapshots:
+        apply_settings({"snapshot": {"enabled": True}})
+    if args.records:
+        apply_settings({"record": {"enabled": True}})
+    if args.merge is not None:
+        output_path = args.output or (os.path.join(OUTPUT_DIR, f"merged{format_extension(args.format)}")
+                                      if args.format else None)
+        with UrlIndex() as url_index:
+            return 0 if merge_outputs(args.merge, output_path, url_index=url_index) else 1
+    try:
+        shard_slice = parse_shard_slice(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    main(resume=args.resume, checkpoint_file=args.checkpoint, metrics_file=args.metrics, trace_file=args.trace,
+         shard_slice=shard_slice, processes=args.processes, list_only=args.list_shards, output_format=args.format)
+    return 0
+
 if __name__ == "__main__":
-    main()
+    exit(run_cli())
@@ -1,42 +1,59 @@
+import argparse
 import csv
+import logging
 import os
-
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-
-from src.data_handler import save_phone_numbers_to_csv # Added import
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import PHONE_EXTRACTOR_SETTINGS, LOG_LEVEL, apply_settings
+from src.data_handler import PhoneNumbersCsvWriter
+from src.metrics import METRICS, default_metrics_path
+from src.output_formats import read_rows
+from src.phone_numbers import find_phone_numbers
+from src.snapshot_cache import store_snapshot
+from src.rate_limiter import RATE_LIMITER, is_throttle_url
+from src.url_index import UrlIndex
+from src.url_utils import canonicalize_url
+
+logger = logging.getLogger(__name__)
 
 def read_input_csv(file_path):
     """
-    Reads a CSV file, extracts 'URL' and 'Category' from each row.
+    Reads a CSV, gzip CSV or Parquet file, extracts 'URL' (or the scraper's 'Page URL') and 'Category' from each row.
+
+    URLs are canonicalized and rows repeating an already seen page are dropped,
+    so each page is only visited once even if the scraper found it through
+    several redirect links.
 
     Args:
-        file_path (str): The path to the CSV file.
+        file_path (str): The path to the input file, its extension (.csv, .csv.gz or .parquet) selects the format.
 
     Returns:
         list: A list of dictionaries, where each dictionary has 'url' and 'category' keys.
               Returns an empty list if there's a FileNotFoundError or CSV parsing error.
     """
     results = []
+    seen_urls = set()
+    duplicates = 0
     try:
-        with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
-            # Use DictReader to directly access columns by header name
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                url = row.get('URL', '') # Default to empty string if 'URL' column is missing
-                category = row.get('Category', '') # Default to empty string if 'Category' column is missing or empty
-
-                # Ensure URL is present, otherwise it might not be useful
-                if not url:
-                    print(f"Warning: Row found with missing URL in {file_path}: {row}")
-                    continue # Skip rows with no URL
-
-                results.append({'url': url, 'category': category})
+        # Rows are read as dicts keyed by header name, streamed from the file
+        for row in read_rows(file_path):
+            # Default to empty string if neither 'URL' nor 'Page URL' is present
+            url = row.get('URL') or row.get('Page URL') or ''
+            category = row.get('Category', '') # Default to empty string if 'Category' column is missing or empty
+
+            # Ensure URL is present, otherwise it might not be useful
+            if not url:
+                print(f"Warning: Row found with missing URL in {file_path}: {row}")
+                continue # Skip rows with no URL
+
+            url = canonicalize_url(url) or url
+            if url in seen_urls:
+                duplicates += 1
+                continue
+            seen_urls.add(url)
+            results.append({'url': url, 'category': category})
     except FileNotFoundError:
         print(f"Error: File not found at {file_path}")
         return []
@@ -46,16 +63,274 @@ def read_input_csv(file_path):
     except Exception as e:
         print(f"An unexpected error occurred while reading {file_path}: {e}")
         return []
+    if duplicates:
+        print(f"Skipped {duplicates} rows whose canonical URL was already listed in {file_path}")
     return results
 
-if __name__ == '__main__':
-    input_csv_path = "contents/test_input.csv"
-    # Output path is managed by save_phone_numbers_to_csv in data_handler.py
-    # For clarity, we can define it here but it's not directly passed to the save function
-    # if we stick to the current save_phone_numbers_to_csv implementation.
-    # output_csv_path = "contents/extracted_phones.csv" # This was the original plan
-    # However, save_phone_numbers_to_csv in data_handler.py creates timestamped files in "phone_numbers/"
+def extract_phone_from_url(driver, url):
+    """
+    Extracts the phone numbers of a given URL using Selenium.
+
+    Args:
+        driver: A Selenium WebDriver instance.
+        url (str): The URL to scrape.
+
+    Returns:
+        list: PhoneMatch tuples, see parse_phone_from_html, empty if the page has none; None if the
+              page could not be loaded (timeout, WebDriver error, checkpoint or login redirect).
+    """
+    # Selenium and requests are imported where they are used, so reparse.py and the
+    # CLI's non-browser commands can import this module without paying for them
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    try:
+        RATE_LIMITER.acquire(url)
+        with METRICS.timer("phone.page_load", url=url):
+            driver.get(url)
+            # Wait for the body element to be present, indicating basic page load
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+        if is_throttle_url(driver.current_url):
+            RATE_LIMITER.penalize(url, "checkpoint")
+            logger.warning("Redirected to %s while loading %s", driver.current_url, url)
+            return None
+        RATE_LIMITER.success(url)
+
+        with METRICS.timer("phone.page_source_fetch", url=url):
+            page_source = driver.page_source
+        store_snapshot(url, page_source)
+        return parse_phone_from_html(page_source, url)
+
+    except TimeoutException:
+        RATE_LIMITER.penalize(url, "timeout")
+        logger.warning("Page load timed out for URL: %s", url)
+        return None
+    except Exception as e:
+        # Catching a broad exception for any other Selenium/BeautifulSoup errors
+        logger.warning("Error extracting phone number from URL %s: %s", url, e)
+        return None
+
+def parse_phone_from_html(page_source, url):
+    """
+    Extracts the phone numbers of a page from its HTML.
+
+    Strategies are tried cheapest first (tel: links, JSON-LD and embedded JSON,
+    meta tags, the About section, visible text) and the first one yielding a
+    valid number wins, see src/phone_numbers.py.
+
+    Args:
+        page_source (str): The page HTML, rendered by a browser or fetched over HTTP.
+        url (str): The URL the HTML came from, used in log messages.
+
+    Returns:
+        list: Distinct PhoneMatch tuples (E.164 number, raw text, strategy), empty if none was found.
+    """
+    with METRICS.timer("phone.parse", url=url):
+        matches = find_phone_numbers(page_source)
+    if matches:
+        METRICS.incr(f"phone.source.{matches[0].source}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Successfully extracted phone (%s): %s from %s", matches[0].source,
+                        ", ".join(match.number for match in matches), url)
+    else:
+        logger.info("Phone number not found on page for URL: %s", url)
+    return matches
+
+def phone_result(url, category, matches, tier):
+    """Build the output row of a page from its PhoneMatch tuples.
+
+    Several numbers are joined with ";" in the 'phone_number' field; matches is None
+    (an inconclusive lookup) gives an empty row like a page without a number.
+    """
+    matches = matches or ()
+    return {'url': url, 'category': category, 'phone_number': ";".join(match.number for match in matches),
+            'source': matches[0].source if matches else '', 'tier': tier}
+
+def extract_phone_tiered(url, session=None, pool=None):
+    """
+    Extracts the phone numbers of a URL trying a plain HTTP fetch first and a browser only if needed.
+
+    Args:
+        url (str): The URL to scrape.
+        session: requests.Session for the HTTP tier, or None to skip it.
+        pool: DriverPool for the browser tier, or None to skip it.
+
+    Returns:
+        tuple: (matches, tier, browser_seconds) where matches is a list of PhoneMatch tuples
+               and tier is "http" or "browser" for the tier that produced the answer. If no tier
+               loaded and parsed the page (failed fetch, JS wall without browser fallback, browser
+               timeout, error or redirect) matches is None and tier is "", so the page is not
+               recorded as having no phone number.
+    """
+    tier = ""
+    matches = None
+    if session is not None:
+        from src.http_fetcher import fetch_html, is_js_wall
+        with METRICS.timer("phone.http_fetch", url=url):
+            html = fetch_html(session, url)
+        if html is not None:
+            if is_js_wall(html):
+                # The expected answer to a logged-out fetch, not a block: the browser tier
+                # loads the page, and only its checkpoint or login redirects slow the domain
+                logger.debug("JS or login wall on HTTP fetch of %s, falling back to browser", url)
+            else:
+                store_snapshot(url, html)
+                matches = parse_phone_from_html(html, url)
+                tier = "http"
+                if matches:
+                    return matches, tier, 0.0
+
+    if pool is None:
+        return matches, tier, 0.0
 
+    start = time.monotonic()
+    with pool.driver() as driver:
+        browser_matches = extract_phone_from_url(driver, url)
+    if browser_matches is None:
+        # An HTTP page without a number still answers the lookup when the browser failed
+        return matches, tier, time.monotonic() - start
+    return browser_matches, "browser", time.monotonic() - start
+
+def setup_phone_driver():
+    """Set up and return a headless Chrome WebDriver for phone extraction.
+
+    Uses the shared browser factory with its own persistent "phone" profiles, so
+    images, media and trackers are blocked and the page cache stays warm.
+
+    Returns:
+        webdriver.Chrome: Configured Chrome WebDriver instance
+    """
+    from src.browser import setup_driver
+    # Bound every page load so one slow URL cannot stall its worker
+    return setup_driver("phone", page_load_timeout=PHONE_EXTRACTOR_SETTINGS["url_timeout"])
+
+class ExtractionStats:
+    """Thread-safe throughput, hit-rate and per-tier counters for a phone extraction run."""
+
+    def __init__(self, total=None):
+        self.total = total
+        self.done = 0
+        self.hits = 0
+        self.tiers = {"http": 0, "browser": 0, "": 0}
+        self.browser_seconds = 0.0
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, found, tier="browser", browser_seconds=0.0):
+        """Count one processed URL and return the new processed count."""
+        METRICS.incr("phone.urls")
+        METRICS.incr(f"phone.tier.{tier or 'none'}")
+        if found:
+            METRICS.incr("phone.hits")
+        with self._lock:
+            self.done += 1
+            if found:
+                self.hits += 1
+            self.tiers[tier] = self.tiers.get(tier, 0) + 1
+            self.browser_seconds += browser_seconds
+            return self.done
+
+    def browser_seconds_saved(self):
+        """Estimate browser time avoided by URLs the HTTP tier resolved."""
+        browser_calls = self.tiers.get("browser", 0)
+        if not browser_calls:
+            return 0.0
+        return self.tiers.get("http", 0) * self.browser_seconds / browser_calls
+
+    def summary(self):
+        """Return a one-line human readable progress summary."""
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        hit_rate = 100.0 * self.hits / self.done if self.done else 0.0
+        done = self.done if self.total is None else f"{self.done}/{self.total}"
+        return (f"Processed {done} URLs in {elapsed:.1f}s "
+                f"({self.done / elapsed:.2f} URLs/s, hit rate {hit_rate:.1f}%, "
+                f"http {self.tiers.get('http', 0)} / browser {self.tiers.get('browser', 0)}, "
+                f"~{self.browser_seconds_saved():.0f}s browser time saved)")
+
+def extract_phones_concurrently(url_data, on_result, workers=None, ordered=None, http_first=None, browser_fallback=None):
+    """Extract phone numbers from many URLs with a pool of browser workers.
+
+    Args:
+        url_data (list): Dictionaries with 'url' and 'category' keys, as returned by read_input_csv
+        on_result (callable): Called with each result dict ('category', 'url', 'phone_number', 'source', 'tier')
+                              as soon as it can be emitted
+        workers (int): Number of concurrent Chrome instances, defaults to PHONE_EXTRACTOR_SETTINGS["workers"]
+        ordered (bool): Emit results in input order instead of completion order,
+                        defaults to PHONE_EXTRACTOR_SETTINGS["ordered"]
+        http_first (bool): Try a keep-alive HTTP fetch before opening a browser,
+                           defaults to PHONE_EXTRACTOR_SETTINGS["http_first"]
+        browser_fallback (bool): Load pages the HTTP tier could not resolve in Chrome,
+                                 defaults to PHONE_EXTRACTOR_SETTINGS["browser_fallback"]
+
+    Returns:
+        ExtractionStats: Final counters for the run
+    """
+    from src.driver_pool import DriverPool
+    from src.http_fetcher import create_session
+    workers = workers or PHONE_EXTRACTOR_SETTINGS["workers"]
+    ordered = PHONE_EXTRACTOR_SETTINGS["ordered"] if ordered is None else ordered
+    http_first = PHONE_EXTRACTOR_SETTINGS["http_first"] if http_first is None else http_first
+    browser_fallback = PHONE_EXTRACTOR_SETTINGS["browser_fallback"] if browser_fallback is None else browser_fallback
+    session = create_session(pool_size=workers) if http_first else None
+    stats_every = PHONE_EXTRACTOR_SETTINGS["stats_every"]
+    stats = ExtractionStats(len(url_data))
+    pending = {}
+    next_index = 0
+
+    def work(item):
+        # Drivers are only launched once the HTTP tier fails to resolve a URL
+        return extract_phone_tiered(item['url'], session, pool if browser_fallback else None)
+
+    with DriverPool(size=workers, factory=setup_phone_driver) as pool, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(work, item): index for index, item in enumerate(url_data)}
+        for future in as_completed(futures):
+            index = futures[future]
+            item = url_data[index]
+            try:
+                matches, tier, browser_seconds = future.result()
+            except Exception as e:
+                print(f"Error extracting phone number from URL {item['url']}: {e}")
+                matches, tier, browser_seconds = None, "", 0.0
+
+            result = phone_result(item['url'], item.get('category', ''), matches, tier)
+            if ordered:
+                # Hold results back until every earlier row has been emitted
+                pending[index] = result
+                while next_index in pending:
+                    on_result(pending.pop(next_index))
+                    next_index += 1
+            else:
+                on_result(result)
+
+            if stats.record(bool(matches), tier, browser_seconds) % stats_every == 0:
+                print(stats.summary())
+
+    if session is not None:
+        session.close()
+    print(stats.summary())
+    return stats
+
+def main(input_csv_path="contents/test_input.csv", workers=None, ordered=None, http_first=None, browser_fallback=None,
+         revisit=False, metrics_file=None, trace_file=None):
+    """Read page URLs from a CSV file and save the phone numbers found on them.
+
+    Args:
+        input_csv_path (str): CSV file with 'Category' and 'URL' columns
+        workers (int): Number of concurrent Chrome instances
+        ordered (bool): Write results in input order instead of completion order
+        http_first (bool): Try a plain HTTP fetch before opening a browser
+        browser_fallback (bool): Load pages the HTTP tier could not resolve in Chrome
+        revisit (bool): Visit every page, even those the URL index resolved within the lookup TTL
+        metrics_file (str): Run summary path (.json or .prom), defaults to a timestamped JSON file in metrics/
+        trace_file (str): Optional JSONL file receiving every timed event
+
+    Returns:
+        int: Process exit code
+    """
     print(f"Starting phone extraction process...")
     print(f"Reading input from: {input_csv_path}")
 
@@ -63,151 +338,77 @@ if __name__ == '__main__':
     if not os.path.exists(input_csv_path):
         print(f"Error: Input CSV file not found at {input_csv_path}")
         print("Please ensure the input file exists. For example, it might be created by a previous step or manually.")
-        # Example content for contents/test_input.csv if needed for a quick test:
-        # print("Example content for 'contents/test_input.csv':")
-        # print("Category,URL")
-        # print("Tech,https://www.example.com/tech_page_with_phone")
-        # print("Retail,https://www.example.com/retail_page_with_phone")
-        exit(1) # Exit if input file is crucial and missing
+        return 1
 
     url_data = read_input_csv(input_csv_path)
 
     if not url_data:
         print("No data read from input CSV or an error occurred. Exiting.")
-        exit(1)
+        return 1
 
     print(f"Successfully read {len(url_data)} URLs from {input_csv_path}.")
 
-    # Initialize Selenium WebDriver
-    print("Initializing Selenium WebDriver (Chrome headless)...")
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    # The webdriver executable should be in PATH or specify executable_path
-    # For GitHub Actions, chromedriver is often pre-installed and in PATH
+    METRICS.reset()
+    if trace_file:
+        METRICS.start_trace(trace_file)
+
+    # Results are streamed to a timestamped CSV in the 'phone_numbers' directory as they complete
+    # and recorded in the cross-run URL index so later runs can skip them
     try:
-        driver = webdriver.Chrome(options=options)
-        print("WebDriver initialized successfully.")
+        with UrlIndex() as url_index, PhoneNumbersCsvWriter() as writer:
+            if not revisit:
+                total = len(url_data)
+                url_data = [item for item in url_data if url_index.needs_phone_lookup(item['url'])]
+                print(f"Skipping {total - len(url_data)} pages already resolved by a recent run")
+
+            def on_result(result):
+                writer.write(result)
+                # Pages no tier could load are retried by the next run instead of waiting out the TTL
+                if result['tier']:
+                    url_index.record_phone(result['url'], result['phone_number'])
+
+            print(f"Processing {len(url_data)} items, writing results to {writer.path}...")
+            extract_phones_concurrently(url_data, on_result, workers=workers, ordered=ordered,
+                                        http_first=http_first, browser_fallback=browser_fallback)
     except Exception as e:
-        print(f"Error initializing WebDriver: {e}")
+        print(f"Error during phone extraction: {e}")
         print("Ensure Chrome and ChromeDriver are correctly installed and configured.")
-        exit(1)
-
-    all_results = []
-
-    print(f"Processing {len(url_data)} items...")
-    for item in url_data:
-        url = item.get('url')
-        category = item.get('category')
-
-        if not url:
-            print(f"Skipping item with missing URL: {item}")
-            continue
-
-        print(f"Extracting phone from URL: {url} (Category: {category})")
-        phone_number = extract_phone_from_url(driver, url)
-
-        result = {'url': url, 'category': category, 'phone_number': phone_number}
-        all_results.append(result)
-        if phone_number:
-            print(f"Found phone: {phone_number} for {url}")
-        else:
-            print(f"No phone found for {url}")
-
-    # Quit WebDriver
-    print("Closing WebDriver...")
-    driver.quit()
-
-    # Save results
-    # The save_phone_numbers_to_csv function from data_handler.py creates its own filename
-    # and saves it in the 'phone_numbers' directory.
-    # It also uses headers: "Category", "URL", "Phone Number"
-    print(f"Saving {len(all_results)} results...")
-    if all_results:
-        save_successful = save_phone_numbers_to_csv(all_results) # No output_csv_path needed as argument
-        if save_successful:
-            print(f"Results saved successfully by save_phone_numbers_to_csv (check 'phone_numbers' directory).")
-        else:
-            print(f"Failed to save results using save_phone_numbers_to_csv.")
-    else:
-        print("No results to save.")
+        return 1
+    finally:
+        METRICS.stop_trace()
+        print(f"Run summary written to {METRICS.write(metrics_file or default_metrics_path('phones'))}")
 
     print("Phone extraction process completed.")
+    return 0
+
+def run_cli(argv=None):
+    """Run the phone extractor from command-line arguments (sys.argv[1:] by default) and return the exit code."""
+    parser = argparse.ArgumentParser(description="Extract phone numbers from Facebook page URLs.")
+    parser.add_argument("--input", default="contents/test_input.csv",
+                        help="input .csv, .csv.gz or .parquet file with Category and URL columns (default: contents/test_input.csv)")
+    parser.add_argument("--workers", type=int, default=PHONE_EXTRACTOR_SETTINGS["workers"],
+                        help="number of concurrent Chrome instances")
+    parser.add_argument("--ordered", action="store_true",
+                        help="write results in input order instead of completion order")
+    parser.add_argument("--no-http", action="store_true",
+                        help="skip the HTTP fast path and load every URL in Chrome")
+    parser.add_argument("--no-browser", action="store_true",
+                        help="only use the HTTP fast path, never launch Chrome")
+    parser.add_argument("--revisit", action="store_true",
+                        help="also visit pages whose phone lookup in the URL index is still fresh")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="store every fetched page in the snapshot cache for reparse.py")
+    parser.add_argument("--metrics", help="run summary path, .prom for a Prometheus textfile (default: metrics/phones_<time>.json)")
+    parser.add_argument("--trace", help="write every timed event to this JSONL file")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="DEBUG shows why each page did or did not yield a number")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    if args.snapshots:
+        apply_settings({"snapshot": {"enabled": True}})
+    return main(args.input, workers=args.workers, ordered=args.ordered or None,
+                http_first=False if args.no_http else None,
+                browser_fallback=False if args.no_browser else None,
+                revisit=args.revisit, metrics_file=args.metrics, trace_file=args.trace)
 
-def extract_phone_from_url(driver, url):
-    """
-    Extracts a phone number from a given URL using Selenium and BeautifulSoup.
-
-    Args:
-        driver: A Selenium WebDriver instance.
-        url (str): The URL to scrape.
-
-    Returns:
-        str: The extracted phone number, or an empty string if not found or an error occurs.
-    """
-    try:
-        driver.get(url)
-        # Wait for the body element to be present, indicating basic page load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "html.parser")
-
-        # Specific class names for locating the elements
-        # These are very long and specific; ensure they are exact.
-        outer_div_class = "x9f619 x1n2onr6 x1ja2u2z x78zum5 xdt5ytf x193iq5w xeuugli x1r8uery x1iyjqo2 xs83m0k xamitd3 xsyo7zv x16hj40l x10b6aqq x1yrsyyn"
-        span_class = "x193iq5w xeuugli x13faqbe x1vvkbs x10flsy6 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x41vudc x6prxxf xvq8zen xo1l8bm xzsf02u x1yc453h"
-
-        phone_number_text = ""
-
-        # Find the outer div
-        # Note: BeautifulSoup's find method with a class string containing spaces will look for elements
-        # that have *all* these classes. This is usually what's intended.
-        outer_div = soup.find("div", class_=outer_div_class)
-
-        if outer_div:
-            # Find the span within the outer div
-            phone_span = outer_div.find("span", class_=span_class)
-            if phone_span:
-                phone_number_text = phone_span.get_text(strip=True)
-                if phone_number_text:
-                    print(f"Successfully extracted phone: {phone_number_text} from {url}")
-                    return phone_number_text
-                else:
-                    print(f"Warning: Found phone span for {url}, but it contained no text.")
-            else:
-                print(f"Warning: Phone number span not found within the specified div for URL: {url}")
-        else:
-            # Attempt to find the span directly if the outer div structure is not strictly as expected,
-            # or if the class names apply to a more deeply nested structure.
-            # This is a fallback / alternative search.
-            print(f"Warning: Outer div with class '{outer_div_class}' not found for URL: {url}. Attempting to find span directly.")
-            phone_span_direct = soup.find("span", class_=span_class)
-            if phone_span_direct:
-                # Check if this directly found span is within a div that has *some* of the outer div classes,
-                # to reduce false positives if the span class is reused elsewhere.
-                # This is an approximation, as checking all classes is too strict.
-                # For now, we'll trust the span class is specific enough if outer_div is not found.
-                phone_number_text = phone_span_direct.get_text(strip=True)
-                if phone_number_text:
-                    print(f"Successfully extracted phone (direct span search): {phone_number_text} from {url}")
-                    return phone_number_text
-                else:
-                    print(f"Warning: Found phone span directly for {url}, but it contained no text.")
-            else:
-                print(f"Warning: Phone number span not found directly either for URL: {url}")
-
-        if not phone_number_text:
-             print(f"Warning: Phone number not found on page for URL: {url}")
-        return ""
-
-    except TimeoutException:
-        print(f"Warning: Page load timed out for URL: {url}")
-        return ""
-    except Exception as e:
-        # Catching a broad exception for any other Selenium/BeautifulSoup errors
-        print(f"Error extracting phone number from URL {url}: {e}")
-        return ""
+if __name__ == '__main__':
+    exit(run_cli())
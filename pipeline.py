@@ -0,0 +1,234 @@
+"""
+Streaming pipeline connecting the Ad Scraper to the Phone Number Extractor.
+
+Discovery pushes canonical page URLs into a bounded asyncio queue as soon as
+they are harvested and phone extraction workers consume them at the same
+time, so the first phone numbers are written minutes into a crawl instead of
+after it. A full queue blocks the harvest callback, which pauses scrolling
+until the extractors catch up.
+
+Usage:
+    python pipeline.py [--workers 4] [--queue-size 100] [--no-http] [--no-browser] [--revisit]
+"""
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from main import scrape_category
+from phone_extractor import ExtractionStats, extract_phone_tiered, phone_result, setup_phone_driver
+from src.config import CATEGORIES, PHONE_EXTRACTOR_SETTINGS, PIPELINE_SETTINGS, LOG_LEVEL, apply_settings
+from src.data_handler import PhoneNumbersCsvWriter, save_to_csv
+from src.driver_pool import DriverPool
+from src.http_fetcher import create_session
+from src.metrics import METRICS, default_metrics_path
+from src.url_index import UrlIndex
+
+# Queue item telling a phone worker to exit
+_DONE = object()
+
+class PipelineStopped(Exception):
+    """Raised in discovery threads once the pipeline is shutting down."""
+
+async def run_pipeline(categories, url_index, writer, workers=None, queue_size=None, http_first=None,
+                       browser_fallback=None, revisit=False):
+    """Crawl categories and extract phone numbers from their pages concurrently.
+
+    Args:
+        categories: Ad Library search categories to crawl
+        url_index: UrlIndex used to skip pages with a fresh phone lookup and to record results
+        writer: PhoneNumbersCsvWriter receiving each result as it completes
+        workers: Phone extraction workers, defaults to PHONE_EXTRACTOR_SETTINGS["workers"]
+        queue_size: URLs buffered between the stages, defaults to PIPELINE_SETTINGS["queue_size"]
+        http_first: Try a plain HTTP fetch before opening a browser
+        browser_fallback: Load pages the HTTP tier could not resolve in Chrome
+        revisit: Also extract pages whose phone lookup in the URL index is still fresh
+
+    Returns:
+        tuple: (set of harvested (category, URL) pairs, ExtractionStats)
+    """
+    workers = workers or PHONE_EXTRACTOR_SETTINGS["workers"]
+    http_first = PHONE_EXTRACTOR_SETTINGS["http_first"] if http_first is None else http_first
+    browser_fallback = PHONE_EXTRACTOR_SETTINGS["browser_fallback"] if browser_fallback is None else browser_fallback
+    stats_every = PHONE_EXTRACTOR_SETTINGS["stats_every"]
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size or PIPELINE_SETTINGS["queue_size"])
+    stopping = threading.Event()
+    pairs = set()
+    pairs_lock = threading.Lock()
+    queued = set()
+    stats = ExtractionStats()
+    start = time.monotonic()
+    first_phone = None
+
+    scrape_pool = DriverPool()
+    phone_pool = DriverPool(size=workers, factory=setup_phone_driver)
+    session = create_session(pool_size=workers) if http_first else None
+    scrape_executor = ThreadPoolExecutor(max_workers=scrape_pool.size, thread_name_prefix="discover")
+    phone_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="phone")
+
+    async def offer(batch):
+        # Runs on the event loop, so the queue and the URL index are only touched from one thread
+        for category, url in sorted(batch):
+            if stopping.is_set():
+                raise PipelineStopped()
+            if url in queued:
+                continue
+            queued.add(url)
+            if not revisit and not url_index.needs_phone_lookup(url):
+                METRICS.incr("pipeline.skipped_fresh")
+                continue
+            await queue.put((category, url))
+            METRICS.incr("pipeline.queued")
+
+    def on_pairs(batch):
+        # Called from discovery threads; blocks while the queue is full
+        if stopping.is_set():
+            raise PipelineStopped()
+        asyncio.run_coroutine_threadsafe(offer(batch), loop).result()
+
+    def discover(category):
+        # Page loads are paced by the shared rate limiter inside scrape_category
+        return scrape_category(scrape_pool, category, pairs, pairs_lock, on_pairs=on_pairs)
+
+    def extract(url):
+        # Drivers are only launched once the HTTP tier fails to resolve a URL
+        return extract_phone_tiered(url, session, phone_pool if browser_fallback else None)
+
+    async def consume():
+        nonlocal first_phone
+        while True:
+            item = await queue.get()
+            try:
+                if item is _DONE:
+                    return
+                category, url = item
+                try:
+                    matches, tier, browser_seconds = await loop.run_in_executor(phone_executor, extract, url)
+                except Exception as e:
+                    print(f"Error extracting phone number from URL {url}: {e}")
+                    matches, tier, browser_seconds = None, "", 0.0
+
+                result = phone_result(url, category, matches, tier)
+                writer.write(result)
+                # Inconclusive lookups have no tier and are retried by the next run
+                if tier:
+                    url_index.record_phone(url, result['phone_number'])
+                if matches and first_phone is None:
+                    first_phone = time.monotonic() - start
+                    METRICS.observe("pipeline.first_phone", first_phone)
+                    print(f"First phone number found {first_phone:.1f}s into the run")
+                if stats.record(bool(matches), tier, browser_seconds) % stats_every == 0:
+                    print(f"{stats.summary()}, {queue.qsize()} queued")
+            finally:
+                queue.task_done()
+
+    consumers = [asyncio.create_task(consume()) for _ in range(workers)]
+    try:
+        print(f"Crawling {len(categories)} categories with up to {scrape_pool.size} drivers, "
+              f"extracting phone numbers with {workers} workers")
+        results = await asyncio.gather(*(loop.run_in_executor(scrape_executor, discover, category)
+                                         for category in categories), return_exceptions=True)
+        for category, result in zip(categories, results):
+            if isinstance(result, Exception):
+                print(f"Worker for category '{category}' crashed: {result}")
+
+        # Discovery is over: let the workers drain the queue, then stop them
+        for _ in consumers:
+            await queue.put(_DONE)
+        await asyncio.gather(*consumers)
+    finally:
+        stopping.set()
+        for consumer in consumers:
+            consumer.cancel()
+        # Unblock discovery threads waiting for queue space, they exit at their next harvest
+        while not queue.empty():
+            queue.get_nowait()
+            queue.task_done()
+        scrape_pool.close()
+        phone_pool.close()
+        await loop.run_in_executor(None, scrape_executor.shutdown)
+        await loop.run_in_executor(None, phone_executor.shutdown)
+        if session is not None:
+            session.close()
+
+    print(stats.summary())
+    return pairs, stats
+
+def main(categories=None, workers=None, queue_size=None, http_first=None, browser_fallback=None, revisit=False,
+         metrics_file=None, trace_file=None):
+    """Run the streaming pipeline and save both the page URLs and the phone numbers.
+
+    Args:
+        categories: Categories to crawl, defaults to CATEGORIES
+        workers: Phone extraction workers
+        queue_size: URLs buffered between discovery and extraction
+        http_first: Try a plain HTTP fetch before opening a browser
+        browser_fallback: Load pages the HTTP tier could not resolve in Chrome
+        revisit: Also extract pages whose phone lookup in the URL index is still fresh
+        metrics_file: Run summary path (.json or .prom), defaults to a timestamped JSON file in metrics/
+        trace_file: Optional JSONL file receiving every timed event
+
+    Returns:
+        int: Process exit code
+    """
+    METRICS.reset()
+    if trace_file:
+        METRICS.start_trace(trace_file)
+
+    print("Starting streaming pipeline...")
+    try:
+        with UrlIndex() as url_index, PhoneNumbersCsvWriter() as writer:
+            print(f"Writing phone numbers to {writer.path}")
+            pairs, _ = asyncio.run(run_pipeline(categories or CATEGORIES, url_index, writer, workers=workers,
+                                                queue_size=queue_size, http_first=http_first,
+                                                browser_fallback=browser_fallback, revisit=revisit))
+            # Keep the usual ad_*.csv output and new-pages delta
+            save_to_csv(pairs, url_index=url_index)
+    except KeyboardInterrupt:
+        print("Pipeline interrupted, results written so far are kept")
+        return 130
+    except Exception as e:
+        print(f"Error during pipeline run: {e}")
+        return 1
+    finally:
+        METRICS.stop_trace()
+        print(f"Run summary written to {METRICS.write(metrics_file or default_metrics_path('pipeline'))}")
+
+    print("Pipeline completed.")
+    return 0
+
+def run_cli(argv=None):
+    """Run the pipeline from command-line arguments (sys.argv[1:] by default) and return the exit code."""
+    parser = argparse.ArgumentParser(description="Crawl the Ad Library and extract phone numbers in one streaming run.")
+    parser.add_argument("--categories", help="comma separated categories (default: CATEGORIES in src/config.py)")
+    parser.add_argument("--workers", type=int, default=PHONE_EXTRACTOR_SETTINGS["workers"],
+                        help="number of concurrent phone extraction workers")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_SETTINGS["queue_size"],
+                        help="page URLs buffered between discovery and extraction")
+    parser.add_argument("--no-http", action="store_true",
+                        help="skip the HTTP fast path and load every URL in Chrome")
+    parser.add_argument("--no-browser", action="store_true",
+                        help="only use the HTTP fast path for phone extraction")
+    parser.add_argument("--revisit", action="store_true",
+                        help="also visit pages whose phone lookup in the URL index is still fresh")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="store harvested feeds and fetched pages in the snapshot cache for reparse.py")
+    parser.add_argument("--metrics", help="run summary path, .prom for a Prometheus textfile (default: metrics/pipeline_<time>.json)")
+    parser.add_argument("--trace", help="write every timed event to this JSONL file")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="DEBUG also prints every harvested link")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    if args.snapshots:
+        apply_settings({"snapshot": {"enabled": True}})
+    categories = [category.strip() for category in args.categories.split(",") if category.strip()] if args.categories else None
+    return main(categories, workers=args.workers, queue_size=args.queue_size,
+                http_first=False if args.no_http else None,
+                browser_fallback=False if args.no_browser else None,
+                revisit=args.revisit, metrics_file=args.metrics, trace_file=args.trace)
+
+if __name__ == "__main__":
+    exit(run_cli())
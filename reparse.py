@@ -0,0 +1,142 @@
+"""
+Re-run the current extractors over cached page snapshots.
+
+Snapshots stored by the scrapers with --snapshots (see src/snapshot_cache.py)
+are parsed again in parallel across all cores: Facebook pages with the phone
+number strategies, Ad Library feeds with the link harvester. A selector fix
+can so be applied to the whole history in minutes, without scraping again.
+
+Usage:
+    python reparse.py [--kind page|feed] [--all-versions] [--since-days N] [--workers N] [--no-index]
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from phone_extractor import parse_phone_from_html, phone_result
+from src.config import LOG_LEVEL, SNAPSHOT_SETTINGS, applied_settings, apply_settings
+from src.data_handler import PHONE_NUMBERS_DIR, PairsOutput, PhoneNumbersCsvWriter
+from src.html_parsers import harvest_links
+from src.metrics import METRICS, default_metrics_path
+from src.output_formats import FORMATS, format_extension
+from src.scraper_utils import process_hrefs
+from src.snapshot_cache import FEED, PAGE, SnapshotCache, read_object
+from src.url_index import UrlIndex
+
+def reparse_snapshot(snapshot):
+    """Run the current extractor of a snapshot's kind over its HTML, in a worker process.
+
+    Args:
+        snapshot: Dict from SnapshotCache.snapshots()
+
+    Returns:
+        tuple: (snapshot, result) where result is a list of PhoneMatch tuples for pages,
+               a set of (category, URL) pairs for feeds, or None if the object was evicted
+    """
+    html = read_object(snapshot["path"])
+    if html is None:
+        return snapshot, None
+    if snapshot["kind"] == PAGE:
+        return snapshot, parse_phone_from_html(html, snapshot["url"])
+    pairs = set()
+    process_hrefs(harvest_links(html), snapshot["category"], pairs)
+    return snapshot, pairs
+
+def main(kind=None, latest_only=True, since=None, workers=None, update_index=True, output_format=None,
+         metrics_file=None):
+    """Reparse cached snapshots and write the results like a scrape would.
+
+    Args:
+        kind: Only reparse snapshots of this kind ("page" or "feed")
+        latest_only: Only reparse the most recent snapshot of each URL
+        since: Only reparse snapshots fetched at or after this timestamp
+        workers: Worker processes, defaults to SNAPSHOT_SETTINGS["reparse_workers"] or every core
+        update_index: Record the results in the URL index
+        output_format: "csv", "csv.gz" or "parquet", defaults to OUTPUT_SETTINGS["format"]
+        metrics_file: Run summary path (.json or .prom), defaults to a timestamped JSON file in metrics/
+
+    Returns:
+        int: Process exit code
+    """
+    workers = workers or SNAPSHOT_SETTINGS["reparse_workers"] or os.cpu_count() or 1
+    METRICS.reset()
+    with SnapshotCache() as cache:
+        snapshots = cache.snapshots(kind=kind, latest_only=latest_only, since=since)
+        stats = cache.stats()
+    if not snapshots:
+        print(f"No snapshots to reparse in {SNAPSHOT_SETTINGS['dir']}, scrape with --snapshots first")
+        return 1
+    print(f"Reparsing {len(snapshots)} of {stats['snapshots']} snapshots "
+          f"({stats['bytes'] / 1e6:.0f} MB compressed) with {workers} processes")
+
+    start = time.monotonic()
+    counts = {"pages": 0, "phones": 0, "feeds": 0, "pairs": 0, "evicted": 0}
+    try:
+        with ExitStack() as stack:
+            url_index = stack.enter_context(UrlIndex()) if update_index else None
+            phones = pairs_output = None
+            if any(snapshot["kind"] == PAGE for snapshot in snapshots):
+                timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+                path = os.path.join(PHONE_NUMBERS_DIR, f"reparsed_phones_{timestamp}{format_extension(output_format)}")
+                phones = stack.enter_context(PhoneNumbersCsvWriter(path))
+            if any(snapshot["kind"] == FEED for snapshot in snapshots):
+                pairs_output = stack.enter_context(PairsOutput(url_index=url_index, suffix="_reparsed",
+                                                               fmt=output_format))
+
+            # Spawned workers do not inherit settings from a config file or --set, hand them over
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=apply_settings,
+                                                               initargs=(applied_settings(),)))
+            chunksize = max(1, len(snapshots) // (workers * 8))
+            with METRICS.timer("reparse", snapshots=len(snapshots)):
+                for snapshot, result in executor.map(reparse_snapshot, snapshots, chunksize=chunksize):
+                    if result is None:
+                        counts["evicted"] += 1
+                    elif snapshot["kind"] == PAGE:
+                        counts["pages"] += 1
+                        counts["phones"] += bool(result)
+                        row = phone_result(snapshot["url"], snapshot["category"], result, "snapshot")
+                        phones.write(row)
+                        if url_index is not None:
+                            url_index.record_phone(snapshot["url"], row["phone_number"],
+                                                   checked_at=snapshot["fetched_at"])
+                    else:
+                        counts["feeds"] += 1
+                        counts["pairs"] += len(result)
+                        pairs_output.write(sorted(result))
+    finally:
+        print(f"Run summary written to {METRICS.write(metrics_file or default_metrics_path('reparse'))}")
+
+    elapsed = time.monotonic() - start
+    print(f"Reparsed {counts['pages']} pages ({counts['phones']} with phone numbers) and {counts['feeds']} feeds "
+          f"({counts['pairs']} pairs) in {elapsed:.1f}s, {counts['evicted']} snapshots were evicted meanwhile")
+    return 0
+
+def run_cli(argv=None):
+    """Reparse snapshots from command-line arguments (sys.argv[1:] by default) and return the exit code."""
+    parser = argparse.ArgumentParser(description="Re-run the current extractors over cached page snapshots.")
+    parser.add_argument("--kind", choices=(PAGE, FEED), help="only reparse Facebook pages or Ad Library feeds")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="reparse every snapshot of a URL, not only the most recent one")
+    parser.add_argument("--since-days", type=float, help="only reparse snapshots fetched in the last N days")
+    parser.add_argument("--workers", type=int, help="worker processes (default: every core)")
+    parser.add_argument("--no-index", action="store_true", help="do not record the results in the URL index")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="output file format")
+    parser.add_argument("--stats", action="store_true", help="print the snapshot cache size and exit")
+    parser.add_argument("--metrics", help="run summary path, .prom for a Prometheus textfile (default: metrics/reparse_<time>.json)")
+    parser.add_argument("--log-level", default="WARNING", help=f"INFO prints every page's result (scrapers default to {LOG_LEVEL})")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    if args.stats:
+        with SnapshotCache() as cache:
+            print(cache.stats())
+        return 0
+    since = time.time() - args.since_days * 86400 if args.since_days else None
+    return main(kind=args.kind, latest_only=not args.all_versions, since=since, workers=args.workers,
+                update_index=not args.no_index, output_format=args.format, metrics_file=args.metrics)
+
+if __name__ == "__main__":
+    exit(run_cli())
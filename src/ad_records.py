@@ -0,0 +1,248 @@
+"""
+Ad-level records for the Facebook Ad Scraper.
+
+Besides the (category, page URL) pairs, every Ad Library card carries its
+library ID, start date, active status, platforms, page name and ad copy.
+When enabled (RECORD_SETTINGS["enabled"] or --records), these are kept as
+compact AdRecord objects and written to a columnar file at the end of the
+run.
+
+Cards are found by their "Library ID" label rather than by class names:
+a card is the largest element containing exactly one library ID. In
+"stream" mode they are captured in the browser before harvested cards are
+pruned, in "page_source" mode they are read from the final page source.
+"""
+
+import re
+import sys
+import threading
+from datetime import datetime
+from src.config import RECORD_SETTINGS, get_output_file
+from src.html_parsers import make_soup
+from src.metrics import METRICS
+from src.output_formats import RowWriter, format_extension
+from src.url_utils import CANONICAL_FACEBOOK_ORIGIN, canonicalize_url
+
+RECORD_HEADER = ["Library ID", "Category", "Page Name", "Page URL", "Status", "Started", "Platforms", "Ad Copy"]
+# Low-cardinality columns stored dictionary-encoded in Parquet
+RECORD_DICTIONARY_COLUMNS = ("Category", "Page Name", "Page URL", "Status", "Platforms")
+
+LIBRARY_ID_PATTERN = re.compile(r"Library ID:?\s*(\d+)")
+STARTED_PATTERN = re.compile(r"Started running on\s+(.+?\d{4})")
+STARTED_FORMATS = ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y")
+STATUSES = {"active": "active", "inactive": "inactive"}
+# Platform icons carry their name in an accessibility attribute
+PLATFORM_NAMES = {name.lower(): name for name in
+                  ("Facebook", "Instagram", "Audience Network", "Messenger", "Threads", "WhatsApp")}
+PLATFORM_ATTRIBUTES = ("aria-label", "title", "alt")
+# Card texts that are labels, not ad copy
+LABEL_PATTERN = re.compile(r"^(?:Library ID|Started running|See (?:ad|summary) details|This ad has multiple versions)"
+                           r"|^(?:Active|Inactive|Platforms|Sponsored)$", re.IGNORECASE)
+
+# Finds the card root of every library ID not captured yet with the same rule as
+# card_roots(), marks it and returns its outerHTML. Must run before HARVEST_JS prunes cards.
+CAPTURE_AD_CARDS_JS = """
+const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, {
+    acceptNode: (node) => /Library ID/.test(node.nodeValue) ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_REJECT,
+});
+const idNodes = [];
+const counts = new Map();
+while (walker.nextNode()) {
+    const node = walker.currentNode.parentElement;
+    idNodes.push(node);
+    for (let el = node; el; el = el.parentElement) counts.set(el, (counts.get(el) || 0) + 1);
+}
+const cards = [];
+idNodes.forEach((node) => {
+    let root = node;
+    while (root.parentElement && counts.get(root.parentElement) === 1) root = root.parentElement;
+    if (root.closest('[data-ad-recorded]')) return;
+    root.setAttribute('data-ad-recorded', '1');
+    cards.push(root.outerHTML);
+});
+return cards;
+"""
+
+class AdRecord:
+    """One Ad Library card, with repeated strings interned.
+
+    Slots keep a record at about 100 bytes plus its library ID and ad copy;
+    category, page, status and platform values are shared between records.
+    """
+
+    __slots__ = ("library_id", "category", "page_name", "page_url", "status", "started", "platforms", "ad_copy")
+
+    def __init__(self, library_id, category, page_name="", page_url="", status="", started="", platforms=(),
+                 ad_copy=""):
+        self.library_id = library_id
+        self.category = sys.intern(category)
+        self.page_name = sys.intern(page_name)
+        self.page_url = sys.intern(page_url)
+        self.status = sys.intern(status)
+        self.started = sys.intern(started)
+        self.platforms = _intern_platforms(platforms)
+        self.ad_copy = ad_copy
+
+    def row(self):
+        """Return the record in RECORD_HEADER order."""
+        return (self.library_id, self.category, self.page_name, self.page_url, self.status, self.started,
+                ";".join(self.platforms), self.ad_copy)
+
+    def __reduce__(self):
+        # Records travel back from crawl worker processes
+        return AdRecord, (self.library_id, self.category, self.page_name, self.page_url, self.status, self.started,
+                          self.platforms, self.ad_copy)
+
+    def __repr__(self):
+        return f"AdRecord({self.library_id!r}, {self.category!r}, {self.page_name!r}, {self.status!r}, {self.started!r})"
+
+# Distinct platform combinations, each stored once
+_platform_tuples = {}
+
+def _intern_platforms(platforms):
+    platforms = tuple(sys.intern(platform) for platform in platforms)
+    return _platform_tuples.setdefault(platforms, platforms)
+
+def card_roots(soup):
+    """Return the card element of every library ID in a parsed document, in document order.
+
+    A card is the largest element containing exactly one library ID.
+    """
+    id_elements = [text.parent for text in soup.find_all(string=LIBRARY_ID_PATTERN)]
+    counts = {}
+    for element in id_elements:
+        for ancestor in (element, *element.parents):
+            counts[id(ancestor)] = counts.get(id(ancestor), 0) + 1
+    roots = []
+    for element in id_elements:
+        root = element
+        while root.parent is not None and counts.get(id(root.parent)) == 1:
+            root = root.parent
+        roots.append(root)
+    return roots
+
+def record_from_card(card, category):
+    """Read an AdRecord from a card element, or None if it has no library ID."""
+    texts = list(card.stripped_strings)
+    text = " ".join(texts)
+    match = LIBRARY_ID_PATTERN.search(text)
+    if not match:
+        return None
+    status = next((STATUSES[value.lower()] for value in texts if value.lower() in STATUSES), "")
+    started = STARTED_PATTERN.search(text)
+
+    page_name = page_url = ""
+    for link in card.find_all("a", href=True):
+        url = canonicalize_url(link["href"])
+        if url and url.startswith(CANONICAL_FACEBOOK_ORIGIN) and "/l.php" not in url:
+            # The page is linked from its name; a logo link without text may come first
+            page_url = page_url or url
+            name = link.get_text(" ", strip=True)
+            if name and not LABEL_PATTERN.match(name):
+                page_name, page_url = name, url
+                break
+
+    platforms = set()
+    for element in card.find_all(lambda tag: any(tag.has_attr(attribute) for attribute in PLATFORM_ATTRIBUTES)):
+        for attribute in PLATFORM_ATTRIBUTES:
+            name = PLATFORM_NAMES.get((element.get(attribute) or "").strip().lower())
+            if name:
+                platforms.add(name)
+
+    # The ad copy is taken to be the longest text that is not a label or the page name
+    copy = max((value for value in texts if value != page_name and not LABEL_PATTERN.match(value)),
+               key=len, default="")
+    return AdRecord(match.group(1), category, page_name, page_url, status,
+                    _parse_started(started.group(1)) if started else "", sorted(platforms), copy)
+
+def _parse_started(value):
+    """Return a start date as YYYY-MM-DD, or as written if its format is unknown."""
+    for fmt in STARTED_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value.strip()
+
+def records_from_html(html, category):
+    """Extract the ad records of a page source or of captured card fragments.
+
+    Returns:
+        list: AdRecord objects in document order
+    """
+    if not html or "Library ID" not in html:
+        return []
+    with METRICS.timer("record_extraction", category=category):
+        records = [record_from_card(card, category) for card in card_roots(make_soup(html))]
+    records = [record for record in records if record is not None]
+    METRICS.incr("ad_records", len(records))
+    return records
+
+def capture_ad_cards(driver):
+    """Return the HTML of ad cards loaded since the previous call, each card once.
+
+    Args:
+        driver: Selenium WebDriver instance with the feed loaded
+
+    Returns:
+        list: outerHTML strings, in document order
+    """
+    return driver.execute_script(CAPTURE_AD_CARDS_JS) or []
+
+class AdRecordStore:
+    """Thread-safe in-memory collection of a run's ad records, one per library ID and category.
+
+    Example:
+        store = AdRecordStore()
+        store.add(records_from_html(page_source, "cloth"))
+        store.write()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+
+    def add(self, records):
+        """Add records, keeping the first one seen for each library ID and category.
+
+        Returns:
+            int: Number of records that were new
+        """
+        with self._lock:
+            before = len(self._records)
+            for record in records:
+                self._records.setdefault((record.library_id, record.category), record)
+            return len(self._records) - before
+
+    def __len__(self):
+        return len(self._records)
+
+    def records(self):
+        """Return the records sorted by category and library ID."""
+        with self._lock:
+            return [self._records[key] for key in sorted(self._records, key=lambda key: (key[1], key[0]))]
+
+    def write(self, path=None, fmt=None):
+        """Write the records to a columnar file.
+
+        Args:
+            path: Output path, defaults to contents/ads_<date><ext>
+            fmt: Output format, defaults to RECORD_SETTINGS["format"]; Parquet
+                 falls back to gzip CSV when pyarrow is not installed
+
+        Returns:
+            str: The path written
+        """
+        if path is None:
+            fmt = fmt or RECORD_SETTINGS["format"]
+            if fmt == "parquet":
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    print("pyarrow is not installed, writing ad records as gzip CSV instead of Parquet")
+                    fmt = "csv.gz"
+            path = get_output_file(extension=format_extension(fmt), prefix="ads")
+        with METRICS.timer("record_write"), RowWriter(path, RECORD_HEADER, RECORD_DICTIONARY_COLUMNS) as writer:
+            writer.write_many(record.row() for record in self.records())
+        print(f"Wrote {len(self)} ad records to {path}")
+        return path
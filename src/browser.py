@@ -2,17 +2,52 @@
 Browser setup and management for the Facebook Ad Scraper.
 """
 
+import os
+import threading
+try:
+    import fcntl
+except ImportError:  # Windows: profile slots are only tracked within this process
+    fcntl = None
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from src.config import BROWSER_SETTINGS, SCRAPER_SETTINGS
+from src.metrics import METRICS
+from src.watchdog import register_browser
 
-def setup_driver():
+# Content settings that stop Chrome from fetching or decoding images at all
+BLOCKING_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+# Persistent profile directories held by live drivers of this process, Chrome refuses to share one,
+# with the open lock file that claims each one across processes (crawl workers of main.py --processes)
+_profiles_in_use = {}
+_profiles_lock = threading.Lock()
+
+# File inside a profile directory locked by the process whose driver uses it
+PROFILE_LOCK_FILE = ".scraper.lock"
+
+def setup_driver(profile="scrape", page_load_timeout=None, script_timeout=None, block_resources=None,
+                 capture_network=None):
     """Set up and return a configured Chrome WebDriver.
-    
+
+    Args:
+        profile: Name of the persistent profile family, e.g. "scrape" or "phone"
+        page_load_timeout: Seconds before driver.get() gives up, defaults to SCRAPER_SETTINGS["page_load_timeout"]
+        script_timeout: Seconds allowed for async scripts, defaults to SCRAPER_SETTINGS["script_timeout"]
+        block_resources: Block images, media, fonts and trackers, defaults to BROWSER_SETTINGS["block_resources"]
+        capture_network: Record network events in the performance log, defaults to True for the
+            "scrape" profile when SCRAPER_SETTINGS["harvest_mode"] is "network" or "replay"
+
     Returns:
         webdriver.Chrome: Configured Chrome WebDriver instance
     """
+    if block_resources is None:
+        block_resources = BROWSER_SETTINGS["block_resources"]
+    if capture_network is None:
+        capture_network = profile == "scrape" and SCRAPER_SETTINGS["harvest_mode"] in ("network", "replay")
     chrome_options = Options()
     
     # Apply browser settings from config
@@ -26,17 +61,134 @@ def setup_driver():
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = BROWSER_SETTINGS["page_load_strategy"]
+    if block_resources:
+        chrome_options.add_experimental_option("prefs", BLOCKING_PREFS)
+    if capture_network:
+        # Lets src/network_harvester.py read search responses through driver.get_log("performance")
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
     
     # Add a realistic user agent
     chrome_options.add_argument(f"--user-agent={BROWSER_SETTINGS['user_agent']}")
     
+    profile_dir = _claim_profile_dir(profile)
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    
     # Create a service object with increased timeout
     chrome_service = Service(timeout=SCRAPER_SETTINGS["http_timeout"])
     
-    driver = webdriver.Chrome(options=chrome_options, service=chrome_service)
+    try:
+        with METRICS.timer("driver_startup", profile=profile, warm=bool(profile_dir and os.listdir(profile_dir))):
+            driver = webdriver.Chrome(options=chrome_options, service=chrome_service)
+    except Exception:
+        _release_profile_dir(profile_dir)
+        raise
+    driver.profile_dir = profile_dir
+    # Lets the watchdog clean up this driver's browser, and only it, if chromedriver dies
+    register_browser(driver)
     
     # Set timeouts from SCRAPER_SETTINGS
-    driver.set_script_timeout(SCRAPER_SETTINGS["script_timeout"])
-    driver.set_page_load_timeout(SCRAPER_SETTINGS["page_load_timeout"])
+    driver.set_script_timeout(script_timeout or SCRAPER_SETTINGS["script_timeout"])
+    driver.set_page_load_timeout(page_load_timeout or SCRAPER_SETTINGS["page_load_timeout"])
+    
+    if block_resources:
+        block_urls(driver, BROWSER_SETTINGS["blocked_url_patterns"])
     
     return driver
+
+def block_urls(driver, patterns):
+    """Stop the browser from requesting URLs matching any of `patterns` (* wildcards).
+
+    Args:
+        driver: Chrome WebDriver instance
+        patterns: URL patterns passed to the DevTools Network.setBlockedURLs command
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+    except Exception as e:
+        # Image blocking through prefs still applies, the rest is an optimization
+        print(f"Could not enable request blocking: {e}")
+
+def recycle_tab(driver, url=None, block_resources=None):
+    """Replace the driver's tab with a fresh one and load `url` in it.
+
+    Closing the tab tears down its renderer process, freeing everything the
+    page accumulated, while the browser, its profile and cookies are kept.
+
+    Args:
+        driver: Chrome WebDriver instance
+        url: URL to load in the new tab, defaults to the current URL
+        block_resources: Re-apply request blocking to the new tab, defaults to BROWSER_SETTINGS["block_resources"]
+    """
+    if block_resources is None:
+        block_resources = BROWSER_SETTINGS["block_resources"]
+    url = url or driver.current_url
+    old_handle = driver.current_window_handle
+    driver.switch_to.new_window("tab")
+    new_handle = driver.current_window_handle
+    driver.switch_to.window(old_handle)
+    driver.close()
+    driver.switch_to.window(new_handle)
+    if block_resources:
+        block_urls(driver, BROWSER_SETTINGS["blocked_url_patterns"])
+    driver.get(url)
+
+def quit_driver(driver):
+    """Quit a driver created by setup_driver() and free its persistent profile."""
+    try:
+        driver.quit()
+    finally:
+        _release_profile_dir(getattr(driver, "profile_dir", None))
+
+def _claim_profile_dir(profile):
+    """Reserve the first persistent profile directory of `profile` not used by a live driver.
+
+    Slots are claimed with an exclusive flock on a file inside them, so drivers
+    of other processes skip them too; the lock goes away with its process.
+
+    Returns:
+        str: Directory path, or None if persistent profiles are disabled
+    """
+    base = BROWSER_SETTINGS["user_data_dir"]
+    if not base:
+        return None
+    with _profiles_lock:
+        slot = 0
+        while True:
+            path = os.path.join(base, f"{profile}_{slot}")
+            slot += 1
+            if path in _profiles_in_use:
+                continue
+            os.makedirs(path, exist_ok=True)
+            lock_file = _lock_profile_dir(path)
+            if lock_file is not False:
+                _profiles_in_use[path] = lock_file
+                return path
+
+def _lock_profile_dir(path):
+    """Lock a profile directory for this process.
+
+    Returns:
+        The open lock file (None without fcntl), or False if another process holds the directory
+    """
+    if fcntl is None:
+        return None
+    lock_file = open(os.path.join(path, PROFILE_LOCK_FILE), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    return lock_file
+
+def _release_profile_dir(path):
+    """Make a profile directory available to the next driver."""
+    if path:
+        with _profiles_lock:
+            lock_file = _profiles_in_use.pop(path, None)
+        if lock_file is not None:
+            # Closing the file releases its flock
+            lock_file.close()
@@ -0,0 +1,148 @@
+"""
+Durable crawl checkpoints for the Facebook Ad Scraper.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from src.config import CHECKPOINT_FILE
+
+class CheckpointStore:
+    """SQLite-backed record of crawl progress that survives crashes and timeouts.
+
+    Tracks which shards (or plain categories) are done, how many pairs each
+    has harvested so far and every (category, URL) pair found, keyed by the
+    shard that found it so the shards of one category restore only their own
+    pairs. Pairs are flushed as soon as they are harvested, so a killed run
+    loses at most one batch.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        """Open (or create) the checkpoint database.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # Worker processes of one crawl share the file, wait for each other's writes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS categories (
+                category TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                harvested INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pairs (
+                shard TEXT NOT NULL,
+                category TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (shard, category, url)
+            );
+        """)
+        self._conn.commit()
+
+    def reset(self):
+        """Forget all progress, used when starting a fresh (non-resumed) run."""
+        with self._lock:
+            self._conn.execute("DELETE FROM categories")
+            self._conn.execute("DELETE FROM pairs")
+            self._conn.commit()
+
+    def completed_categories(self):
+        """Return the set of categories that finished in a previous run."""
+        with self._lock:
+            rows = self._conn.execute("SELECT category FROM categories WHERE status = 'done'").fetchall()
+        return {row[0] for row in rows}
+
+    def mark_started(self, category):
+        """Record that a category is being crawled."""
+        self._set_status(category, "in_progress")
+
+    def mark_done(self, category):
+        """Record that a category finished and must not be crawled again on resume."""
+        self._set_status(category, "done")
+
+    def mark_failed(self, category):
+        """Record that every attempt at a category failed; it is retried on resume."""
+        self._set_status(category, "failed")
+
+    def record_pairs(self, category, pairs):
+        """Append newly harvested pairs and add them to the harvested count.
+
+        Args:
+            category: The shard key (or category) the pairs were harvested for
+            pairs: Iterable of (category, URL) tuples
+        """
+        rows = [(category, pair_category, url) for pair_category, url in pairs]
+        with self._lock:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO pairs (shard, category, url) VALUES (?, ?, ?)", rows).rowcount
+            self._conn.execute(
+                "INSERT INTO categories (category, status, harvested, updated_at) VALUES (?, 'in_progress', ?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET harvested = harvested + excluded.harvested, "
+                "updated_at = excluded.updated_at",
+                (category, max(inserted, 0), time.time()),
+            )
+            self._conn.commit()
+
+    def load_pairs(self, category=None):
+        """Return the stored (category, URL) pairs.
+
+        Args:
+            category: Only return pairs recorded for this shard key (or category) if given
+
+        Returns:
+            set: Set of (category, URL) tuples
+        """
+        with self._lock:
+            if category is None:
+                rows = self._conn.execute("SELECT DISTINCT category, url FROM pairs").fetchall()
+            else:
+                rows = self._conn.execute("SELECT category, url FROM pairs WHERE shard = ?", (category,)).fetchall()
+        return {(cat, url) for cat, url in rows}
+
+    def progress(self):
+        """Return a dict mapping category to (status, harvested count)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT category, status, harvested FROM categories").fetchall()
+        return {cat: (status, harvested) for cat, status, harvested in rows}
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _migrate(self):
+        """Key the pairs of a checkpoint written before pairs had a shard column by their category."""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pairs)")]
+        if not columns or "shard" in columns:
+            return
+        self._conn.executescript("""
+            ALTER TABLE pairs RENAME TO pairs_unsharded;
+            CREATE TABLE pairs (
+                shard TEXT NOT NULL,
+                category TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (shard, category, url)
+            );
+            INSERT INTO pairs (shard, category, url) SELECT category, category, url FROM pairs_unsharded;
+            DROP TABLE pairs_unsharded;
+        """)
+        self._conn.commit()
+
+    def _set_status(self, category, status):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO categories (category, status, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (category, status, time.time()),
+            )
+            self._conn.commit()
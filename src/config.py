@@ -4,6 +4,7 @@ Configuration settings for the Facebook Ad Scraper.
 
 import os
 import datetime
+import json
 
 # Define the list of categories to search for
 # CATEGORIES = [
@@ -27,34 +28,270 @@ import datetime
 
 CATEGORIES = ["cloth"]
 
+# Search dimensions crawled for every category; each combination is one shard (see src/shards.py)
+COUNTRIES = ["BD"]
+ACTIVE_STATUSES = ["all"]  # "all", "active" or "inactive"
+MEDIA_TYPES = ["all"]  # "all", "image", "video", "meme" or "none"
+
+# Shards of higher-priority categories are crawled first, the default priority is 0
+CATEGORY_PRIORITIES = {}
+
 # Base URL for Facebook Ad Library
 # BASE_URL = "https://www.facebook.com/ads/library/?active_status=active&ad_type=all&country=BD&is_targeted_country=false&media_type=all&q={CATEGORY}&search_type=keyword_unordered"
-BASE_URL = "https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=BD&is_targeted_country=false&media_type=all&q={CATEGORY}&search_type=keyword_unordered"
+BASE_URL = "https://www.facebook.com/ads/library/?active_status={ACTIVE_STATUS}&ad_type=all&country={COUNTRY}&is_targeted_country=false&media_type={MEDIA_TYPE}&q={CATEGORY}&search_type=keyword_unordered"
 
 # Output directory path
 OUTPUT_DIR = "contents"
 
+# Cross-run index of discovered pages and phone lookups, kept with the outputs
+URL_INDEX_FILE = os.path.join(OUTPUT_DIR, "url_index.sqlite3")
+
+# Checkpoint database used to resume interrupted crawls (python main.py --resume)
+CHECKPOINT_FILE = os.path.join("checkpoints", "crawl.sqlite3")
+
+# Output file format and merge settings (see src/output_formats.py)
+OUTPUT_SETTINGS = {
+    "format": "csv",  # "csv", "csv.gz" or "parquet" (needs pyarrow)
+    "parquet_row_group": 50000,  # Rows buffered per Parquet row group
+    "merge_chunk_rows": 200000,  # Rows sorted in memory at once by the merge command
+}
+
 # Function to generate output file path with current date
-def get_output_file():
-    """Generate output file path with current date as filename."""
+def get_output_file(suffix="", extension=".csv", prefix="ad"):
+    """Generate output file path with current date as filename, e.g. ad_<date>_shard1of4.csv for suffix "_shard1of4"."""
     today = datetime.datetime.now().astimezone(datetime.timezone(datetime.timedelta(hours=6))).strftime("%d-%m-%Y_%H:%M")
-    return os.path.join(OUTPUT_DIR, f"ad_{today}.csv")
+    return os.path.join(OUTPUT_DIR, f"{prefix}_{today}{suffix}{extension}")
 
 # Browser settings
 BROWSER_SETTINGS = {
     "headless": True,
     "window_size": "1920,1080",
-    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "page_load_strategy": "eager",  # Return from driver.get() at DOMContentLoaded instead of the full load event
+    "block_resources": True,  # Skip images, media, fonts and trackers the scrapers never read
+    "blocked_url_patterns": [
+        "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.ico", "*.svg",
+        "*.mp4", "*.webm", "*.m4a", "*.mp3",
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*video*.fbcdn.net/*",
+        "*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*",
+        "*connect.facebook.net/*", "*facebook.com/tr?*",
+    ],
+    # Persistent Chrome profiles (one per concurrent driver) keep the HTTP cache warm across
+    # recycled drivers and runs; None starts every driver with a throwaway profile
+    "user_data_dir": "browser_profiles",
 }
 
 # Scraper settings
 SCRAPER_SETTINGS = {
     "max_scroll_attempts": 100,
-    "scroll_delay": 5,
-    "page_load_timeout": 21600,
-    "script_timeout": 21600,
+    "scroll_delay": 5,  # Maximum seconds to wait for new cards after each scroll
+    "scroll_stable_rounds": 3,  # Stop after this many consecutive scrolls add nothing
+    "card_selector": "div._3qn7, a[target='_blank']",  # Elements counted as feed growth
+    # "stream" harvests links in-browser while scrolling, "page_source" parses once at the end,
+    # "network" reads the Ad Library's search JSON from the performance log while scrolling and
+    # "replay" pages through that search endpoint over HTTP once its first request is captured
+    "harvest_mode": "stream",
+    "replay_max_pages": 1000,  # Search result pages fetched at most in "replay" mode
+    "search_cursor_param": "forward_cursor",  # Request parameter carrying the pagination cursor
+    "harvest_every": 5,  # Scrolls between in-browser harvests in stream mode
+    "prune_harvested": False,  # Empty already harvested cards to keep the tab's memory flat
+    "prune_keep": 20,  # Newest cards left intact when pruning
+    "parser_backend": "auto",  # "auto", "selectolax", "lxml" or "html.parser", see src/html_parsers.py
+    "parse_workers": None,  # Processes sharing a large page_source parse, defaults to every core (see src/parallel_parse.py)
+    "parallel_parse_min_mb": 4,  # Page dumps smaller than this are parsed in-process
+    "page_load_timeout": 120,  # Seconds before a page load counts as failed
+    "script_timeout": 60,  # Seconds allowed for an async script, e.g. one scroll and its wait
     "http_timeout": 21600,  # Timeout for HTTP connections to WebDriver
     "max_retries": 1,
-    "retry_delay": 5,
-    "category_delay": 5
+    "retry_delay": 5,  # Scale of the jittered backoff before the first retry
+    "retry_backoff": 2,  # Growth factor of the backoff after each failed attempt
+    "pool_size": 4,  # Number of Chrome instances crawling categories in parallel
+    "driver_max_uses": 5  # Categories a driver handles before it is recycled
+}
+
+# Phone extractor settings
+PHONE_EXTRACTOR_SETTINGS = {
+    "workers": 4,  # Concurrent Chrome instances
+    "url_timeout": 30,  # Page load timeout per URL in seconds
+    "ordered": False,  # Write results in input order instead of completion order
+    "stats_every": 25,  # Print throughput stats after this many URLs
+    "http_first": True,  # Try a plain HTTP fetch before loading a page in Chrome
+    "browser_fallback": True,  # Use Chrome when the HTTP fetch finds nothing or hits a JS/login wall
+    "lookup_ttl": 30 * 24 * 3600,  # Seconds before a page's phone lookup is considered stale
+    "country_code": "880",  # Calling code of national numbers when normalizing to E.164 (see src/phone_numbers.py)
+    "phone_strategies": ["tel", "json_ld", "meta", "about", "text"]  # Tried cheapest first, the first hit wins
+}
+
+# Opt-in cache of fetched HTML for re-parsing without re-scraping (see src/snapshot_cache.py and reparse.py)
+SNAPSHOT_SETTINGS = {
+    "enabled": False,  # Also turned on by --snapshots
+    "dir": "page_snapshots",  # Compressed objects and their SQLite index
+    "max_mb": 2048,  # Compressed size kept before least recently used snapshots are evicted
+    "compression_level": 6,  # gzip level of stored objects
+    "reparse_workers": None  # Processes used by reparse.py, defaults to every core
+}
+
+# Ad-level records (library ID, start date, status, platforms, page name, ad copy), see src/ad_records.py
+RECORD_SETTINGS = {
+    "enabled": False,  # Also turned on by --records; needs the "stream" or "page_source" harvest mode
+    "format": "parquet",  # Columnar output, falls back to "csv.gz" without pyarrow
+}
+
+# Memory watchdog for long feed scrolls (see src/memory_guard.py); sized so a 7 GB runner
+# holds SCRAPER_SETTINGS["pool_size"] browsers plus the Python process
+MEMORY_SETTINGS = {
+    "enabled": True,  # Recycle the tab and resume the feed when the threshold is crossed
+    "browser_limit_mb": 1200,  # PSS of one driver's Chrome process tree
+    "max_recycles": 10  # Tab and driver recycles per shard before the shard fails at the threshold
+}
+
+# Driver liveness watchdog and self-healing restarts (see src/watchdog.py)
+WATCHDOG_SETTINGS = {
+    "enabled": True,  # Heartbeat drivers in use and restart crashed ones instead of failing the attempt
+    "heartbeat_interval": 10,  # Seconds between heartbeat scripts
+    "heartbeat_timeout": 15,  # Seconds a crash check waits for the heartbeat to be answered
+    "stall_timeout": 180,  # Seconds without an answered heartbeat before a driver is killed;
+                           # above the page load and script timeouts, which fail a healthy browser first
+    "max_restarts": 3,  # Driver restarts per shard attempt
+    "kill_orphans": True  # Kill Chrome browsers left behind by a dead chromedriver after a crash
+}
+
+# Keep-alive HTTP client settings for the phone extractor's fast path
+HTTP_SETTINGS = {
+    "pool_size": 8,  # Connections kept open per host
+    "timeout": 15,  # Request timeout in seconds
+    "max_retries": 1  # Connection-level retries
+}
+
+# Adaptive per-domain pacing shared by every driver and HTTP worker (see src/rate_limiter.py)
+RATE_LIMIT_SETTINGS = {
+    "rate": 0.5,  # Initial page loads per second per domain
+    "min_rate": 0.05,
+    "max_rate": 4.0,
+    "burst": 2,  # Tokens a bucket can hold, i.e. back-to-back loads allowed after an idle spell
+    "increase": 0.05,  # Additive rate increase after each healthy response
+    "decrease": 0.5,  # Multiplicative rate decrease on a login/checkpoint redirect, empty result, 429/503 or timeout
+    "penalty_pause": 5,  # Scale in seconds of the jittered pause after a throttling signal
+    "max_backoff": 300  # Cap in seconds of any backoff pause
+}
+
+# Streaming discovery -> phone extraction pipeline (python pipeline.py)
+PIPELINE_SETTINGS = {
+    "queue_size": 100,  # Page URLs buffered between the stages; a full queue pauses scrolling
+}
+
+# Logging level for per-link and per-URL detail ("DEBUG" shows every harvested link)
+LOG_LEVEL = os.environ.get("SCRAPER_LOG_LEVEL", "INFO")
+
+# Run metrics settings
+METRICS_SETTINGS = {
+    "dir": "metrics",  # Directory for run summaries when no explicit path is given
+    "prometheus_prefix": "fb_ad_scraper"  # Metric name prefix for .prom textfiles
 }
+
+# Settings overridden by a config file or --set (see cli.py), as {name: value or {key: value}}
+_applied = {}
+
+def _resolve_setting(name):
+    """Return the module-level setting a config key refers to, e.g. "scraper" -> "SCRAPER_SETTINGS"."""
+    for candidate in (name.upper(), f"{name.upper()}_SETTINGS"):
+        if candidate in globals() and not callable(globals()[candidate]):
+            return candidate
+    raise ValueError(f"Unknown setting '{name}'")
+
+def apply_settings(overrides):
+    """Override settings from a mapping such as a parsed config file.
+
+    Dict settings are updated key by key and list settings are replaced in
+    place, so modules that already imported them see the new values. Other
+    values (OUTPUT_DIR, LOG_LEVEL...) are rebound here and only reach modules
+    imported afterwards, which is why cli.py applies the config before
+    importing any command.
+
+    Args:
+        overrides: Mapping of setting names ("scraper" or "SCRAPER_SETTINGS",
+            "categories"...) to a value, or to a mapping of keys for dict settings
+
+    Raises:
+        ValueError: If a setting or one of its keys does not exist, or a list setting gets a table
+    """
+    for name, value in overrides.items():
+        target_name = _resolve_setting(name)
+        target = globals()[target_name]
+        if isinstance(target, dict) and target and isinstance(value, dict):
+            unknown = sorted(set(value) - set(target))
+            if unknown:
+                raise ValueError(f"Unknown {target_name} keys: {', '.join(unknown)}")
+            target.update(value)
+            _applied.setdefault(target_name, {}).update(value)
+        elif isinstance(target, list):
+            if value is None or isinstance(value, dict):
+                raise ValueError(f"{target_name} expects a list, got {value!r}")
+            # List settings hold strings; a scalar such as `--set categories=2024` is a one-item list
+            values = value if isinstance(value, (list, tuple)) else [value]
+            target[:] = [str(item) for item in values]
+            _applied[target_name] = list(target)
+        elif isinstance(target, dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"{target_name} expects a table of keys, got {value!r}")
+            target.clear()
+            target.update(value)
+            _applied[target_name] = dict(target)
+        else:
+            globals()[target_name] = value
+            _applied[target_name] = value
+
+def parse_override(text):
+    """Parse a command-line override such as "scraper.pool_size=2" or "categories=cloth,Fashion".
+
+    Values are read as JSON (numbers, true/false, null, lists) and fall back
+    to plain strings; a comma separated string becomes a list.
+
+    Returns:
+        dict: Overrides for apply_settings()
+    """
+    path, sep, raw = text.partition("=")
+    if not sep or not path.strip():
+        raise ValueError(f"Expected NAME=VALUE or NAME.KEY=VALUE, got '{text}'")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = [item.strip() for item in raw.split(",")] if "," in raw else raw
+    name, _, key = path.strip().partition(".")
+    return {name: {key: value}} if key else {name: value}
+
+def load_config(path):
+    """Read a TOML (.toml) or YAML (.yaml, .yml) config file into a mapping for apply_settings().
+
+    Example (TOML):
+        categories = ["cloth", "Fashion"]
+
+        [scraper]
+        pool_size = 2
+        scroll_delay = 3
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("TOML config files need the tomli package before Python 3.11 "
+                                  "(pip install -r requirements.txt)") from None
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML config files need the PyYAML package (pip install pyyaml), or use TOML") from None
+        with open(path, encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"Cannot tell the format of config file '{path}', expected .toml, .yaml or .yml")
+
+def applied_settings():
+    """Return the overrides applied so far, e.g. to record them with a run or replay them in a worker process."""
+    return {name: dict(value) if isinstance(value, dict) else value for name, value in _applied.items()}
@@ -3,41 +3,246 @@ Data handling functions for the Facebook Ad Scraper.
 """
 
 import csv
+import glob
 import os
+import threading
 from datetime import datetime # Added datetime
-from src.config import get_output_file, OUTPUT_DIR
+from src.config import get_output_file, OUTPUT_DIR, OUTPUT_SETTINGS
+from src.metrics import METRICS
+from src.output_formats import FORMATS, RowWriter, detect_format, external_sort_unique, format_extension, read_rows
+from src.url_utils import canonicalize_url
 
 PHONE_NUMBERS_DIR = "phone_numbers" # New directory constant
 
-def save_to_csv(unique_category_url_pairs):
-    """Save the unique (category, URL) pairs to a CSV file.
+PAIRS_HEADER = ["Category", "Page URL"]
+
+class PairsOutput:
+    """Streams (category, URL) pairs to the scraper's output file as they are found.
+
+    Pairs are canonicalized and written once each. When a UrlIndex is given,
+    every batch is also recorded in it and pairs whose page no earlier run
+    has seen are streamed to a "<output>_new" delta file alongside.
+
+    Example:
+        with PairsOutput(url_index=url_index) as output:
+            output.write(batch_of_pairs)
+    """
+
+    def __init__(self, url_index=None, suffix="", fmt=None, path=None):
+        """Open the output (and delta) file.
+
+        Args:
+            url_index: Optional UrlIndex recording the pairs and deciding what goes to the delta file
+            suffix: Appended to the output file name, e.g. "_shard1of4"
+            fmt: "csv", "csv.gz" or "parquet", defaults to OUTPUT_SETTINGS["format"]
+            path: Output path, defaults to a timestamped file in OUTPUT_DIR
+        """
+        self.path = path or get_output_file(suffix, format_extension(fmt))
+        extension = FORMATS[detect_format(self.path)]
+        self.url_index = url_index
+        self._seen = set()
+        self._new_urls = set()
+        self._lock = threading.Lock()
+        self._writer = RowWriter(self.path, PAIRS_HEADER)
+        self._delta = None
+        if url_index is not None:
+            self.delta_path = f"{self.path[:-len(extension)]}_new{extension}"
+            self._delta = RowWriter(self.delta_path, PAIRS_HEADER)
+
+    def write(self, pairs):
+        """Write the pairs not written before.
+
+        Args:
+            pairs: Iterable of (category, URL) tuples
+        """
+        with self._lock, METRICS.timer("csv_write", file=self.path):
+            batch = []
+            for cat, page_url in pairs:
+                pair = (cat, canonicalize_url(page_url) or page_url)
+                if pair not in self._seen:
+                    self._seen.add(pair)
+                    batch.append(pair)
+            if not batch:
+                return
+            self._writer.write_many(batch)
+            if self._delta is not None:
+                self._new_urls |= self.url_index.record_pairs(batch)
+                self._delta.write_many(pair for pair in batch if pair[1] in self._new_urls)
+
+    def close(self):
+        """Close the files and print a summary."""
+        with self._lock:
+            self._writer.close()
+            print(f"Successfully saved {self._writer.count} unique (category, URL) pairs to {self.path}")
+            if self._delta is not None:
+                self._delta.close()
+                print(f"Saved {self._delta.count} pairs for {len(self._new_urls)} pages new since the last run "
+                      f"to {self.delta_path}")
+                self._delta = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def save_to_csv(unique_category_url_pairs, url_index=None, suffix="", fmt=None):
+    """Save the unique (category, URL) pairs to an output file.
     
     Args:
         unique_category_url_pairs: Set of tuples containing (category, URL) pairs
+        url_index: Optional UrlIndex; when given, the pairs are recorded in it and
+            pairs whose page was not seen by any earlier run are also written
+            to a "<output>_new.csv" delta file
+        suffix: Appended to the output file name, e.g. "_shard1of4"
+        fmt: "csv", "csv.gz" or "parquet", defaults to OUTPUT_SETTINGS["format"]
         
     Returns:
         bool: True if successful, False otherwise
     """
+    output_file = None
     try:
-        # Ensure output directory exists
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
-        # Get the output file path with current date
-        output_file = get_output_file()
-        
-        with open(output_file, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            # Write the header row
-            writer.writerow(["Category", "Page URL"])
-            # Write the unique (category, URL) pairs
-            for cat, page_url in sorted(list(unique_category_url_pairs)):
-                writer.writerow([cat, page_url])
-        print(f"Successfully saved {len(unique_category_url_pairs)} unique (category, URL) pairs to {output_file}")
+        with PairsOutput(url_index=url_index, suffix=suffix, fmt=fmt) as output:
+            output_file = output.path
+            output.write(sorted(unique_category_url_pairs))
         return True
     except IOError as e:
         print(f"Error writing to CSV file {output_file}: {e}")
         return False
 
+def historical_outputs(directory=OUTPUT_DIR):
+    """Return the scraper outputs in a directory, excluding "_new" delta files."""
+    paths = []
+    for extension in FORMATS.values():
+        paths += glob.glob(os.path.join(directory, f"ad_*{extension}"))
+    return sorted(path for path in set(paths)
+                  if not any(path.endswith(f"_new{extension}") for extension in FORMATS.values()))
+
+def merge_outputs(paths=None, output_path=None, url_index=None, chunk_rows=None):
+    """Merge (category, URL) output files into one sorted, deduplicated file.
+
+    Uses an external merge sort, so memory stays bounded by chunk_rows however
+    many historical files there are.
+
+    Args:
+        paths: CSV, gzip CSV or Parquet files with "Category" and "Page URL" columns,
+            defaults to every historical output in OUTPUT_DIR
+        output_path: Merged file, defaults to OUTPUT_DIR/merged<extension of OUTPUT_SETTINGS["format"]>
+        url_index: Optional UrlIndex the merged pairs are recorded in
+        chunk_rows: Rows sorted in memory at once, defaults to OUTPUT_SETTINGS["merge_chunk_rows"]
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    paths = paths or historical_outputs()
+    output_path = output_path or os.path.join(OUTPUT_DIR, f"merged{format_extension()}")
+    if os.path.abspath(output_path) in map(os.path.abspath, paths):
+        paths = [path for path in paths if os.path.abspath(path) != os.path.abspath(output_path)]
+
+    def pairs():
+        for path in paths:
+            rows = 0
+            for row in read_rows(path):
+                page_url = row.get("Page URL") or row.get("URL")
+                if page_url:
+                    rows += 1
+                    yield (row.get("Category") or "", canonicalize_url(page_url) or page_url)
+            print(f"Read {rows} rows from {path}")
+
+    try:
+        with METRICS.timer("merge", files=len(paths)), RowWriter(output_path, PAIRS_HEADER) as writer:
+            batch = []
+            for pair in external_sort_unique(pairs(), chunk_rows=chunk_rows):
+                batch.append(pair)
+                if len(batch) >= 10000:
+                    writer.write_many(batch)
+                    if url_index is not None:
+                        url_index.record_pairs(batch)
+                    batch = []
+            writer.write_many(batch)
+            if url_index is not None and batch:
+                url_index.record_pairs(batch)
+        print(f"Merged {len(paths)} files into {writer.count} unique (category, URL) pairs in {output_path}")
+        return True
+    except ImportError as e:
+        print(f"Error merging outputs into {output_path}: {e}; Parquet needs `pip install pyarrow`")
+        return False
+    except (IOError, ValueError) as e:
+        print(f"Error merging outputs into {output_path}: {e}")
+        return False
+
+class PhoneNumbersCsvWriter:
+    """Streams (category, url, phone_number, tier, source) rows to a timestamped file in PHONE_NUMBERS_DIR.
+
+    Each row is flushed as soon as it is written, so results survive a crash
+    or timeout part way through an extraction run. A Parquet file is only
+    readable once closed, so when OUTPUT_SETTINGS["format"] is "parquet" the
+    default file is streamed as gzip CSV instead; an explicit .parquet path
+    is written per row group and finalized on close. Rows are keyed on
+    (category, canonical URL); repeated keys are skipped.
+
+    Example:
+        with PhoneNumbersCsvWriter() as writer:
+            writer.write({'category': 'cloth', 'url': url, 'phone_number': phone})
+    """
+
+    HEADER = ["Category", "URL", "Phone Number", "Tier", "Source"]
+
+    def __init__(self, path=None, fmt=None):
+        """Open the output file and write the header row.
+
+        Args:
+            path (str): Output path, defaults to a timestamped file in PHONE_NUMBERS_DIR
+            fmt (str): "csv", "csv.gz" or "parquet" for the default path, defaults to OUTPUT_SETTINGS["format"];
+                       "parquet" streams gzip CSV
+        """
+        if path is None:
+            if (fmt or OUTPUT_SETTINGS["format"]) == "parquet":
+                fmt = "csv.gz"
+            filename = f"extracted_phones_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{format_extension(fmt)}"
+            path = os.path.join(PHONE_NUMBERS_DIR, filename)
+        self.path = path
+        self.count = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._writer = RowWriter(path, self.HEADER, dictionary_columns=("Category", "Tier", "Source"))
+
+    def write(self, item):
+        """Append one result row and flush it to disk.
+
+        Args:
+            item (dict): Dictionary with 'category', 'url', 'phone_number' and optional 'tier' and 'source' keys
+        """
+        url = item.get('url', '')
+        url = canonicalize_url(url) or url
+        key = (item.get('category', ''), url)
+        with self._lock, METRICS.timer("phone.csv_write"):
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            self._writer.write([
+                item.get('category', ''),
+                url,
+                item.get('phone_number', ''),
+                item.get('tier', ''),
+                item.get('source', '')
+            ])
+            self.count += 1
+
+    def close(self):
+        """Close the output file."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                print(f"Successfully saved {self.count} records to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
 def save_phone_numbers_to_csv(data_list):
     """
     Saves data (category, url, phone_number) to a CSV file in the PHONE_NUMBERS_DIR.
@@ -59,14 +264,21 @@ def save_phone_numbers_to_csv(data_list):
             csv_writer = csv.writer(f)
             # Write the header row
             csv_writer.writerow(["Category", "URL", "Phone Number"])
-            # Write the data rows
+            # Write the data rows, skipping repeats of the same (category, canonical URL)
+            seen = set()
             for item in data_list:
+                url = item.get('url', '')
+                url = canonicalize_url(url) or url
+                key = (item.get('category', ''), url)
+                if key in seen:
+                    continue
+                seen.add(key)
                 csv_writer.writerow([
                     item.get('category', ''),
-                    item.get('url', ''),
+                    url,
                     item.get('phone_number', '')
                 ])
-        print(f"Successfully saved {len(data_list)} records to {full_path}")
+        print(f"Successfully saved {len(seen)} records to {full_path}")
         return True
     except IOError as e:
         print(f"Error saving phone numbers to CSV {full_path}: {e}")
@@ -0,0 +1,147 @@
+"""
+Bounded WebDriver pool for the Facebook Ad Scraper.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException
+from src.browser import quit_driver, setup_driver
+from src.config import SCRAPER_SETTINGS
+
+class DriverPool:
+    """A fixed-size pool of Chrome WebDriver instances shared between worker threads.
+
+    Drivers are created lazily, health-checked before being handed out and
+    recycled (quit and replaced) after ``max_uses`` checkouts, whenever a
+    caller reports them as broken or when they are flagged ``needs_recycle``
+    (e.g. by the memory guard).
+    """
+
+    def __init__(self, size=None, max_uses=None, factory=setup_driver):
+        """Create the pool.
+
+        Args:
+            size: Maximum number of live drivers, defaults to SCRAPER_SETTINGS["pool_size"]
+            max_uses: Checkouts before a driver is recycled, defaults to SCRAPER_SETTINGS["driver_max_uses"]
+            factory: Callable returning a new WebDriver instance
+        """
+        self.size = max(1, size or SCRAPER_SETTINGS["pool_size"])
+        self.max_uses = max_uses or SCRAPER_SETTINGS["driver_max_uses"]
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """Check out a healthy driver, creating one if the pool is not yet full.
+
+        Args:
+            timeout: Seconds to wait for a driver to be released, None waits forever
+
+        Returns:
+            webdriver.Chrome: A driver that passed its health check
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("DriverPool is closed")
+            with self._lock:
+                can_create = self._idle.empty() and self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                self._uses[id(driver)] = 0
+            else:
+                # Poll so that a slot freed by a discarded driver is noticed
+                try:
+                    driver = self._idle.get(timeout=0.5)
+                except queue.Empty:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError("Timed out waiting for a free driver")
+                    continue
+                if not self.is_healthy(driver):
+                    print("Discarding unhealthy driver from pool")
+                    self._discard(driver)
+                    continue
+            self._uses[id(driver)] += 1
+            return driver
+
+    def release(self, driver, healthy=True):
+        """Return a driver to the pool, recycling it if it is broken or worn out.
+
+        Args:
+            driver: Driver previously returned by acquire()
+            healthy: False if the caller hit an error that may have broken the session
+        """
+        if (not healthy or self._closed or getattr(driver, "needs_recycle", False)
+                or self._uses.get(id(driver), 0) >= self.max_uses):
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager that checks out a driver and releases it afterwards.
+
+        A driver is marked unhealthy if the body raises a WebDriverException.
+        """
+        driver = self.acquire(timeout=timeout)
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            self.release(driver, healthy=healthy)
+
+    @staticmethod
+    def is_healthy(driver):
+        """Check that the browser session still responds to commands.
+
+        Args:
+            driver: Selenium WebDriver instance
+
+        Returns:
+            bool: True if the driver answered a trivial script
+        """
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    def close(self):
+        """Quit every idle driver and refuse further checkouts."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot in the pool."""
+        self._uses.pop(id(driver), None)
+        try:
+            quit_driver(driver)
+        except Exception as e:
+            print(f"Error quitting driver: {e}")
+        with self._lock:
+            self._created -= 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,76 @@
+"""
+Incremental in-browser link harvesting for the Facebook Ad Scraper.
+"""
+
+from src.config import SCRAPER_SETTINGS
+
+# Collects hrefs from the same anchors the page_source parser looks at
+# (links inside div._3qn7 and links with target="_blank"), remembers what was
+# already returned in window.__fbAdHarvestSeen and only sends back new ones.
+# When pruning is on, the contents of fully harvested cards are dropped,
+# except for the newest few, so the DOM stops growing on long feeds.
+HARVEST_JS = """
+const prune = arguments[0];
+const keep = arguments[1];
+const seen = window.__fbAdHarvestSeen || (window.__fbAdHarvestSeen = new Set());
+const fresh = [];
+document.querySelectorAll('div._3qn7 a[href], a[target="_blank"][href]').forEach((a) => {
+    const href = a.getAttribute('href');
+    if (href && !seen.has(href)) {
+        seen.add(href);
+        fresh.push(href);
+    }
+});
+let pruned = 0;
+if (prune) {
+    const cards = Array.from(document.querySelectorAll('div._3qn7:not([data-harvested])'));
+    cards.slice(0, Math.max(cards.length - keep, 0)).forEach((card) => {
+        card.setAttribute('data-harvested', '1');
+        card.replaceChildren();
+        pruned += 1;
+    });
+}
+return {hrefs: fresh, pruned: pruned, seen: seen.size};
+"""
+
+def harvest_new_links(driver, prune=None, keep=None):
+    """Collect hrefs that appeared since the previous call on this page.
+
+    Args:
+        driver: Selenium WebDriver instance with the feed loaded
+        prune: Whether to empty already harvested cards, defaults to SCRAPER_SETTINGS["prune_harvested"]
+        keep: Newest cards left untouched when pruning, defaults to SCRAPER_SETTINGS["prune_keep"]
+
+    Returns:
+        list: New href values, in document order
+    """
+    prune = SCRAPER_SETTINGS["prune_harvested"] if prune is None else prune
+    keep = SCRAPER_SETTINGS["prune_keep"] if keep is None else keep
+    result = driver.execute_script(HARVEST_JS, bool(prune), int(keep))
+    if result["pruned"]:
+        print(f"Pruned {result['pruned']} harvested cards ({result['seen']} links seen so far)")
+    return result["hrefs"]
+
+# Returns the outerHTML of feed cards (and of target="_blank" links outside
+# cards) that were not captured before, marking them so each is sent once.
+# Must run before HARVEST_JS prunes the cards it has harvested.
+CAPTURE_FRAGMENTS_JS = """
+const fragments = [];
+document.querySelectorAll('div._3qn7:not([data-snapshotted]), a[target="_blank"]:not([data-snapshotted])').forEach((node) => {
+    if (node.tagName === 'A' && node.closest('div._3qn7')) return;
+    node.setAttribute('data-snapshotted', '1');
+    fragments.push(node.outerHTML);
+});
+return fragments;
+"""
+
+def capture_new_fragments(driver):
+    """Return the HTML of feed cards loaded since the previous call, for the snapshot cache.
+
+    Args:
+        driver: Selenium WebDriver instance with the feed loaded
+
+    Returns:
+        list: outerHTML strings, in document order
+    """
+    return driver.execute_script(CAPTURE_FRAGMENTS_JS) or []
@@ -0,0 +1,130 @@
+"""
+Pluggable HTML parsing backends for the Facebook Ad Scraper.
+
+Supported backends:
+    "selectolax": lexbor-based parser, fastest, needs the selectolax package
+    "lxml": streaming libxml2 parse that never builds a tree, needs the lxml package
+    "html.parser": BeautifulSoup with the standard library parser, always available
+"""
+
+from functools import lru_cache
+from src.config import SCRAPER_SETTINGS
+
+# Anchors harvested from the Ad Library feed: links inside ad cards plus
+# links that open in a new tab. Matched in one pass, each anchor once.
+LINK_SELECTOR = 'div._3qn7 a, a[target="_blank"]'
+CARD_CLASS = "_3qn7"
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+@lru_cache(maxsize=None)
+def available_backends():
+    """Return the installed backends, fastest first."""
+    backends = []
+    try:
+        import selectolax.lexbor  # noqa: F401
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    try:
+        import lxml.etree  # noqa: F401
+        backends.append("lxml")
+    except ImportError:
+        pass
+    backends.append("html.parser")
+    return tuple(backends)
+
+def resolve_backend(backend=None):
+    """Pick the backend to use.
+
+    Args:
+        backend: Backend name or "auto", defaults to SCRAPER_SETTINGS["parser_backend"]
+
+    Returns:
+        str: An installed backend name
+    """
+    backend = backend or SCRAPER_SETTINGS["parser_backend"]
+    installed = available_backends()
+    if backend == "auto":
+        return installed[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}', expected one of {BACKENDS} or 'auto'")
+    if backend not in installed:
+        print(f"Parser backend '{backend}' is not installed, falling back to '{installed[0]}'")
+        return installed[0]
+    return backend
+
+def harvest_links(html, backend=None):
+    """Return the href of every feed anchor in a single pass over the document.
+
+    Anchors that are both inside a div._3qn7 card and target="_blank" are only
+    returned once.
+
+    Args:
+        html: Page source
+        backend: Parser backend name, see resolve_backend()
+
+    Returns:
+        list: href values, each matched anchor once
+    """
+    if not html:
+        return []
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        # Lexbor can match a node once per selector in the group, keep each node once
+        nodes = {node.mem_id: node for node in LexborHTMLParser(html).css(LINK_SELECTOR)}
+        hrefs = (node.attributes.get("href") for node in nodes.values())
+    elif backend == "lxml":
+        from lxml import etree
+        hrefs = etree.fromstring(html, etree.HTMLParser(target=_LinkCollector()))
+    else:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        hrefs = (link.get("href") for link in soup.select(LINK_SELECTOR))
+    return [href for href in hrefs if href]
+
+def make_soup(html, backend=None, parse_only=None):
+    """Build a BeautifulSoup tree with the fastest installed tree builder.
+
+    Args:
+        html: Page source
+        backend: Parser backend name, lxml is used as the tree builder when available
+        parse_only: Optional SoupStrainer restricting which elements are materialized
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    from bs4 import BeautifulSoup
+    features = "lxml" if resolve_backend(backend) != "html.parser" and "lxml" in available_backends() else "html.parser"
+    return BeautifulSoup(html, features, parse_only=parse_only)
+
+def class_strainer(tags, classes):
+    """Return a SoupStrainer keeping only the given tags carrying one of the class strings."""
+    from bs4 import SoupStrainer
+    return SoupStrainer(tags, class_=list(classes))
+
+class _LinkCollector:
+    """lxml parser target that collects feed hrefs from parse events without building a tree."""
+
+    def __init__(self):
+        self.hrefs = []
+        # One entry per open <div>: whether it is (or is inside) an ad card
+        self._in_card = []
+
+    def start(self, tag, attrib):
+        inside = bool(self._in_card) and self._in_card[-1]
+        if tag == "div":
+            self._in_card.append(inside or CARD_CLASS in (attrib.get("class") or "").split())
+        elif tag == "a" and (inside or attrib.get("target") == "_blank"):
+            self.hrefs.append(attrib.get("href"))
+
+    def end(self, tag):
+        if tag == "div" and self._in_card:
+            self._in_card.pop()
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        return self.hrefs
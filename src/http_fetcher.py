@@ -0,0 +1,77 @@
+"""
+Plain HTTP page fetching for the tiered phone extractor.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from src.config import BROWSER_SETTINGS, HTTP_SETTINGS
+from src.rate_limiter import RATE_LIMITER
+
+# Status codes meaning the server wants us to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Markers of pages that only render behind JavaScript or a login, where the
+# server-rendered HTML cannot contain the contact details
+JS_WALL_MARKERS = (
+    'id="login_form"',
+    "/login/?next=",
+    "You must log in to continue",
+    "Please enable JavaScript",
+    'http-equiv="refresh"',
+)
+
+def create_session(pool_size=None):
+    """Create a keep-alive requests.Session sized for concurrent workers.
+
+    Args:
+        pool_size: Connections kept open per host, defaults to HTTP_SETTINGS["pool_size"]
+
+    Returns:
+        requests.Session: Session that reuses connections across requests
+    """
+    pool_size = pool_size or HTTP_SETTINGS["pool_size"]
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=HTTP_SETTINGS["max_retries"])
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": BROWSER_SETTINGS["user_agent"],
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+def fetch_html(session, url, timeout=None):
+    """Fetch a page's server-rendered HTML.
+
+    Args:
+        session: requests.Session from create_session()
+        url: The URL to fetch
+        timeout: Request timeout in seconds, defaults to HTTP_SETTINGS["timeout"]
+
+    Returns:
+        str: The response body, or None if the request failed or was not HTML
+    """
+    timeout = timeout or HTTP_SETTINGS["timeout"]
+    RATE_LIMITER.acquire(url)
+    try:
+        response = session.get(url, timeout=timeout)
+        if response.status_code in THROTTLE_STATUS_CODES:
+            RATE_LIMITER.penalize(url, f"http_{response.status_code}")
+        response.raise_for_status()
+    except requests.exceptions.Timeout as e:
+        RATE_LIMITER.penalize(url, "timeout")
+        print(f"HTTP fetch timed out for {url}: {e}")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        return None
+    if "html" not in response.headers.get("Content-Type", "text/html"):
+        return None
+    if not is_js_wall(response.text):
+        RATE_LIMITER.success(url)
+    return response.text
+
+def is_js_wall(html):
+    """Return True if the HTML is a login wall or a JavaScript-only shell."""
+    return any(marker in html for marker in JS_WALL_MARKERS)
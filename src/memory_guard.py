@@ -0,0 +1,194 @@
+"""
+Memory watchdog for long feed scrolls in the Facebook Ad Scraper.
+
+A Chrome tab scrolled several hundred times keeps every loaded card alive,
+until driver.page_source or the browser itself runs out of memory. The
+MemoryGuard samples the memory of the browser's process tree between
+harvest batches, so the scraper can harvest what it has, recycle the tab
+and resume the feed before that happens. If a fresh tab does not bring the
+browser back under its limit, MemoryLimitExceeded asks for the whole
+driver to be replaced; if the feed cannot be finished under the limit, it
+fails the shard instead of letting a cut-short feed count as done.
+
+Chrome's processes share much of their memory, so each one is counted by
+its proportional set size (PSS), read with psutil when it is installed and
+from /proc otherwise, falling back to RSS; where none of these work, the
+page's JavaScript heap stands in for the browser. The Python process is
+shared by every crawl thread and is only reported, never a trigger.
+"""
+
+import logging
+import os
+from src.config import MEMORY_SETTINGS
+from src.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+class MemoryLimitExceeded(RuntimeError):
+    """Raised when a feed cannot be scrolled further under the browser memory limit.
+
+    Attributes:
+        restart_driver: True if a fresh browser may get further, see run_self_healing()
+    """
+
+    def __init__(self, message, restart_driver=False):
+        super().__init__(message)
+        self.restart_driver = restart_driver
+
+def process_rss(pid=None):
+    """Return the resident set size of a process in bytes, or None if it cannot be read.
+
+    Args:
+        pid: Process ID, defaults to the current process
+    """
+    pid = os.getpid() if pid is None else pid
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def process_pss(pid):
+    """Return the proportional set size of a process in bytes, its RSS where PSS cannot be read, or None.
+
+    PSS splits shared pages between the processes mapping them, so the sizes
+    of a process tree can be summed without counting shared memory repeatedly.
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_full_info().pss
+        except (psutil.Error, AttributeError):
+            return process_rss(pid)
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return process_rss(pid)
+
+def process_tree(pid):
+    """Return the PID and the PIDs of all descendants of a process."""
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return [pid]
+    children = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else ():
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, fields after it are space separated
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, ()))
+    return tree
+
+def browser_memory(driver):
+    """Return the summed PSS in bytes of the driver's chromedriver and Chrome processes, or None."""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is None or getattr(process, "pid", None) is None:
+        return None
+    sizes = [process_pss(pid) for pid in process_tree(process.pid)]
+    sizes = [size for size in sizes if size is not None]
+    return sum(sizes) if sizes else None
+
+def js_heap_size(driver):
+    """Return the page's used JavaScript heap in bytes, or None if the browser does not expose it."""
+    try:
+        return driver.execute_script("return window.performance && performance.memory ? "
+                                     "performance.memory.usedJSHeapSize : null;")
+    except Exception:
+        return None
+
+class MemoryGuard:
+    """Samples browser and Python memory and tells when the browser crosses its threshold.
+
+    Example:
+        guard = MemoryGuard("cloth|BD|all|all")
+        if guard.over_limit(driver):
+            ...harvest, then recycle the tab...
+        guard.report()
+    """
+
+    def __init__(self, label="", browser_limit_mb=None):
+        """Create the guard.
+
+        Args:
+            label: Category or shard key the peaks are reported under
+            browser_limit_mb: Browser PSS threshold, defaults to MEMORY_SETTINGS["browser_limit_mb"]
+        """
+        self.label = label
+        self.browser_limit_mb = browser_limit_mb or MEMORY_SETTINGS["browser_limit_mb"]
+        self.peak_browser_mb = 0.0
+        self.peak_python_mb = 0.0
+        self.recycles = 0
+
+    def sample(self, driver):
+        """Measure the driver's browser and this process, updating the peaks.
+
+        Returns:
+            tuple: (browser MB, Python MB), either None if it could not be measured
+        """
+        browser = browser_memory(driver)
+        if browser is None:
+            browser = js_heap_size(driver)
+        python = process_rss()
+        browser_mb = browser / 1e6 if browser is not None else None
+        python_mb = python / 1e6 if python is not None else None
+        if browser_mb is not None:
+            self.peak_browser_mb = max(self.peak_browser_mb, browser_mb)
+        if python_mb is not None:
+            self.peak_python_mb = max(self.peak_python_mb, python_mb)
+        return browser_mb, python_mb
+
+    def over_limit(self, driver):
+        """Return True if the browser memory is above its threshold.
+
+        The Python process is only sampled for the peaks: it is shared by every
+        crawl thread and a tab recycle would not shrink it.
+        """
+        browser_mb, python_mb = self.sample(driver)
+        over = (browser_mb or 0) > self.browser_limit_mb
+        if over:
+            logger.info("[%s] Memory threshold crossed: browser %.0f MB (limit %s), python %.0f MB",
+                        self.label, browser_mb, self.browser_limit_mb, python_mb or 0)
+        return over
+
+    def can_recycle(self):
+        """Return True while fewer than MEMORY_SETTINGS["max_recycles"] recycles happened."""
+        return self.recycles < MEMORY_SETTINGS["max_recycles"]
+
+    def report(self):
+        """Record the peaks as per-category gauges and return them.
+
+        Returns:
+            dict: "peak_browser_mb", "peak_python_mb" and "recycles"
+        """
+        METRICS.set_max("memory.browser_peak_mb", round(self.peak_browser_mb, 1), category=self.label)
+        METRICS.set_max("memory.python_peak_mb", round(self.peak_python_mb, 1), category=self.label)
+        if self.recycles:
+            METRICS.incr("memory.recycles", self.recycles)
+        return {"peak_browser_mb": round(self.peak_browser_mb, 1), "peak_python_mb": round(self.peak_python_mb, 1),
+                "recycles": self.recycles}
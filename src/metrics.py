@@ -0,0 +1,192 @@
+"""
+Lightweight run metrics for the Facebook Ad Scraper.
+
+Stages are timed with ``METRICS.timer("stage")``, events counted with
+``METRICS.incr("name")`` and peaks tracked with ``METRICS.set_max("name", value)``. At the end of a run the aggregated summary is
+written as JSON or as a Prometheus textfile, and every timed event can
+optionally be traced to a JSONL file.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.config import METRICS_SETTINGS, applied_settings
+
+class Metrics:
+    """Thread-safe registry of stage timers, counters and gauges for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all timers, counters and gauges and restart the run clock."""
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+            self._trace = getattr(self, "_trace", None)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time the body of a with-block as one event of `stage`.
+
+        Args:
+            stage: Stage name, e.g. "scroll_loop"
+            **labels: Extra context written to the trace only (not aggregated)
+        """
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, ok=ok, **labels)
+
+    def observe(self, stage, seconds, ok=True, **labels):
+        """Record one event of `stage` that took `seconds`."""
+        with self._lock:
+            entry = self.timers.get(stage)
+            if entry is None:
+                entry = self.timers[stage] = {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0}
+            entry["count"] += 1
+            entry["total_s"] += seconds
+            entry["max_s"] = max(entry["max_s"], seconds)
+            if not ok:
+                entry["errors"] += 1
+            if self._trace is not None:
+                event = {"ts": time.time(), "stage": stage, "seconds": round(seconds, 6), "ok": ok}
+                event.update(labels)
+                self._trace.write(json.dumps(event, default=str) + "\n")
+
+    def incr(self, name, value=1):
+        """Add `value` to counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_max(self, name, value, **labels):
+        """Raise gauge `name` (one series per label set) to `value` if it is higher."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = max(self.gauges.get(key, value), value)
+
+    def drain(self):
+        """Return the timers, counters and gauges recorded so far and clear them.
+
+        Used by crawl worker processes to hand their metrics to the parent, see merge().
+        """
+        with self._lock:
+            snapshot = {"timers": self.timers, "counters": self.counters, "gauges": self.gauges}
+            self.timers, self.counters, self.gauges = {}, {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add the timers, counters and gauges of a drain() snapshot to this registry."""
+        with self._lock:
+            for stage, other in snapshot["timers"].items():
+                entry = self.timers.get(stage)
+                if entry is None:
+                    entry = self.timers[stage] = {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0}
+                entry["count"] += other["count"]
+                entry["errors"] += other["errors"]
+                entry["total_s"] += other["total_s"]
+                entry["max_s"] = max(entry["max_s"], other["max_s"])
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for key, value in snapshot["gauges"].items():
+                self.gauges[key] = max(self.gauges.get(key, value), value)
+
+    def start_trace(self, path):
+        """Write every timed event to a JSONL file from now on."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._trace = open(path, "a", encoding="utf-8", buffering=1)
+
+    def stop_trace(self):
+        """Close the trace file, if any."""
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+    def summary(self):
+        """Return the run summary as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                "wall_s": round(time.perf_counter() - self._start, 3),
+                # Config file and --set overrides, so the runs of a parameter sweep can be told apart
+                "settings": applied_settings(),
+                "stages": {stage: dict(entry, total_s=round(entry["total_s"], 6), max_s=round(entry["max_s"], 6))
+                           for stage, entry in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                           for (name, labels), value in sorted(self.gauges.items())],
+            }
+
+    def to_prometheus(self, prefix=None):
+        """Return the summary in Prometheus text exposition format."""
+        prefix = prefix or METRICS_SETTINGS["prometheus_prefix"]
+        summary = self.summary()
+        lines = [
+            f"# TYPE {prefix}_run_wall_seconds gauge",
+            f"{prefix}_run_wall_seconds {summary['wall_s']}",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {entry["total_s"]}'
+                  for stage, entry in summary["stages"].items()]
+        lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {entry["count"]}'
+                  for stage, entry in summary["stages"].items()]
+        lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+        lines += [f'{prefix}_stage_errors_total{{stage="{stage}"}} {entry["errors"]}'
+                  for stage, entry in summary["stages"].items()]
+        lines.append(f"# TYPE {prefix}_stage_max_seconds gauge")
+        lines += [f'{prefix}_stage_max_seconds{{stage="{stage}"}} {entry["max_s"]}'
+                  for stage, entry in summary["stages"].items()]
+        for name, value in summary["counters"].items():
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        typed = set()
+        for gauge in summary["gauges"]:
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', gauge['name'])}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            labels = ",".join(f'{key}="{value}"' for key, value in gauge["labels"].items())
+            lines.append(f"{metric}{{{labels}}} {gauge['value']}" if labels else f"{metric} {gauge['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the summary to `path`, as a Prometheus textfile if it ends in .prom, else as JSON.
+
+        Returns:
+            str: The path written
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+        return path
+
+def default_metrics_path(run_name):
+    """Return a timestamped summary path for `run_name` in METRICS_SETTINGS["dir"]."""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(METRICS_SETTINGS["dir"], f"{run_name}_{timestamp}.json")
+
+# Process-wide registry used by every stage of the pipeline
+METRICS = Metrics()
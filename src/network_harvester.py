@@ -0,0 +1,228 @@
+"""
+Ad Library search-response harvesting for the Facebook Ad Scraper.
+
+As the results page is scrolled it fetches the next ads as paginated JSON
+from its async search endpoint. Instead of scraping the rendered cards, this
+module reads those responses from Chrome's performance log (CDP network
+events) and pulls page IDs and URLs straight out of the JSON. Once one
+request has been seen it can also be replayed over plain HTTP with the
+browser's cookies, following the pagination cursor without rendering
+anything.
+"""
+
+import json
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.config import HTTP_SETTINGS, SCRAPER_SETTINGS
+from src.rate_limiter import RATE_LIMITER
+
+# Paths of the endpoints the results page loads further ads from
+SEARCH_ENDPOINT_PATTERNS = ("/ads/library/async/search_ads/", "/api/graphql/")
+
+# Facebook prefixes JSON responses with this guard against JSON hijacking
+JSON_GUARD = "for (;;);"
+
+# Keys holding a page's ID and profile URL in search results
+PAGE_ID_KEYS = ("pageID", "page_id")
+PAGE_URI_KEYS = ("page_profile_uri", "pageProfileURI")
+
+# Keys holding the cursor of the next result page, and whether the results are exhausted
+CURSOR_KEYS = ("forwardCursor", "forward_cursor", "end_cursor")
+COMPLETE_KEYS = ("isResultComplete",)
+
+# Request headers that must not be copied into a replayed request
+_SKIPPED_HEADERS = {"content-length", "cookie", "host", "connection", "accept-encoding"}
+
+def is_search_endpoint(url):
+    """Return True if the URL is one of the Ad Library's paginated search endpoints."""
+    return any(pattern in (url or "") for pattern in SEARCH_ENDPOINT_PATTERNS)
+
+def parse_search_payload(text):
+    """Extract page URLs and the pagination cursor from a search response body.
+
+    Handles the for (;;); guard and GraphQL responses streamed as one JSON
+    document per line.
+
+    Args:
+        text: Response body
+
+    Returns:
+        tuple: (list of page URLs in response order, next cursor or None, True if the results are complete)
+    """
+    if text.startswith(JSON_GUARD):
+        text = text[len(JSON_GUARD):]
+    documents = []
+    try:
+        documents.append(json.loads(text))
+    except ValueError:
+        for line in text.splitlines():
+            try:
+                documents.append(json.loads(line))
+            except ValueError:
+                continue
+
+    hrefs, seen = [], set()
+    state = {"cursor": None, "complete": False}
+    for document in documents:
+        _walk(document, hrefs, seen, state)
+    return hrefs, state["cursor"], state["complete"]
+
+def _walk(node, hrefs, seen, state):
+    """Collect page URLs, the cursor and the completion flag from a JSON tree."""
+    if isinstance(node, list):
+        for child in node:
+            _walk(child, hrefs, seen, state)
+        return
+    if not isinstance(node, dict):
+        return
+
+    page_id = next((node[key] for key in PAGE_ID_KEYS if node.get(key)), None)
+    if page_id is not None:
+        snapshot = node.get("snapshot") if isinstance(node.get("snapshot"), dict) else {}
+        uri = next((source[key] for source in (node, snapshot) for key in PAGE_URI_KEYS if source.get(key)), None)
+        href = uri or f"https://www.facebook.com/{page_id}"
+        if href not in seen:
+            seen.add(href)
+            hrefs.append(href)
+
+    for key, value in node.items():
+        if key in CURSOR_KEYS and value and state["cursor"] is None:
+            state["cursor"] = value
+        elif key in COMPLETE_KEYS and value:
+            state["complete"] = True
+        elif key == "has_next_page" and value is False:
+            state["complete"] = True
+        elif isinstance(value, (dict, list)):
+            _walk(value, hrefs, seen, state)
+
+def harvest_network_links(driver, state):
+    """Collect page URLs from search responses received since the previous call.
+
+    The driver must have been created with performance logging enabled
+    (setup_driver(capture_network=True)).
+
+    Args:
+        driver: Selenium WebDriver instance with the results page loaded
+        state: Dict kept between calls; filled with "request" (the last search
+               request, for replay), "cursor" and "complete"
+
+    Returns:
+        list: Page URLs from the new responses
+    """
+    pending = state.setdefault("pending", set())
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        print(f"Could not read the performance log: {e}")
+        return []
+
+    finished = []
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent" and is_search_endpoint(params["request"]["url"]):
+            state["request"] = {key: params["request"].get(key) for key in ("url", "method", "headers", "postData")}
+        elif method == "Network.responseReceived" and is_search_endpoint(params["response"]["url"]):
+            pending.add(params["requestId"])
+        elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+            pending.discard(params["requestId"])
+            finished.append(params["requestId"])
+
+    hrefs = []
+    for request_id in finished:
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})["body"]
+        except Exception as e:
+            print(f"Could not read search response {request_id}: {e}")
+            continue
+        page_hrefs, cursor, complete = parse_search_payload(body)
+        hrefs.extend(page_hrefs)
+        if cursor:
+            state["cursor"] = cursor
+        state["complete"] = complete
+    return hrefs
+
+def capture_search_request(driver, state, max_scrolls=5, wait=None):
+    """Scroll until the page issues its first search request and return its hrefs.
+
+    Args:
+        driver: Selenium WebDriver instance with performance logging enabled
+        state: Dict passed to harvest_network_links
+        max_scrolls: Scrolls to try before giving up
+        wait: Seconds to wait for a response after each scroll, defaults to SCRAPER_SETTINGS["scroll_delay"]
+
+    Returns:
+        list: Page URLs from the responses seen while capturing
+    """
+    wait = SCRAPER_SETTINGS["scroll_delay"] if wait is None else wait
+    hrefs = []
+    for _ in range(max_scrolls):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            hrefs.extend(harvest_network_links(driver, state))
+            if state.get("request") and (state.get("cursor") or state.get("complete")):
+                return hrefs
+            time.sleep(0.25)
+    return hrefs
+
+def replay_search_pages(session, request, cursor, max_pages=None, cursor_param=None, timeout=None):
+    """Follow the search pagination over HTTP by replaying a captured request.
+
+    Args:
+        session: requests.Session carrying the browser's cookies
+        request: Request captured by harvest_network_links ("url", "method", "headers", "postData")
+        cursor: Cursor of the first page to fetch
+        max_pages: Pages to fetch at most, defaults to SCRAPER_SETTINGS["replay_max_pages"]
+        cursor_param: Name of the cursor parameter, defaults to SCRAPER_SETTINGS["search_cursor_param"]
+        timeout: Request timeout in seconds, defaults to HTTP_SETTINGS["timeout"]
+
+    Yields:
+        list: Page URLs of each fetched result page; a failed request stops the replay
+    """
+    # requests is only needed when a search is replayed, keep it out of module import
+    import requests
+    timeout = timeout or HTTP_SETTINGS["timeout"]
+    max_pages = max_pages or SCRAPER_SETTINGS["replay_max_pages"]
+    cursor_param = cursor_param or SCRAPER_SETTINGS["search_cursor_param"]
+    method = (request.get("method") or "GET").upper()
+    headers = {name: value for name, value in (request.get("headers") or {}).items()
+               if not name.startswith(":") and name.lower() not in _SKIPPED_HEADERS}
+
+    for _ in range(max_pages):
+        if not cursor:
+            return
+        url, body = _with_cursor(request["url"], request.get("postData"), method, cursor_param, cursor)
+        RATE_LIMITER.acquire(url)
+        try:
+            response = session.request(method, url, data=body, headers=headers, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            RATE_LIMITER.penalize(url, "timeout" if isinstance(e, requests.exceptions.Timeout) else "request_error")
+            print(f"Search replay stopped after a failed request: {e}")
+            return
+        if response.status_code != 200:
+            RATE_LIMITER.penalize(url, f"http_{response.status_code}")
+            print(f"Search replay stopped with HTTP {response.status_code}")
+            return
+        hrefs, next_cursor, complete = parse_search_payload(response.text)
+        if not hrefs and not next_cursor:
+            RATE_LIMITER.penalize(url, "empty")
+            return
+        RATE_LIMITER.success(url)
+        yield hrefs
+        if complete or next_cursor == cursor:
+            return
+        cursor = next_cursor
+
+def _with_cursor(url, body, method, cursor_param, cursor):
+    """Return (url, body) of a request with its cursor parameter set to `cursor`."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    form = parse_qsl(body or "", keep_blank_values=True)
+    if any(name == cursor_param for name, _ in form) or (method == "POST" and
+                                                         not any(name == cursor_param for name, _ in query)):
+        form = [(name, value) for name, value in form if name != cursor_param] + [(cursor_param, cursor)]
+    else:
+        query = [(name, value) for name, value in query if name != cursor_param] + [(cursor_param, cursor)]
+    url = urlunsplit(parts._replace(query=urlencode(query)))
+    return url, (urlencode(form) if method == "POST" else None)
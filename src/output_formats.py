@@ -0,0 +1,201 @@
+"""
+Streaming row storage for the scraper's outputs.
+
+Supported formats, picked from the file extension:
+    ".csv": plain CSV, flushed after every write
+    ".csv.gz": gzip-compressed CSV
+    ".parquet": columnar Parquet, written in row groups with dictionary-encoded
+                low-cardinality columns (such as Category), needs the pyarrow package
+
+Also provides an external merge sort used to deduplicate any number of
+historical output files with bounded memory.
+"""
+
+import csv
+import gzip
+import heapq
+import itertools
+import os
+import tempfile
+from src.config import OUTPUT_SETTINGS
+
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+# Sorted runs merged at once; more runs are merged in several passes
+MAX_MERGE_FAN_IN = 64
+
+def format_extension(fmt=None):
+    """Return the file extension of an output format, defaults to OUTPUT_SETTINGS["format"]."""
+    fmt = fmt or OUTPUT_SETTINGS["format"]
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {sorted(FORMATS)}")
+    return FORMATS[fmt]
+
+def detect_format(path):
+    """Return the format of a file from its extension."""
+    for fmt, extension in sorted(FORMATS.items(), key=lambda item: -len(item[1])):
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Cannot tell the format of '{path}' from its extension, expected one of {sorted(FORMATS.values())}")
+
+class RowWriter:
+    """Appends rows to a CSV, gzip CSV or Parquet file as they arrive.
+
+    Example:
+        with RowWriter("contents/ad.csv.gz", ["Category", "Page URL"]) as writer:
+            writer.write(("cloth", url))
+    """
+
+    def __init__(self, path, columns, dictionary_columns=("Category",), row_group_size=None):
+        """Open the output file and write the header.
+
+        Args:
+            path: Output path, its extension selects the format
+            columns: Column names
+            dictionary_columns: Parquet columns stored dictionary-encoded
+            row_group_size: Rows buffered per Parquet row group, defaults to OUTPUT_SETTINGS["parquet_row_group"]
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.format = detect_format(path)
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self._schema = pa.schema([
+                (name, pa.dictionary(pa.int32(), pa.string()) if name in dictionary_columns else pa.string())
+                for name in self.columns
+            ])
+            self._parquet = pq.ParquetWriter(path, self._schema)
+            self._buffer = []
+            self._row_group_size = row_group_size or OUTPUT_SETTINGS["parquet_row_group"]
+        else:
+            opener = gzip.open if self.format == "csv.gz" else open
+            self._file = opener(path, mode="wt", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+
+    def write(self, row):
+        """Append one row (a sequence in column order)."""
+        self.write_many((row,))
+
+    def write_many(self, rows):
+        """Append rows and make them durable (Parquet rows are written once a row group fills)."""
+        if self.format == "parquet":
+            for row in rows:
+                self._buffer.append(row)
+                self.count += 1
+            if len(self._buffer) >= self._row_group_size:
+                self._flush_row_group()
+            return
+        before = self.count
+        for row in rows:
+            self._writer.writerow(row)
+            self.count += 1
+        if self.count != before:
+            self._file.flush()
+
+    def close(self):
+        """Flush buffered rows and close the file."""
+        if self.format == "parquet":
+            if self._parquet is not None:
+                self._flush_row_group()
+                self._parquet.close()
+                self._parquet = None
+        elif not self._file.closed:
+            self._file.close()
+
+    def _flush_row_group(self):
+        if not self._buffer:
+            return
+        pa = self._pa
+        arrays = []
+        for values, field in zip(zip(*self._buffer), self._schema):
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        self._parquet.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def read_rows(path, batch_size=10000):
+    """Yield the rows of a CSV, gzip CSV or Parquet file as dicts, without loading the whole file.
+
+    Args:
+        path: Input path, its extension selects the format
+        batch_size: Rows decoded at a time from Parquet files
+    """
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+    opener = gzip.open if fmt == "csv.gz" else open
+    with opener(path, mode="rt", newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file)
+
+def external_sort_unique(rows, chunk_rows=None, tmp_dir=None):
+    """Sort rows and drop duplicates with memory bounded by chunk_rows.
+
+    Rows are sorted in chunks that are spilled to temporary files, then the
+    sorted runs are merged lazily, so any number of input rows can be
+    handled.
+
+    Args:
+        rows: Iterable of tuples of strings
+        chunk_rows: Rows held in memory at once, defaults to OUTPUT_SETTINGS["merge_chunk_rows"]
+        tmp_dir: Directory for the sorted runs, defaults to the system temp directory
+
+    Yields:
+        tuple: Each distinct row once, in sorted order
+    """
+    chunk_rows = chunk_rows or OUTPUT_SETTINGS["merge_chunk_rows"]
+    with tempfile.TemporaryDirectory(prefix="merge_", dir=tmp_dir) as directory:
+        runs = []
+        rows = iter(rows)
+        while True:
+            chunk = sorted(set(itertools.islice(rows, chunk_rows)))
+            if not chunk:
+                break
+            runs.append(_write_run(directory, len(runs), chunk))
+
+        # Merge in passes so no more than MAX_MERGE_FAN_IN files are open at once
+        generation = 0
+        while len(runs) > MAX_MERGE_FAN_IN:
+            generation += 1
+            runs = [_write_run(directory, f"{generation}_{i}", _unique(heapq.merge(*map(_read_run, group))))
+                    for i, group in enumerate(runs[start:start + MAX_MERGE_FAN_IN]
+                                              for start in range(0, len(runs), MAX_MERGE_FAN_IN))]
+        yield from _unique(heapq.merge(*map(_read_run, runs)))
+
+def _unique(sorted_rows):
+    """Drop consecutive duplicates from sorted rows."""
+    previous = None
+    for row in sorted_rows:
+        if row != previous:
+            yield row
+            previous = row
+
+def _write_run(directory, name, rows):
+    """Write sorted rows to a temporary run file and return its path."""
+    path = os.path.join(directory, f"run_{name}.csv")
+    with open(path, mode="w", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows(rows)
+    return path
+
+def _read_run(path):
+    """Yield the rows of a run file as tuples."""
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            yield tuple(row)
@@ -0,0 +1,166 @@
+"""
+Multi-process parse of large Ad Library page dumps.
+
+After a long scroll the "page_source" harvest mode parses one document of
+tens of megabytes on a single core. parallel_harvest_pairs() splits that
+document at ad card boundaries and harvests the chunks on a process pool:
+the UTF-8 bytes are copied once into a shared memory block, each worker
+attaches to it and reads only its byte range, so the document is never
+pickled, and only the per-chunk (category, URL) sets travel back.
+
+Cards are siblings in the feed, so a chunk starting at a card's opening tag
+yields exactly the links the whole-document parse finds in it.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.config import SCRAPER_SETTINGS
+from src.html_parsers import CARD_CLASS, harvest_links, resolve_backend
+from src.metrics import METRICS
+from src.scraper_utils import process_hrefs
+
+# Chunks per worker, so a worker that drew dense chunks does not hold up the others
+CHUNKS_PER_WORKER = 4
+
+_CARD_MARKER = CARD_CLASS.encode("ascii")
+# Bytes that may surround a class name inside a class attribute
+_CLASS_DELIMITERS = b"\"' \t\n"
+
+def parse_workers():
+    """Return the worker processes used for a parallel parse, 1 meaning the parse stays in-process.
+
+    Crawl worker processes (main.py --processes) already keep every core busy and parse in-process.
+    """
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return SCRAPER_SETTINGS["parse_workers"] or os.cpu_count() or 1
+
+def should_parse_in_parallel(html):
+    """Return True if a document is large enough to be worth a parallel parse on this machine."""
+    return (parse_workers() > 1 and html is not None
+            and len(html) >= SCRAPER_SETTINGS["parallel_parse_min_mb"] * 1_000_000)
+
+def split_points(data, chunks):
+    """Return byte offsets cutting a document into about `chunks` ranges at ad card starts.
+
+    Documents without cards (only target="_blank" links) are cut before <a> tags.
+
+    Args:
+        data: UTF-8 encoded page source
+        chunks: Number of ranges wanted
+
+    Returns:
+        list: Increasing offsets starting with 0 and ending with len(data)
+    """
+    has_cards = data.find(_CARD_MARKER) != -1
+    points = [0]
+    for i in range(1, chunks):
+        point = _next_boundary(data, max(points[-1] + 1, len(data) * i // chunks), has_cards)
+        if point is None:
+            break
+        if point > points[-1]:
+            points.append(point)
+    points.append(len(data))
+    return points
+
+def _next_boundary(data, start, has_cards):
+    """Return the offset of the first card's (or anchor's) opening tag at or after `start`, or None."""
+    if not has_cards:
+        point = data.find(b"<a ", start)
+        return point if point != -1 else None
+    while True:
+        position = data.find(_CARD_MARKER, start)
+        if position == -1:
+            return None
+        start = position + len(_CARD_MARKER)
+        # Only a whole class name of a <div> counts, not a longer class, text or another attribute
+        before = data[position - 1] if position else 0
+        after = data[start] if start < len(data) else 0
+        if before not in _CLASS_DELIMITERS or after not in _CLASS_DELIMITERS:
+            continue
+        tag = data.rfind(b"<", 0, position)
+        if tag != -1 and data.startswith(b"<div", tag) and data.find(b">", tag, position) == -1:
+            return tag
+
+def _attach(name):
+    """Attach to an existing shared memory block without taking over its cleanup."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+def _harvest_chunk(name, start, end, category, backend):
+    """Harvest the links of one byte range of a shared document, in a worker process.
+
+    Returns:
+        tuple: (links found, set of (category, URL) pairs)
+    """
+    block = _attach(name)
+    try:
+        view = block.buf[start:end]
+        try:
+            html = str(view, "utf-8")
+        finally:
+            view.release()
+    finally:
+        block.close()
+    hrefs = harvest_links(html, backend)
+    pairs = set()
+    process_hrefs(hrefs, category, pairs)
+    return len(hrefs), pairs
+
+# Worker processes of this process, started on first use and shared by its crawl threads
+_shared = {}
+_shared_lock = threading.Lock()
+
+def _executor(workers):
+    """Return the process-wide parse pool, (re)started if the worker count changed."""
+    with _shared_lock:
+        if _shared.get("key") != (os.getpid(), workers):
+            if _shared.get("executor") is not None and _shared["key"][0] == os.getpid():
+                _shared["executor"].shutdown(wait=False)
+            # Crawl threads and Chrome are running, do not fork this process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _shared["executor"] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _shared["key"] = (os.getpid(), workers)
+        return _shared["executor"]
+
+def parallel_harvest_pairs(html, category, workers=None, backend=None):
+    """Harvest the (category, URL) pairs of a page dump on a process pool.
+
+    Args:
+        html: Page source
+        category: The category being processed
+        workers: Worker processes, defaults to parse_workers()
+        backend: Parser backend name, see resolve_backend()
+
+    Returns:
+        tuple: (number of links found, set of (category, URL) pairs), the same
+               as harvest_links() plus process_hrefs() over the whole document
+    """
+    workers = workers or parse_workers()
+    # Resolved here, spawned workers do not see settings changed after startup
+    backend = resolve_backend(backend)
+    data = html.encode("utf-8")
+    points = split_points(data, workers * CHUNKS_PER_WORKER)
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    try:
+        block.buf[:len(data)] = data
+        del data
+        executor = _executor(workers)
+        futures = [executor.submit(_harvest_chunk, block.name, start, end, category, backend)
+                   for start, end in zip(points, points[1:])]
+        links, pairs = 0, set()
+        for future in futures:
+            chunk_links, chunk_pairs = future.result()
+            links += chunk_links
+            pairs |= chunk_pairs
+    finally:
+        block.close()
+        block.unlink()
+    METRICS.incr("parse_chunks", len(points) - 1)
+    return links, pairs
@@ -0,0 +1,199 @@
+"""
+Phone number extraction and normalization for the Phone Number Extractor.
+
+Numbers are looked for with a fixed list of strategies, cheapest first:
+    "tel": tel: links
+    "json_ld": JSON-LD blocks and phone fields of JSON embedded in the page
+    "meta": <meta> tags such as og:phone_number or itemprop="telephone"
+    "about": the About section's contact spans (needs an HTML parse)
+    "text": a scan of the page's visible text
+
+The first strategy that yields a valid number wins, the rest are skipped.
+Every number is normalized to E.164 with Bangladesh-aware rules: +880,
+00880 and 880 prefixes, national 01X mobile numbers and Bengali digits.
+"""
+
+import html as html_module
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import unquote
+from src.config import PHONE_EXTRACTOR_SETTINGS
+from src.html_parsers import class_strainer, make_soup
+
+# Class strings of the About section's contact container and the spans holding its entries
+PHONE_OUTER_DIV_CLASS = "x9f619 x1n2onr6 x1ja2u2z x78zum5 xdt5ytf x193iq5w xeuugli x1r8uery x1iyjqo2 xs83m0k xamitd3 xsyo7zv x16hj40l x10b6aqq x1yrsyyn"
+PHONE_SPAN_CLASS = "x193iq5w xeuugli x13faqbe x1vvkbs x10flsy6 x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x41vudc x6prxxf xvq8zen xo1l8bm xzsf02u x1yc453h"
+
+# Bengali (and Arabic-Indic) digits mapped to ASCII
+DIGIT_TRANSLATION = str.maketrans("০১২৩৪৫৬৭৮৯٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+
+# Bangladesh national significant numbers: 1[3-9] + 8 digits for mobiles, area code + subscriber for landlines
+BD_MOBILE_PATTERN = re.compile(r"1[3-9]\d{8}")
+BD_LANDLINE_PATTERN = re.compile(r"[2-9]\d{6,9}")
+
+# Extensions, and separators between several numbers written together, only the first number is kept
+EXTENSION_PATTERN = re.compile(r"\bext\.?|\bx(?=\s*\d)|[#;,/]", re.IGNORECASE)
+
+TEL_LINK_PATTERN = re.compile(r"""href\s*=\s*["']tel:([^"']+)["']""", re.IGNORECASE)
+JSON_LD_PATTERN = re.compile(r"""<script[^>]*type\s*=\s*["']application/ld\+json["'][^>]*>(.*?)</script>""",
+                             re.IGNORECASE | re.DOTALL)
+# Phone fields commonly found in JSON embedded in server-rendered pages
+PHONE_JSON_PATTERN = re.compile(r'"(?:phone|phone_number|formatted_phone_number|telephone)"\s*:\s*"([^"]{6,48})"')
+PHONE_JSON_KEYS = ("telephone", "phone", "phone_number", "formatted_phone_number")
+META_TAG_PATTERN = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r"""([\w:-]+)\s*=\s*(["'])(.*?)\2""", re.DOTALL)
+PHONE_META_NAMES = {"og:phone_number", "business:contact_data:phone_number", "telephone", "phone"}
+HIDDEN_ELEMENT_PATTERN = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+# In free text only Bangladeshi mobiles with a prefix and explicitly international numbers are
+# accepted, bare digit runs are too often IDs, prices or dates
+TEXT_PHONE_PATTERN = re.compile(
+    r"(?<![\w+])(?:(?:\+|00)\s?880[\s-]?0?|0)1[3-9]\d{2}[\s-]?\d{3}[\s-]?\d{3}(?!\d)"
+    r"|(?<![\w+])\+\d{1,3}[\s-]?\(?\d{1,4}\)?(?:[\s.-]?\d{2,4}){2,4}(?!\d)"
+)
+
+PhoneMatch = namedtuple("PhoneMatch", "number raw source")
+PhoneMatch.__doc__ = "A normalized E.164 number, the text it was read from and the strategy that found it."
+
+def normalize_phone(raw, country_code=None):
+    """Normalize a phone number to E.164.
+
+    Args:
+        raw: Number as written on the page, e.g. "০১৭১২-৩৪৫৬৭৮", "+880 1712 345678" or "tel:01712345678"
+        country_code: Country calling code of national numbers, defaults to PHONE_EXTRACTOR_SETTINGS["country_code"]
+
+    Returns:
+        str: The number in E.164 form, e.g. "+8801712345678", or None if it is not a valid number
+    """
+    country_code = country_code or PHONE_EXTRACTOR_SETTINGS["country_code"]
+    text = unquote(raw or "").translate(DIGIT_TRANSLATION).strip()
+    if text.lower().startswith("tel:"):
+        text = text[4:]
+    # Drop extensions and everything that is not a digit
+    text = EXTENSION_PATTERN.split(text, maxsplit=1)[0]
+    international = text.lstrip().startswith("+")
+    digits = re.sub(r"\D", "", text)
+    if digits.startswith("00"):
+        international, digits = True, digits[2:]
+
+    if international or (digits.startswith(country_code) and len(digits) > len(country_code) + 8):
+        if not digits.startswith(country_code):
+            # Other countries: only the E.164 length limits can be checked
+            return f"+{digits}" if 8 <= len(digits) <= 15 else None
+        national = digits[len(country_code):]
+        # "+880 01712..." keeps the trunk prefix by mistake
+        if national.startswith("0"):
+            national = national[1:]
+    elif digits.startswith("0"):
+        national = digits[1:]
+    elif BD_MOBILE_PATTERN.fullmatch(digits):
+        national = digits
+    else:
+        return None
+
+    if country_code == "880" and not (BD_MOBILE_PATTERN.fullmatch(national) or BD_LANDLINE_PATTERN.fullmatch(national)):
+        return None
+    if not 6 <= len(national) <= 15 - len(country_code):
+        return None
+    return f"+{country_code}{national}"
+
+def tel_link_numbers(page_source):
+    """Return the raw numbers of tel: links."""
+    return [html_module.unescape(value) for value in TEL_LINK_PATTERN.findall(page_source)]
+
+def json_ld_numbers(page_source):
+    """Return telephone values of JSON-LD blocks and phone fields of other embedded JSON."""
+    numbers = []
+    for block in JSON_LD_PATTERN.findall(page_source):
+        try:
+            _collect_json_phones(json.loads(block), numbers)
+        except ValueError:
+            continue
+    for value in PHONE_JSON_PATTERN.findall(page_source):
+        try:
+            # Decode \u002B-style escapes the way a JSON parser would
+            numbers.append(json.loads(f'"{value}"'))
+        except ValueError:
+            numbers.append(value)
+    return numbers
+
+def meta_tag_numbers(page_source):
+    """Return the content of <meta> tags describing a phone number."""
+    numbers = []
+    for tag in META_TAG_PATTERN.findall(page_source):
+        attributes = {name.lower(): value for name, _, value in ATTRIBUTE_PATTERN.findall(tag)}
+        names = {attributes.get(key, "").lower() for key in ("property", "name", "itemprop")}
+        if names & PHONE_META_NAMES and attributes.get("content"):
+            numbers.append(html_module.unescape(attributes["content"]))
+    return numbers
+
+@lru_cache(maxsize=None)
+def phone_container_strainer():
+    """Return the SoupStrainer keeping only the About section's contact container and spans."""
+    return class_strainer(["div", "span"], [PHONE_OUTER_DIV_CLASS, PHONE_SPAN_CLASS])
+
+def about_section_numbers(page_source):
+    """Return the text of the About section's contact spans."""
+    # Only materialize the contact container and spans, not the whole page
+    soup = make_soup(page_source, parse_only=phone_container_strainer())
+    containers = soup.find_all("div", class_=PHONE_OUTER_DIV_CLASS) or [soup]
+    return [span.get_text(strip=True) for container in containers
+            for span in container.find_all("span", class_=PHONE_SPAN_CLASS)]
+
+def visible_text_numbers(page_source):
+    """Return phone-shaped runs of the page's visible text."""
+    text = TAG_PATTERN.sub(" ", HIDDEN_ELEMENT_PATTERN.sub(" ", page_source))
+    return TEXT_PHONE_PATTERN.findall(html_module.unescape(text).translate(DIGIT_TRANSLATION))
+
+# Strategies in the order they are tried, cheapest first
+STRATEGIES = (
+    ("tel", tel_link_numbers),
+    ("json_ld", json_ld_numbers),
+    ("meta", meta_tag_numbers),
+    ("about", about_section_numbers),
+    ("text", visible_text_numbers),
+)
+
+def find_phone_numbers(page_source, strategies=None, country_code=None):
+    """Find the phone numbers on a page with the first strategy that yields a valid one.
+
+    Args:
+        page_source: Page HTML
+        strategies: Names of the strategies to try, in STRATEGIES order,
+                    defaults to PHONE_EXTRACTOR_SETTINGS["phone_strategies"]
+        country_code: Country calling code of national numbers, see normalize_phone()
+
+    Returns:
+        list: Distinct PhoneMatch tuples in page order, empty if no strategy found a valid number
+    """
+    if not page_source:
+        return []
+    enabled = set(strategies or PHONE_EXTRACTOR_SETTINGS["phone_strategies"])
+    for source, strategy in STRATEGIES:
+        if source not in enabled:
+            continue
+        matches, seen = [], set()
+        for raw in strategy(page_source):
+            number = normalize_phone(raw, country_code)
+            if number and number not in seen:
+                seen.add(number)
+                matches.append(PhoneMatch(number, raw.strip(), source))
+        if matches:
+            return matches
+    return []
+
+def _collect_json_phones(node, numbers):
+    """Append the phone values found anywhere in a JSON tree."""
+    if isinstance(node, list):
+        for child in node:
+            _collect_json_phones(child, numbers)
+    elif isinstance(node, dict):
+        for key, value in node.items():
+            if key in PHONE_JSON_KEYS and isinstance(value, (str, int)):
+                numbers.append(str(value))
+            elif key in PHONE_JSON_KEYS and isinstance(value, list):
+                numbers.extend(str(item) for item in value if isinstance(item, (str, int)))
+            else:
+                _collect_json_phones(value, numbers)
@@ -0,0 +1,136 @@
+"""
+Adaptive per-domain rate limiting for the Facebook Ad Scraper.
+
+Every page load, whether by a pooled Chrome driver or by an HTTP worker, takes
+a token from its domain's bucket first. The refill rate adapts AIMD-style: it
+grows by a fixed step while responses are healthy and is cut multiplicatively,
+with a jittered pause, whenever Facebook redirects a browser to a login or
+checkpoint page, or answers with an empty result, a 429/503 or a timeout.
+The JavaScript wall of a plain HTTP fetch is not a throttling signal, only
+the cue to fall back to the browser.
+"""
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from src.config import RATE_LIMIT_SETTINGS
+from src.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Fragments of URLs Facebook redirects throttled or suspicious sessions to
+THROTTLE_URL_MARKERS = ("/login", "/checkpoint/", "/sorry/")
+
+def jittered_backoff(attempt, base=None, factor=2, cap=None):
+    """Return a "full jitter" exponential backoff delay in seconds.
+
+    Args:
+        attempt: Number of failures so far, starting at 0
+        base: Delay scale of the first attempt, defaults to RATE_LIMIT_SETTINGS["penalty_pause"]
+        factor: Growth factor per attempt
+        cap: Upper bound of the delay, defaults to RATE_LIMIT_SETTINGS["max_backoff"]
+
+    Returns:
+        float: A delay drawn uniformly from [0, min(cap, base * factor ** attempt)]
+    """
+    base = RATE_LIMIT_SETTINGS["penalty_pause"] if base is None else base
+    cap = RATE_LIMIT_SETTINGS["max_backoff"] if cap is None else cap
+    return random.uniform(0, min(cap, base * factor ** attempt))
+
+def is_throttle_url(url):
+    """Return True if the browser was redirected to a login or checkpoint page."""
+    return any(marker in (url or "") for marker in THROTTLE_URL_MARKERS)
+
+def rate_limit_key(url):
+    """Return the bucket key of a URL: its registrable domain, e.g. "facebook.com"."""
+    host = (urlsplit(url).hostname or "") if "//" in url else url
+    if host.replace(".", "").isdigit():
+        return host
+    return ".".join(host.split(".")[-2:])
+
+class RateLimiter:
+    """Thread-safe token buckets, one per domain, with AIMD rate adaptation."""
+
+    def __init__(self, settings=None):
+        """Create the limiter.
+
+        Args:
+            settings: Dict shaped like RATE_LIMIT_SETTINGS, defaults to it
+        """
+        self.settings = settings or RATE_LIMIT_SETTINGS
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        """Block until the URL's domain has a token to spend.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        key = rate_limit_key(url)
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._refill(key, now)
+                if bucket["tokens"] >= 1 and now >= bucket["paused_until"]:
+                    bucket["tokens"] -= 1
+                    break
+                wait = max((1 - bucket["tokens"]) / bucket["rate"], bucket["paused_until"] - now)
+            # Wake up at least every second, the rate may have changed meanwhile
+            time.sleep(min(max(wait, 0.01), 1.0))
+        waited = time.monotonic() - start
+        METRICS.observe("rate_limit.wait", waited, domain=key)
+        return waited
+
+    def success(self, url):
+        """Report a healthy response, raising the domain's rate by one additive step."""
+        key = rate_limit_key(url)
+        with self._lock:
+            bucket = self._refill(key, time.monotonic())
+            bucket["rate"] = min(self.settings["max_rate"], bucket["rate"] + self.settings["increase"])
+            bucket["strikes"] = 0
+
+    def penalize(self, url, reason):
+        """Report a throttling signal: cut the domain's rate and pause it.
+
+        Args:
+            url: URL (or domain) that produced the signal
+            reason: Short label such as "checkpoint", "empty", "timeout" or "http_429"
+
+        Returns:
+            float: Seconds the domain is paused for
+        """
+        key = rate_limit_key(url)
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._refill(key, now)
+            bucket["rate"] = max(self.settings["min_rate"], bucket["rate"] * self.settings["decrease"])
+            pause = jittered_backoff(bucket["strikes"], self.settings["penalty_pause"], 2, self.settings["max_backoff"])
+            bucket["strikes"] += 1
+            bucket["paused_until"] = max(bucket["paused_until"], now + pause)
+            bucket["tokens"] = min(bucket["tokens"], 0.0)
+            rate = bucket["rate"]
+        METRICS.incr(f"rate_limit.{reason}")
+        logger.info("Throttling %s to %.2f req/s for %s, pausing %.1fs", key, rate, reason, pause)
+        return pause
+
+    def rate(self, url):
+        """Return the current requests per second allowed for the URL's domain."""
+        with self._lock:
+            return self._refill(rate_limit_key(url), time.monotonic())["rate"]
+
+    def _refill(self, key, now):
+        """Return the domain's bucket after adding the tokens earned since its last update."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {"rate": self.settings["rate"], "tokens": float(self.settings["burst"]),
+                                           "updated": now, "paused_until": 0.0, "strikes": 0}
+        bucket["tokens"] = min(self.settings["burst"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+        bucket["updated"] = now
+        return bucket
+
+# Process-wide limiter shared by every driver and HTTP worker
+RATE_LIMITER = RateLimiter()
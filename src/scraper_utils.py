@@ -2,26 +2,56 @@
 Utility functions for the Facebook Ad Scraper.
 """
 
+import gc
+import logging
 import re
-import time
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from src.config import SCRAPER_SETTINGS
-
-def extract_urls_from_page(driver, category, unique_category_url_pairs):
+import sys
+from src.config import HTTP_SETTINGS, SCRAPER_SETTINGS
+from src.scroll_engine import scroll_until_stable
+from src.ad_records import capture_ad_cards, records_from_html
+from src.harvester import capture_new_fragments, harvest_new_links
+from src.html_parsers import harvest_links
+from src.network_harvester import capture_search_request, harvest_network_links, replay_search_pages
+from src.memory_guard import MemoryLimitExceeded
+from src.metrics import METRICS
+from src.snapshot_cache import FEED, snapshot_cache, store_snapshot
+from src.url_utils import CANONICAL_FACEBOOK_ORIGIN, canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every canonical Facebook page URL; checked after canonicalization, so
+# fb.com, m.facebook.com and link-shim hrefs are kept as well
+FACEBOOK_PAGE_PREFIX = CANONICAL_FACEBOOK_ORIGIN + "/"
+
+def extract_urls_from_page(driver, category, unique_category_url_pairs, on_progress=None, memory_guard=None,
+                           on_records=None):
     """Extract Facebook page URLs from the loaded page.
     
     Args:
         driver: Selenium WebDriver instance
         category: The category being processed
         unique_category_url_pairs: Set to store unique (category, URL) pairs
+        on_progress: Optional callable invoked with the set of newly added pairs
+            after every harvest batch, e.g. to checkpoint them
+        memory_guard: Optional MemoryGuard; in the stream, network and replay modes the
+            tab is recycled and the feed resumed whenever it reports a crossed threshold
+        on_records: Optional callable invoked with lists of AdRecord objects read from the
+            feed's cards (see src/ad_records.py), in the stream and page_source modes
+
+    When snapshots are enabled, the feed is stored in the snapshot cache: the
+    whole page source in "page_source" mode, the HTML of every harvested card
+    in "stream" mode.
         
     Returns:
-        None, updates unique_category_url_pairs set in-place
+        int: Result count shown in the results heading (None if it could not be read);
+            unique_category_url_pairs is updated in-place
     """
+    # Selenium is only needed once a browser is running, keep it out of module import
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     # Wait for the page to load
     try:
         WebDriverWait(driver, SCRAPER_SETTINGS["page_load_timeout"]).until(
@@ -29,10 +59,11 @@ def extract_urls_from_page(driver, category, unique_category_url_pairs):
         )
     except TimeoutException:
         print(f"Timeout waiting for page to load for category '{category}'")
-        return
+        return None
     
     # Get the number of results from the heading element
     scroll_attempts = SCRAPER_SETTINGS["max_scroll_attempts"]  # Default value
+    results_count = None
     try:
         # Wait for the results heading to appear
         results_element = WebDriverWait(driver, SCRAPER_SETTINGS["page_load_timeout"]).until(
@@ -47,37 +78,194 @@ def extract_urls_from_page(driver, category, unique_category_url_pairs):
             results_count = int(match.group(1).replace(',', ''))
             # Calculate scroll attempts (results / 100)
             calculated_attempts = results_count // 100
-            # Use the calculated value, but not less than max_scroll_attempts
+            # Use the calculated value as an upper bound, but not less than max_scroll_attempts
             scroll_attempts = max(calculated_attempts, SCRAPER_SETTINGS["max_scroll_attempts"])
-            print(f"Found {results_count} results, setting scroll attempts to {scroll_attempts}")
+            print(f"Found {results_count} results, capping scroll attempts at {scroll_attempts}")
     except Exception as e:
         print(f"Could not extract results count: {e}. Using default scroll attempts.")
     
-    # Scroll down to load more content
-    for i in range(scroll_attempts):
-        print(f"Scroll attempt {i+1}/{scroll_attempts}")
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCRAPER_SETTINGS["scroll_delay"])  # Wait for content to load
+    def add_hrefs(hrefs):
+        # Canonicalize a batch of harvested hrefs and report the pairs that are new
+        batch = set()
+        METRICS.incr("links_harvested", len(hrefs))
+        with METRICS.timer("link_processing", category=category):
+            process_hrefs(hrefs, category, batch)
+        batch -= unique_category_url_pairs
+        METRICS.incr("pairs_added", len(batch))
+        unique_category_url_pairs.update(batch)
+        if on_progress and batch:
+            on_progress(batch)
+
+    harvest_mode = SCRAPER_SETTINGS["harvest_mode"]
+    feed_url = driver.current_url
+    if harvest_mode == "stream":
+        # Harvest new links in the browser after every scroll batch instead of parsing the whole DOM at the end
+        recycled = []
+        fragments = [] if snapshot_cache() is not None else None
+
+        def harvest(driver):
+            with METRICS.timer("harvest", category=category):
+                if fragments is not None:
+                    # Captured before harvest_new_links() may prune the cards
+                    fragments.extend(capture_new_fragments(driver))
+                cards = capture_ad_cards(driver) if on_records is not None else None
+                # A recycled tab re-scrolls cards that were already harvested, prune them to keep it small
+                hrefs = harvest_new_links(driver, prune=True if recycled else None)
+            add_hrefs(hrefs)
+            if cards:
+                on_records(records_from_html("\n".join(cards), category))
+
+        scroll_with_recycling(driver, category, scroll_attempts, harvest, memory_guard,
+                              on_recycle=lambda driver: recycled.append(True))
+        if fragments:
+            # Cards re-scrolled after a tab recycle are captured twice
+            store_snapshot(feed_url, "<html><body>\n" + "\n".join(dict.fromkeys(fragments)) + "\n</body></html>",
+                           kind=FEED, category=category)
+        return results_count
+
+    if harvest_mode in ("network", "replay"):
+        if on_records is not None:
+            print(f"[{category}] Ad records are only read from rendered cards, not in '{harvest_mode}' mode")
+        # The first ads are rendered server-side, later ones arrive as search JSON
+        add_hrefs(harvest_new_links(driver))
+        state = {}
+        if harvest_mode == "replay":
+            add_hrefs(capture_search_request(driver, state))
+            if state.get("request") and state.get("cursor") and not state.get("complete"):
+                replay_search(driver, category, state, add_hrefs)
+                return results_count
+            print(f"[{category}] No search request captured, falling back to network harvesting while scrolling")
+
+        def harvest(driver):
+            with METRICS.timer("harvest", category=category):
+                hrefs = harvest_network_links(driver, state)
+            add_hrefs(hrefs)
+
+        def resume_from_cursor(driver):
+            # Continue the feed from the last search cursor over HTTP instead of re-scrolling it
+            if state.get("request") and state.get("cursor") and not state.get("complete"):
+                replay_search(driver, category, state, add_hrefs)
+                return True
+            state.pop("pending", None)
+            return False
+
+        scroll_with_recycling(driver, category, scroll_attempts, harvest, memory_guard, on_recycle=resume_from_cursor)
+        return results_count
+
+    # Scroll down to load more content, stopping once the feed stops growing
+    scroll_until_stable(driver, scroll_attempts)
     
     # Get the page source after scrolling
-    page_source = driver.page_source
-    soup = BeautifulSoup(page_source, "html.parser")
-    
-    # Method 1: Find all divs with class "_3qn7" and extract the anchor tags from them
-    divs = soup.find_all('div', class_="_3qn7")
-    print(f"Found {len(divs)} divs with class '_3qn7'")
-    
-    for div in divs:
-        links = div.find_all('a')
-        for link in links:
-            process_link(link, category, unique_category_url_pairs)
-    
-    # Method 2: Find all links that have target="_blank" and might be Facebook page links
-    target_blank_links = soup.find_all('a', target="_blank")
-    print(f"Found {len(target_blank_links)} links with target='_blank'")
-    
-    for link in target_blank_links:
-        process_link(link, category, unique_category_url_pairs)
+    with METRICS.timer("page_source_fetch", category=category):
+        page_source = driver.page_source
+    store_snapshot(feed_url, page_source, kind=FEED, category=category)
+
+    before = len(unique_category_url_pairs)
+    from src.parallel_parse import parallel_harvest_pairs, should_parse_in_parallel
+    if should_parse_in_parallel(page_source):
+        # Large dumps are split at card boundaries and parsed on every core
+        with METRICS.timer("parallel_parse", category=category):
+            link_count, pairs = parallel_harvest_pairs(page_source, category)
+        unique_category_url_pairs.update(pairs)
+    else:
+        # Collect links inside divs with class "_3qn7" and links with target="_blank"
+        # in a single pass over the document
+        with METRICS.timer("parse", category=category):
+            hrefs = harvest_links(page_source)
+        link_count = len(hrefs)
+        with METRICS.timer("link_processing", category=category):
+            process_hrefs(hrefs, category, unique_category_url_pairs)
+    METRICS.incr("links_harvested", link_count)
+    print(f"Found {link_count} links in '_3qn7' cards or with target='_blank'")
+    METRICS.incr("pairs_added", len(unique_category_url_pairs) - before)
+    if on_records is not None:
+        on_records(records_from_html(page_source, category))
+
+    if on_progress:
+        on_progress(set(unique_category_url_pairs))
+    return results_count
+
+def scroll_with_recycling(driver, category, max_scrolls, harvest, memory_guard=None, on_recycle=None):
+    """Scroll the feed, recycling the tab whenever the memory guard reports a crossed threshold.
+
+    The guard is checked after every harvest batch, so everything loaded so
+    far is harvested before the tab is closed. The feed is then re-opened in
+    a fresh tab and scrolled back to where it was (skip-ahead) before new
+    scrolls count against max_scrolls, unless on_recycle resumes it another way.
+    Skip-ahead scrolls are neither harvested nor checked against the guard,
+    the first batch after them harvests (and in stream mode prunes) the tab.
+
+    Raises:
+        MemoryLimitExceeded: with restart_driver set if the browser stays over the
+            limit in a fresh tab, so the driver is replaced and the feed resumed;
+            without it if the feed cannot get further under the limit or the guard
+            ran out of recycles, so the shard fails instead of counting as done
+
+    Args:
+        driver: Selenium WebDriver instance with the feed loaded
+        category: The category being processed
+        max_scrolls: Scrolls into the feed at most, across every recycled tab
+        harvest: Callable invoked with the driver after every scroll batch
+        memory_guard: Optional MemoryGuard, without one this is scroll_until_stable()
+        on_recycle: Optional callable invoked with the driver after each recycle;
+            returning True means it resumed the feed itself and scrolling stops
+    """
+    from src.browser import recycle_tab
+    stop_when = memory_guard.over_limit if memory_guard else None
+    url = driver.current_url
+    # Deepest scroll any tab got to; only scrolls beyond it count against max_scrolls
+    reached = 0
+    while True:
+        if reached:
+            with METRICS.timer("skip_ahead", category=category):
+                skip = scroll_until_stable(driver, reached)
+            if skip["stopped_early"]:
+                # The feed ended before the point the previous tab got to
+                return
+        stats = scroll_until_stable(driver, max_scrolls - reached, on_batch=harvest, stop_when=stop_when)
+        if not stats["interrupted"]:
+            return
+        # A recycled tab that hits the threshold before getting further into the feed would loop forever
+        progressed = stats["scrolls"] > 0
+        reached += stats["scrolls"]
+        if not progressed or not memory_guard.can_recycle():
+            driver.needs_recycle = True
+            raise MemoryLimitExceeded(f"Memory threshold crossed after {memory_guard.recycles} recycles, "
+                                      f"the feed stopped at {reached} scrolls")
+
+        memory_guard.recycles += 1
+        print(f"[{category}] Memory threshold crossed at {reached} scrolls, recycling the tab")
+        with METRICS.timer("tab_recycle", category=category):
+            recycle_tab(driver, url)
+        gc.collect()
+        if memory_guard.over_limit(driver):
+            # The browser itself stays bloated, only a new one gets the feed further
+            driver.needs_recycle = True
+            raise MemoryLimitExceeded("Browser memory stays over the threshold in a fresh tab", restart_driver=True)
+        if on_recycle and on_recycle(driver):
+            return
+
+def replay_search(driver, category, state, add_hrefs):
+    """Page through the captured search request over HTTP with the browser's cookies.
+
+    Args:
+        driver: Selenium WebDriver instance the request was captured from
+        category: The category being processed
+        state: State filled by capture_search_request ("request" and "cursor")
+        add_hrefs: Callable receiving each page's URLs
+    """
+    from src.http_fetcher import create_session
+    with create_session() as session:
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        pages = 0
+        with METRICS.timer("search_replay", category=category):
+            for hrefs in replay_search_pages(session, state["request"], state["cursor"],
+                                             timeout=HTTP_SETTINGS["timeout"]):
+                pages += 1
+                add_hrefs(hrefs)
+    METRICS.incr("search_pages", pages)
+    print(f"[{category}] Replayed {pages} search result pages")
 
 def process_link(link, category, unique_category_url_pairs):
     """Process a link element and add to unique pairs if valid.
@@ -87,14 +275,48 @@ def process_link(link, category, unique_category_url_pairs):
         category: The category being processed
         unique_category_url_pairs: Set to store unique (category, URL) pairs
     """
-    href = link.get('href')
-    if href and 'facebook.com' in href:
-        # Clean the URL
-        match = re.search(r'(https://www\.facebook\.com/[^/?]+)', href)
-        if match:
-            clean_href = match.group(1)
-            unique_category_url_pairs.add((category, clean_href))
-            print(f"Added URL: {clean_href}")
-        else:
-            unique_category_url_pairs.add((category, href))
-            print(f"Added URL (unclean): {href}")
+    process_href(link.get('href'), category, unique_category_url_pairs)
+
+def process_hrefs(hrefs, category, unique_category_url_pairs):
+    """Clean a batch of href values and add the valid ones to unique pairs.
+
+    Repeated hrefs (the same advertiser shows up on many cards) are dropped
+    before any URL work, and the category string is interned so every pair
+    of the batch shares it. Added URLs are only logged at DEBUG level.
+
+    Args:
+        hrefs: Iterable of raw href attribute values, may contain None
+        category: The category being processed
+        unique_category_url_pairs: Set to store unique (category, URL) pairs
+
+    Returns:
+        tuple: (distinct hrefs, pairs added)
+    """
+    category = sys.intern(category)
+    pairs = unique_category_url_pairs
+    add = pairs.add
+    before = len(pairs)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    distinct = set(hrefs)
+    for href in distinct:
+        # Reduce the URL to its canonical form so redirect and host variants dedupe
+        clean_href = canonicalize_url(href)
+        if clean_href and clean_href.startswith(FACEBOOK_PAGE_PREFIX):
+            if debug and (category, clean_href) not in pairs:
+                logger.debug("Added URL: %s", clean_href)
+            add((category, clean_href))
+    return len(distinct), len(pairs) - before
+
+def process_href(href, category, unique_category_url_pairs):
+    """Clean an href value and add it to unique pairs if valid.
+    
+    Args:
+        href: Raw href attribute value, may be None
+        category: The category being processed
+        unique_category_url_pairs: Set to store unique (category, URL) pairs
+    """
+    # Reduce the URL to its canonical form so redirect and host variants dedupe
+    clean_href = canonicalize_url(href)
+    if clean_href and clean_href.startswith(FACEBOOK_PAGE_PREFIX):
+        unique_category_url_pairs.add((category, clean_href))
+        logger.debug("Added URL: %s", clean_href)
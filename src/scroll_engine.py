@@ -0,0 +1,118 @@
+"""
+Adaptive infinite-scroll engine for the Facebook Ad Scraper.
+"""
+
+import time
+from src.config import SCRAPER_SETTINGS
+from src.metrics import METRICS
+
+# Scrolls to the bottom of the feed and resolves as soon as the feed grows
+# (more cards or a taller document), or after max_wait_ms if nothing changes.
+SCROLL_AND_WAIT_JS = """
+const cardSelector = arguments[0];
+const maxWaitMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const countCards = () => document.querySelectorAll(cardSelector).length;
+const cardsBefore = countCards();
+const heightBefore = document.body.scrollHeight;
+let finished = false;
+let observer = null;
+let timer = null;
+const finish = () => {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    done({cards: countCards(), height: document.body.scrollHeight});
+};
+observer = new MutationObserver(() => {
+    if (countCards() > cardsBefore || document.body.scrollHeight > heightBefore) finish();
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(finish, maxWaitMs);
+window.scrollTo(0, document.body.scrollHeight);
+"""
+
+def scroll_until_stable(driver, max_scrolls, max_wait=None, stable_rounds=None, card_selector=None,
+                        on_batch=None, batch_size=None, stop_when=None):
+    """Scroll the feed until it stops growing or max_scrolls is reached.
+
+    Each scroll waits on a MutationObserver in the page instead of sleeping for
+    a fixed delay, so it returns as soon as new cards arrive. The loop stops
+    early once ``stable_rounds`` consecutive scrolls add neither cards nor height.
+
+    Args:
+        driver: Selenium WebDriver instance with the feed loaded
+        max_scrolls: Hard cap on the number of scrolls
+        max_wait: Seconds to wait for growth after each scroll, defaults to SCRAPER_SETTINGS["scroll_delay"]
+        stable_rounds: Consecutive no-growth scrolls before stopping, defaults to SCRAPER_SETTINGS["scroll_stable_rounds"]
+        card_selector: CSS selector counted as feed cards, defaults to SCRAPER_SETTINGS["card_selector"]
+        on_batch: Optional callable invoked with the driver every batch_size scrolls and once at the end
+        batch_size: Scrolls between on_batch calls, defaults to SCRAPER_SETTINGS["harvest_every"]
+        stop_when: Optional callable invoked with the driver after every on_batch call;
+            a true result ends the loop right away, e.g. to recycle a tab that uses too much memory
+
+    Returns:
+        dict: Scroll statistics with keys "scrolls", "elapsed", "cards",
+              "new_cards_per_scroll", "stopped_early" and "interrupted"
+    """
+    max_wait = SCRAPER_SETTINGS["scroll_delay"] if max_wait is None else max_wait
+    stable_rounds = stable_rounds or SCRAPER_SETTINGS["scroll_stable_rounds"]
+    card_selector = card_selector or SCRAPER_SETTINGS["card_selector"]
+    batch_size = batch_size or SCRAPER_SETTINGS["harvest_every"]
+
+    start = time.monotonic()
+    cards, height = _feed_size(driver, card_selector)
+    new_cards_per_scroll = []
+    idle_rounds = 0
+    scrolls = 0
+    interrupted = False
+
+    for scrolls in range(1, max_scrolls + 1):
+        with METRICS.timer("scroll"):
+            state = driver.execute_async_script(SCROLL_AND_WAIT_JS, card_selector, int(max_wait * 1000))
+        new_cards = state["cards"] - cards
+        grew = new_cards > 0 or state["height"] > height
+        cards, height = state["cards"], state["height"]
+        new_cards_per_scroll.append(new_cards)
+
+        idle_rounds = 0 if grew else idle_rounds + 1
+        if idle_rounds >= stable_rounds:
+            break
+
+        if on_batch and scrolls % batch_size == 0:
+            on_batch(driver)
+            if stop_when and stop_when(driver):
+                interrupted = True
+                break
+            # The callback may prune the DOM, so measure growth from the new baseline
+            cards, height = _feed_size(driver, card_selector)
+
+    if on_batch and not interrupted:
+        on_batch(driver)
+
+    elapsed = time.monotonic() - start
+    METRICS.observe("scroll_loop", elapsed)
+    METRICS.incr("scrolls", scrolls)
+    METRICS.incr("cards_loaded", sum(new_cards_per_scroll))
+    stats = {
+        "scrolls": scrolls,
+        "elapsed": elapsed,
+        "cards": sum(new_cards_per_scroll),
+        "new_cards_per_scroll": new_cards_per_scroll,
+        "stopped_early": scrolls < max_scrolls and not interrupted,
+        "interrupted": interrupted,
+    }
+    avg_new = sum(new_cards_per_scroll) / scrolls if scrolls else 0
+    print(f"Scrolled {scrolls}/{max_scrolls} times in {elapsed:.1f}s, "
+          f"{stats['cards']} cards loaded ({avg_new:.1f} new per scroll)"
+          f"{', feed stopped growing' if stats['stopped_early'] else ''}"
+          f"{', interrupted' if interrupted else ''}")
+    return stats
+
+def _feed_size(driver, card_selector):
+    """Return the current (card count, document height) of the feed."""
+    return driver.execute_script(
+        "return [document.querySelectorAll(arguments[0]).length, document.body.scrollHeight];",
+        card_selector,
+    )
@@ -0,0 +1,142 @@
+"""
+Crawl job model for the Facebook Ad Scraper.
+
+A crawl is the cross product of categories, countries, active statuses and
+media types. Each combination is a shard: one Ad Library search that is
+crawled, checkpointed and reported on its own. Shards are ordered by
+priority and estimated cost (the result count the Ad Library reported the
+last time the shard was crawled). They can be split into n balanced slices
+so that one crawl runs across several machines (python main.py --shard i/n).
+"""
+
+import statistics
+from collections import namedtuple
+from src.config import (
+    ACTIVE_STATUSES, BASE_URL, CATEGORIES, CATEGORY_PRIORITIES, COUNTRIES, MEDIA_TYPES, SCRAPER_SETTINGS,
+)
+
+# Estimated result count of a shard that was never crawled and has no crawled siblings
+DEFAULT_SHARD_COST = SCRAPER_SETTINGS["max_scroll_attempts"] * 100
+
+class Shard(namedtuple("Shard", "category country active_status media_type priority")):
+    """One Ad Library search: a category in a country, status and media type."""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Stable identifier, e.g. "cloth|BD|all|all", used for checkpoints and statistics."""
+        return "|".join((self.category, self.country, self.active_status, self.media_type))
+
+    @property
+    def url(self):
+        """Ad Library search URL of the shard."""
+        return BASE_URL.format(CATEGORY=self.category, COUNTRY=self.country,
+                               ACTIVE_STATUS=self.active_status, MEDIA_TYPE=self.media_type)
+
+    @classmethod
+    def for_category(cls, category):
+        """Return the shard of a category in the first configured country, status and media type."""
+        return cls(category, COUNTRIES[0], ACTIVE_STATUSES[0], MEDIA_TYPES[0], CATEGORY_PRIORITIES.get(category, 0))
+
+def expand_shards(categories=None, countries=None, active_statuses=None, media_types=None, priorities=None):
+    """Expand categories x countries x statuses x media types into shards.
+
+    Args:
+        categories: Defaults to CATEGORIES
+        countries: Defaults to COUNTRIES
+        active_statuses: Defaults to ACTIVE_STATUSES
+        media_types: Defaults to MEDIA_TYPES
+        priorities: Dict mapping category to priority, defaults to CATEGORY_PRIORITIES
+
+    Returns:
+        list: Shard tuples, in expansion order
+    """
+    priorities = CATEGORY_PRIORITIES if priorities is None else priorities
+    return [
+        Shard(category, country, status, media_type, priorities.get(category, 0))
+        for category in categories or CATEGORIES
+        for country in countries or COUNTRIES
+        for status in active_statuses or ACTIVE_STATUSES
+        for media_type in media_types or MEDIA_TYPES
+    ]
+
+def estimate_costs(shards, stats=None):
+    """Estimate the cost of each shard from its last reported result count.
+
+    Shards without history are estimated from the median of crawled shards
+    of the same category, then of all crawled shards, then DEFAULT_SHARD_COST.
+
+    Args:
+        shards: Shards to estimate
+        stats: Dict mapping shard key to {"results": ...}, e.g. UrlIndex.shard_stats()
+
+    Returns:
+        dict: Shard key -> estimated result count
+    """
+    stats = stats or {}
+    known = {key: entry["results"] for key, entry in stats.items() if entry.get("results")}
+    overall = statistics.median(known.values()) if known else DEFAULT_SHARD_COST
+    by_category = {}
+    for key, results in known.items():
+        by_category.setdefault(key.split("|", 1)[0], []).append(results)
+
+    costs = {}
+    for shard in shards:
+        if shard.key in known:
+            costs[shard.key] = known[shard.key]
+        elif shard.category in by_category:
+            costs[shard.key] = statistics.median(by_category[shard.category])
+        else:
+            costs[shard.key] = overall
+    return costs
+
+def schedule_shards(shards, costs):
+    """Order shards for crawling: highest priority first, then most expensive first.
+
+    Starting the longest shards first keeps workers from idling at the end of a run.
+
+    Args:
+        shards: Shards to order
+        costs: Shard key -> estimated cost, see estimate_costs()
+
+    Returns:
+        list: The shards in crawl order
+    """
+    return sorted(shards, key=lambda shard: (-shard.priority, -costs.get(shard.key, 0), shard.key))
+
+def slice_shards(shards, index, count, costs):
+    """Return slice `index` (1-based) of `count` cost-balanced slices of the shards.
+
+    Every machine computes the same partition as long as it sees the same
+    shards and costs (the URL index is committed with the outputs).
+
+    Args:
+        shards: All shards of the crawl
+        index: Slice number, 1 <= index <= count
+        count: Number of slices
+        costs: Shard key -> estimated cost, see estimate_costs()
+
+    Returns:
+        list: The shards of the slice, in crawl order
+    """
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard slice {index}/{count} is out of range")
+    loads = [0.0] * count
+    slices = [[] for _ in range(count)]
+    # Greedy longest-processing-time assignment onto the least loaded slice
+    for shard in sorted(shards, key=lambda shard: (-costs.get(shard.key, 0), shard.key)):
+        target = min(range(count), key=lambda i: (loads[i], i))
+        loads[target] += costs.get(shard.key, 0)
+        slices[target].append(shard)
+    return schedule_shards(slices[index - 1], costs)
+
+def parse_shard_slice(value):
+    """Parse a "--shard i/n" value into (i, n)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected a shard slice like 1/4, got {value!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard slice {value} is out of range")
+    return index, count
@@ -0,0 +1,244 @@
+"""
+Content-addressed snapshot cache of fetched HTML for the Facebook Ad Scraper.
+
+When enabled (SNAPSHOT_SETTINGS["enabled"] or --snapshots), every page the
+phone extractor loads and every feed the ad scraper harvests is stored
+gzip-compressed under the SHA-256 of its content, indexed by URL and fetch
+time in a small SQLite database. Identical content is stored once. The
+least recently used objects are evicted once the cache outgrows
+SNAPSHOT_SETTINGS["max_mb"].
+
+reparse.py runs the current extractors over the cached snapshots, so a
+selector fix can be applied to the whole history without scraping again.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from src.config import SNAPSHOT_SETTINGS
+from src.metrics import METRICS
+
+# Snapshot kinds: a Facebook page loaded for its phone number, or an Ad Library feed
+PAGE = "page"
+FEED = "feed"
+
+class SnapshotCache:
+    """Compressed HTML blobs keyed by content hash, indexed by URL and fetch time.
+
+    Example:
+        with SnapshotCache() as cache:
+            cache.put(url, html, kind="page")
+            for snapshot in cache.snapshots(kind="page"):
+                html = cache.read(snapshot["sha256"])
+    """
+
+    def __init__(self, directory=None, max_mb=None):
+        """Open (or create) the cache.
+
+        Args:
+            directory: Cache directory, defaults to SNAPSHOT_SETTINGS["dir"]
+            max_mb: Compressed size kept before evicting, defaults to SNAPSHOT_SETTINGS["max_mb"]
+        """
+        self.directory = directory or SNAPSHOT_SETTINGS["dir"]
+        self.max_bytes = (max_mb or SNAPSHOT_SETTINGS["max_mb"]) * 1_000_000
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        # Crawl worker processes share the database, wait for each other's writes
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                kind TEXT NOT NULL,
+                category TEXT NOT NULL DEFAULT '',
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (url, fetched_at, kind)
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_sha256 ON snapshots (sha256);
+        """)
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def object_path(self, sha256):
+        """Return the file holding the compressed object `sha256`."""
+        return os.path.join(self.directory, "objects", sha256[:2], f"{sha256}.html.gz")
+
+    def put(self, url, html, kind=PAGE, category="", fetched_at=None):
+        """Store a snapshot of `url`, writing its content only if it is not cached yet.
+
+        Args:
+            url: Canonical URL the HTML was fetched from
+            html: Page source or harvested DOM fragments
+            kind: PAGE or FEED
+            category: Category the URL was found or crawled under
+            fetched_at: Timestamp of the fetch, defaults to now
+
+        Returns:
+            str: SHA-256 of the content
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        data = html.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.object_path(sha256)
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if not known or not os.path.exists(path):
+            with METRICS.timer("snapshot_write", kind=kind):
+                compressed = gzip.compress(data, compresslevel=SNAPSHOT_SETTINGS["compression_level"])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write then rename, so readers in other processes never see a partial object
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+        with self._lock:
+            if not known:
+                self._conn.execute("INSERT OR IGNORE INTO objects (sha256, size, raw_size, last_access) VALUES (?, ?, ?, ?)",
+                                   (sha256, len(compressed), len(data), fetched_at))
+                self._size += len(compressed)
+                METRICS.incr("snapshots.bytes_written", len(compressed))
+            else:
+                self._conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (fetched_at, sha256))
+                METRICS.incr("snapshots.deduplicated")
+            self._conn.execute("INSERT OR REPLACE INTO snapshots (url, fetched_at, kind, category, sha256) "
+                               "VALUES (?, ?, ?, ?, ?)", (url, fetched_at, kind, category or "", sha256))
+            self._conn.commit()
+            over = self._size > self.max_bytes
+        METRICS.incr(f"snapshots.{kind}")
+        if over:
+            self.evict()
+        return sha256
+
+    def read(self, sha256):
+        """Return the HTML of object `sha256` and mark it as recently used, None if it was evicted."""
+        html = read_object(self.object_path(sha256))
+        if html is not None:
+            with self._lock:
+                self._conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+                self._conn.commit()
+        return html
+
+    def snapshots(self, kind=None, latest_only=True, since=None):
+        """List cached snapshots.
+
+        Args:
+            kind: Only snapshots of this kind (PAGE or FEED)
+            latest_only: Only the most recent snapshot of each (URL, kind)
+            since: Only snapshots fetched at or after this timestamp
+
+        Returns:
+            list: Dicts with "url", "fetched_at", "kind", "category", "sha256" and "path", oldest first
+        """
+        where, params = ["1 = 1"], []
+        if kind:
+            where.append("kind = ?")
+            params.append(kind)
+        if since:
+            where.append("fetched_at >= ?")
+            params.append(since)
+        query = f"SELECT url, fetched_at, kind, category, sha256 FROM snapshots WHERE {' AND '.join(where)}"
+        if latest_only:
+            query = (f"SELECT url, MAX(fetched_at), kind, category, sha256 FROM snapshots "
+                     f"WHERE {' AND '.join(where)} GROUP BY url, kind")
+        with self._lock:
+            rows = self._conn.execute(f"{query} ORDER BY 2", params).fetchall()
+        return [{"url": url, "fetched_at": fetched_at, "kind": kind, "category": category, "sha256": sha256,
+                 "path": self.object_path(sha256)} for url, fetched_at, kind, category, sha256 in rows]
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used objects, and their snapshots, until the cache fits `max_bytes`.
+
+        Returns:
+            int: Number of objects evicted
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._lock:
+            # Other processes may have written too, start from the size on disk
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            if self._size <= max_bytes:
+                return 0
+            rows = self._conn.execute("SELECT sha256, size FROM objects ORDER BY last_access").fetchall()
+            victims = []
+            for sha256, size in rows:
+                if self._size <= max_bytes:
+                    break
+                victims.append((sha256,))
+                self._size -= size
+            self._conn.executemany("DELETE FROM snapshots WHERE sha256 = ?", victims)
+            self._conn.executemany("DELETE FROM objects WHERE sha256 = ?", victims)
+            self._conn.commit()
+        for (sha256,) in victims:
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+            evicted += 1
+        METRICS.incr("snapshots.evicted", evicted)
+        print(f"Evicted {evicted} least recently used snapshots, cache is now {self._size / 1e6:.0f} MB")
+        return evicted
+
+    def stats(self):
+        """Return the number of snapshots and objects and their compressed and raw sizes in bytes."""
+        with self._lock:
+            snapshots = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            objects, size, raw_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM objects").fetchone()
+        return {"snapshots": snapshots, "objects": objects, "bytes": size, "raw_bytes": raw_size}
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def read_object(path):
+    """Return the HTML stored in a compressed object file, None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+    except FileNotFoundError:
+        return None
+
+# Cache shared by the threads of this process, opened on first use
+_shared = {}
+_shared_lock = threading.Lock()
+
+def snapshot_cache():
+    """Return the process-wide SnapshotCache, or None if snapshots are disabled.
+
+    Each process opens its own connection, so crawl worker processes forked
+    from a parent that already used the cache do not share its database handle.
+    """
+    if not SNAPSHOT_SETTINGS["enabled"]:
+        return None
+    with _shared_lock:
+        if _shared.get("pid") != os.getpid():
+            _shared["cache"] = SnapshotCache()
+            _shared["pid"] = os.getpid()
+        return _shared["cache"]
+
+def store_snapshot(url, html, kind=PAGE, category=""):
+    """Store a snapshot in the process-wide cache if snapshots are enabled; never raises."""
+    cache = snapshot_cache()
+    if cache is None or not html:
+        return
+    try:
+        cache.put(url, html, kind=kind, category=category)
+    except Exception as e:
+        print(f"Could not store snapshot of {url}: {e}")
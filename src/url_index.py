@@ -0,0 +1,170 @@
+"""
+Persistent cross-run index of discovered Facebook pages.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from src.config import URL_INDEX_FILE, PHONE_EXTRACTOR_SETTINGS
+
+class UrlIndex:
+    """SQLite index keyed by canonical page URL that persists between runs.
+
+    Records when each page was first and last seen, the categories it
+    appeared under and the result of the last phone lookup, so later runs
+    can skip pages that were already resolved recently. Also keeps the last
+    result count and crawl time of each shard, used to estimate shard costs.
+    """
+
+    def __init__(self, path=URL_INDEX_FILE):
+        """Open (or create) the index database.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                phone TEXT,
+                phone_checked_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS page_categories (
+                url TEXT NOT NULL,
+                category TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS page_categories_url_category
+                ON page_categories (url, category);
+            CREATE TABLE IF NOT EXISTS shard_stats (
+                shard TEXT PRIMARY KEY,
+                results INTEGER,
+                pairs INTEGER,
+                seconds REAL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def record_pairs(self, pairs, seen_at=None):
+        """Record (category, URL) pairs found by a scrape.
+
+        Args:
+            pairs: Iterable of (category, canonical URL) tuples
+            seen_at: Timestamp of the sighting, defaults to now
+
+        Returns:
+            set: URLs that were not in the index before this call
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        pairs = list(pairs)
+        urls = {url for _, url in pairs}
+        with self._lock:
+            known = self._known_urls(urls)
+            self._conn.executemany(
+                "INSERT INTO pages (url, first_seen, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET last_seen = excluded.last_seen",
+                [(url, seen_at, seen_at) for url in urls],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO page_categories (url, category) VALUES (?, ?)",
+                [(url, category) for category, url in pairs],
+            )
+            self._conn.commit()
+        return urls - known
+
+    def needs_phone_lookup(self, url, ttl=None, now=None):
+        """Return True if the page has never been looked up or its result is stale.
+
+        Args:
+            url: Canonical page URL
+            ttl: Seconds a lookup result stays fresh, defaults to PHONE_EXTRACTOR_SETTINGS["lookup_ttl"]
+            now: Current timestamp, defaults to now
+        """
+        ttl = PHONE_EXTRACTOR_SETTINGS["lookup_ttl"] if ttl is None else ttl
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute("SELECT phone_checked_at FROM pages WHERE url = ?", (url,)).fetchone()
+        return row is None or row[0] is None or now - row[0] > ttl
+
+    def record_phone(self, url, phone_number, checked_at=None):
+        """Store the result of a phone lookup, including empty results.
+
+        Args:
+            url: Canonical page URL
+            phone_number: The number found, or an empty string
+            checked_at: Timestamp of the lookup, defaults to now
+        """
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (url, first_seen, last_seen, phone, phone_checked_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET phone = excluded.phone, phone_checked_at = excluded.phone_checked_at",
+                (url, checked_at, checked_at, phone_number, checked_at),
+            )
+            self._conn.commit()
+
+    def categories(self, url):
+        """Return the sorted list of categories a page appeared under."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category FROM page_categories WHERE url = ? ORDER BY category", (url,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def record_shard(self, shard, results=None, pairs=None, seconds=None, updated_at=None):
+        """Record the outcome of crawling a shard; None values keep the previous ones.
+
+        Args:
+            shard: Shard key, see src/shards.py
+            results: Result count shown in the Ad Library heading
+            pairs: (category, URL) pairs harvested
+            seconds: Crawl time
+            updated_at: Timestamp, defaults to now
+        """
+        updated_at = time.time() if updated_at is None else updated_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO shard_stats (shard, results, pairs, seconds, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(shard) DO UPDATE SET results = COALESCE(excluded.results, results), "
+                "pairs = COALESCE(excluded.pairs, pairs), seconds = COALESCE(excluded.seconds, seconds), "
+                "updated_at = excluded.updated_at",
+                (shard, results, pairs, seconds, updated_at),
+            )
+            self._conn.commit()
+
+    def shard_stats(self):
+        """Return a dict mapping shard key to a dict with "results", "pairs" and "seconds"."""
+        with self._lock:
+            rows = self._conn.execute("SELECT shard, results, pairs, seconds FROM shard_stats").fetchall()
+        return {shard: {"results": results, "pairs": pairs, "seconds": seconds} for shard, results, pairs, seconds in rows}
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _known_urls(self, urls):
+        """Return the subset of urls already present in the index."""
+        known = set()
+        urls = list(urls)
+        # Stay below SQLite's host parameter limit
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(f"SELECT url FROM pages WHERE url IN ({placeholders})", chunk).fetchall()
+            known.update(row[0] for row in rows)
+        return known
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
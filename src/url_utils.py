@@ -0,0 +1,105 @@
+"""
+URL canonicalization for the Facebook Ad Scraper.
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Hosts that serve the same Facebook pages
+FACEBOOK_HOSTS = frozenset({
+    "facebook.com",
+    "www.facebook.com",
+    "m.facebook.com",
+    "web.facebook.com",
+    "mbasic.facebook.com",
+    "touch.facebook.com",
+    "fb.com",
+    "www.fb.com",
+})
+
+# Link shim hosts whose /l.php?u=<target> wraps outbound links
+REDIRECT_HOSTS = frozenset({"l.facebook.com", "lm.facebook.com"})
+
+# Query parameters that only carry tracking state
+TRACKING_PARAMS = frozenset({
+    "h", "fbclid", "__tn__", "__cft__[0]", "__xts__[0]", "ref", "refsrc",
+    "hc_ref", "_rdr", "_rdc", "mibextid", "rdid", "share_url", "igshid",
+})
+
+# Fast path: an already clean https://www.facebook.com/<page> link; profile.php needs its id parameter
+CLEAN_PAGE_PATTERN = re.compile(r'https://www\.facebook\.com/(?!profile\.php$)[A-Za-z0-9.\-]+')
+
+# Fast path: a page link on a Facebook host, with a trailing slash, query or fragment to drop
+FACEBOOK_PAGE_PATTERN = re.compile(
+    r'https?://(?:(?:www|m|web|mbasic|touch)\.)?facebook\.com/([A-Za-z0-9.\-]+)/?(?:[?#].*)?', re.DOTALL)
+
+CANONICAL_FACEBOOK_ORIGIN = "https://www.facebook.com"
+
+# Numeric page id of a /pages/ or /people/ path segment, alone or after the page name ("Shop-BD-1234567")
+PAGE_ID_SEGMENT_PATTERN = re.compile(r'(?:.*-)?(\d{5,})')
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(href):
+    """Map an href to a single canonical key for deduplication.
+
+    Unwraps l.facebook.com link-shim redirects, lowercases the host, strips
+    tracking parameters, fragments and trailing slashes, and maps every
+    Facebook host variant (m., web., fb.com, ...) to one page URL of the form
+    https://www.facebook.com/<page>.
+
+    Args:
+        href: Raw href value
+
+    Returns:
+        str: The canonical URL, or None if href is empty or not an http(s) URL
+    """
+    if not href:
+        return None
+    href = href.strip()
+    if CLEAN_PAGE_PATTERN.fullmatch(href):
+        return href
+    match = FACEBOOK_PAGE_PATTERN.fullmatch(href)
+    # profile.php pages are told apart by their id parameter
+    if match and match.group(1) != "profile.php":
+        return f"{CANONICAL_FACEBOOK_ORIGIN}/{match.group(1)}"
+
+    parts = urlsplit(href)
+    host = (parts.hostname or "").lower()
+
+    # Unwrap link-shim redirects; the target, possibly another shim, usually takes a fast path
+    if host in REDIRECT_HOSTS and parts.path == "/l.php":
+        target = dict(parse_qsl(parts.query)).get("u")
+        if target:
+            return canonicalize_url(target)
+
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not host:
+        return None
+
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if key not in TRACKING_PARAMS and not key.startswith("utm_")]
+
+    if host in FACEBOOK_HOSTS:
+        return _facebook_page_key(parts.path, query)
+
+    netloc = host if parts.port is None else f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+def _facebook_page_key(path, query):
+    """Reduce a Facebook path and query to the page they belong to."""
+    segments = [segment for segment in path.split("/") if segment]
+    if not segments:
+        return CANONICAL_FACEBOOK_ORIGIN
+    if segments[0] == "profile.php":
+        page_id = dict(query).get("id")
+        return f"{CANONICAL_FACEBOOK_ORIGIN}/profile.php?id={page_id}" if page_id else None
+    if segments[0] in ("pages", "people") and len(segments) >= 2:
+        # /pages/<name>/<id>/... and /pages/category/<category>/<name>-<id>/... are the page with that id
+        for segment in segments[2:]:
+            match = PAGE_ID_SEGMENT_PATTERN.fullmatch(segment)
+            if match:
+                return f"{CANONICAL_FACEBOOK_ORIGIN}/{match.group(1)}"
+        return f"{CANONICAL_FACEBOOK_ORIGIN}/{'/'.join(segments)}"
+    return f"{CANONICAL_FACEBOOK_ORIGIN}/{segments[0]}"
@@ -0,0 +1,320 @@
+"""
+Driver watchdog and self-healing for the Facebook Ad Scraper.
+
+A Chrome that crashes or a WebDriver connection that dies mid-scroll used to
+cost a retry, usually the whole shard, and a hung command could block its
+thread until the page load or script timeout. The DriverWatchdog sends a
+heartbeat script to every driver in use on a short interval. A driver whose
+chromedriver exited, or that has not answered a heartbeat for
+WATCHDOG_SETTINGS["stall_timeout"] seconds, is killed together with its
+Chrome process tree, so the blocked command fails right away instead.
+
+run_self_healing() then discards the dead driver, kills the Chrome processes
+its drivers launched that were orphaned by a crash, and runs the shard's work again on a fresh
+driver, keeping everything harvested so far: a crash costs a page load and a
+re-scroll instead of the shard.
+
+Processes are listed with psutil when it is installed and from /proc otherwise.
+"""
+
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from src.config import WATCHDOG_SETTINGS
+from src.memory_guard import MemoryLimitExceeded, process_tree
+from src.metrics import METRICS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Answered by any live page; queued behind a command the session is still busy with
+HEARTBEAT_JS = "return 1;"
+
+def service_pid(driver):
+    """Return the PID of the driver's chromedriver process, or None for remote or stand-in drivers."""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+def service_exited(driver):
+    """Return True if the driver's chromedriver process is known to have exited."""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    try:
+        return process is not None and process.poll() is not None
+    except Exception:
+        return False
+
+def heartbeat(driver, timeout=None):
+    """Return True if the driver answers the heartbeat script within `timeout` seconds.
+
+    The script runs on a daemon thread, so a hung session cannot block the caller.
+
+    Args:
+        driver: Selenium WebDriver instance
+        timeout: Seconds to wait, defaults to WATCHDOG_SETTINGS["heartbeat_timeout"]
+    """
+    timeout = WATCHDOG_SETTINGS["heartbeat_timeout"] if timeout is None else timeout
+    result = {}
+
+    def beat():
+        try:
+            result["ok"] = driver.execute_script(HEARTBEAT_JS) == 1
+        except Exception:
+            result["ok"] = False
+
+    thread = threading.Thread(target=beat, name="driver-heartbeat", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result.get("ok", False)
+
+def kill_process_tree(pid):
+    """Kill a process and all of its descendants, children first.
+
+    Returns:
+        int: Number of processes signalled
+    """
+    killed = 0
+    for current in reversed(process_tree(pid)):
+        try:
+            os.kill(current, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            continue
+    return killed
+
+# Chrome processes launched by this process's drivers, as {pid: start time}; the only ones
+# kill_orphaned_browsers() may kill, so browsers of other tools and users are never touched
+_launched = {}
+_launched_lock = threading.Lock()
+
+def _start_time(pid):
+    """Return a process's start time, which tells it apart from a later process reusing its PID, or None."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _process_info(pid):
+    """Return (parent PID, command line) of a process, or None if it cannot be read."""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return process.ppid(), " ".join(process.cmdline())
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+    except (OSError, ValueError, IndexError):
+        return None
+    return ppid, cmdline
+
+def register_browser(driver):
+    """Record the Chrome processes a newly started driver launched, see kill_orphaned_browsers()."""
+    pid = service_pid(driver)
+    if pid is None:
+        return
+    with _launched_lock:
+        for child in process_tree(pid)[1:]:
+            _launched[child] = _start_time(child)
+
+def kill_orphaned_browsers():
+    """Kill Chrome browsers launched by this process's drivers whose chromedriver is gone, with their renderers.
+
+    A browser whose parent is no longer a chromedriver was left behind by a
+    crash and would otherwise keep its memory and lock its persistent profile.
+    Only processes recorded by register_browser() are considered.
+
+    Returns:
+        int: Number of processes killed
+    """
+    if not WATCHDOG_SETTINGS["kill_orphans"]:
+        return 0
+    killed = 0
+    with _launched_lock:
+        for pid, started in list(_launched.items()):
+            info = _process_info(pid)
+            if info is None or _start_time(pid) != started:
+                # Exited, or its PID now belongs to another process
+                del _launched[pid]
+                continue
+            ppid, cmdline = info
+            if "--type=" in cmdline:
+                # Renderers and helpers go with their browser
+                continue
+            parent = _process_info(ppid)
+            if parent is not None and "chromedriver" in parent[1]:
+                continue
+            killed += kill_process_tree(pid)
+            del _launched[pid]
+    if killed:
+        METRICS.incr("watchdog.orphans_killed", killed)
+        print(f"Killed {killed} orphaned Chrome processes")
+    return killed
+
+class _Watch:
+    """A driver under watch and its heartbeat state."""
+
+    __slots__ = ("driver", "label", "last_ok", "beating", "killed")
+
+    def __init__(self, driver, label):
+        self.driver = driver
+        self.label = label
+        self.last_ok = time.monotonic()
+        self.beating = False
+        # Reason the watchdog killed the driver, None while it is alive
+        self.killed = None
+
+class DriverWatchdog:
+    """Heartbeats the drivers in use and kills the ones that crashed or stalled.
+
+    Example:
+        with WATCHDOG.watch(driver, "cloth|BD|all|all") as watch:
+            ...scroll and harvest...
+        if watch.killed:
+            ...restart the driver...
+    """
+
+    def __init__(self, interval=None, stall_timeout=None):
+        """Create the watchdog; its thread starts with the first watch().
+
+        Args:
+            interval: Seconds between heartbeats, defaults to WATCHDOG_SETTINGS["heartbeat_interval"]
+            stall_timeout: Seconds without an answered heartbeat before a driver is killed,
+                defaults to WATCHDOG_SETTINGS["stall_timeout"]
+        """
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @contextmanager
+    def watch(self, driver, label=""):
+        """Context manager heartbeating `driver` while the body runs.
+
+        Yields:
+            _Watch: Its `killed` attribute holds the reason if the watchdog killed the driver
+        """
+        watch = _Watch(driver, label)
+        with self._lock:
+            self._watches[id(watch)] = watch
+            # Threads do not survive into crawl worker processes, start one per process
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="driver-watchdog", daemon=True).start()
+        try:
+            yield watch
+        finally:
+            with self._lock:
+                self._watches.pop(id(watch), None)
+
+    def _run(self):
+        """Check every watched driver once per heartbeat interval."""
+        while True:
+            time.sleep(self.interval or WATCHDOG_SETTINGS["heartbeat_interval"])
+            with self._lock:
+                watches = list(self._watches.values())
+            for watch in watches:
+                self._check(watch)
+
+    def _check(self, watch):
+        """Send a heartbeat to a driver, or kill it if it exited or stopped answering."""
+        if watch.killed:
+            return
+        if service_exited(watch.driver):
+            self._kill(watch, "chromedriver exited")
+            return
+        stalled = time.monotonic() - watch.last_ok
+        stall_timeout = self.stall_timeout or WATCHDOG_SETTINGS["stall_timeout"]
+        if stalled > stall_timeout:
+            self._kill(watch, f"driver did not answer for {stalled:.0f}s")
+            return
+        if not watch.beating:
+            # One heartbeat in flight per driver; a hung session holds it until the driver is killed
+            watch.beating = True
+            threading.Thread(target=self._beat, args=(watch,), name="driver-heartbeat", daemon=True).start()
+
+    @staticmethod
+    def _beat(watch):
+        try:
+            if watch.driver.execute_script(HEARTBEAT_JS) == 1:
+                watch.last_ok = time.monotonic()
+        except Exception:
+            # E.g. no window while a tab is being recycled; only a lasting silence counts as a stall
+            pass
+        finally:
+            watch.beating = False
+
+    def _kill(self, watch, reason):
+        """Kill a driver's process tree so the command blocking its thread fails."""
+        watch.killed = reason
+        watch.driver.needs_recycle = True
+        METRICS.incr("watchdog.kills")
+        print(f"[{watch.label}] Watchdog: {reason}, killing the driver")
+        pid = service_pid(watch.driver)
+        if pid is not None:
+            kill_process_tree(pid)
+        else:
+            # No local process to kill, ending the session also fails the blocked command
+            threading.Thread(target=_quit_quietly, args=(watch.driver,), daemon=True).start()
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+# Process-wide watchdog shared by every crawl thread
+WATCHDOG = DriverWatchdog()
+
+def run_self_healing(pool, work, label="", max_restarts=None):
+    """Run work(driver) on a pooled driver, restarting the driver and running work again after a crash.
+
+    A failure counts as a crash if the watchdog killed the driver or the
+    driver no longer answers a heartbeat. A MemoryLimitExceeded asking for a
+    new browser restarts the driver the same way. Other errors, e.g. a page
+    load timeout in a healthy browser, are raised unchanged for the caller's retry.
+    `work` is expected to resume from state it keeps outside the driver.
+
+    Args:
+        pool: DriverPool to borrow drivers from
+        work: Callable taking a driver, its result is returned
+        label: Shard key used in messages
+        max_restarts: Driver restarts allowed, defaults to WATCHDOG_SETTINGS["max_restarts"]
+    """
+    if not WATCHDOG_SETTINGS["enabled"]:
+        with pool.driver() as driver:
+            return work(driver)
+    max_restarts = WATCHDOG_SETTINGS["max_restarts"] if max_restarts is None else max_restarts
+    restarts = 0
+    while True:
+        with pool.driver() as driver, WATCHDOG.watch(driver, label) as watch:
+            try:
+                return work(driver)
+            except Exception as e:
+                if isinstance(e, MemoryLimitExceeded):
+                    if not e.restart_driver or restarts >= max_restarts:
+                        raise
+                    reason = str(e)
+                elif restarts >= max_restarts or not (watch.killed or not heartbeat(driver)):
+                    raise
+                else:
+                    reason = watch.killed or f"driver stopped responding after {type(e).__name__}"
+                # Released as healthy by pool.driver(), this has the pool replace it
+                driver.needs_recycle = True
+        restarts += 1
+        METRICS.incr("driver_restarts")
+        print(f"[{label}] {reason}, restarting the driver and resuming ({restarts}/{max_restarts})")
+        kill_orphaned_browsers()
@@ -0,0 +1,65 @@
+"""
+Shared fixtures: a local HTTP server standing in for Facebook and an unthrottled rate limiter.
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The modules import each other as src.*, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import RATE_LIMIT_SETTINGS
+from src.metrics import METRICS
+from src.rate_limiter import RateLimiter
+
+PHONE_PAGE = ('<html><head><script type="application/json">{"telephone": "+8801712345678"}</script></head>'
+              '<body><a href="tel:+8801712345678">Call now</a></body></html>')
+NO_PHONE_PAGE = "<html><body><h1>Shop BD</h1><p>Clothing and accessories.</p></body></html>"
+JS_WALL_PAGE = '<html><body><form id="login_form"></form><noscript>Please enable JavaScript</noscript></body></html>'
+
+# Path -> (status, body) served by the fixture server
+ROUTES = {
+    "/phone": (200, PHONE_PAGE),
+    "/no-phone": (200, NO_PHONE_PAGE),
+    "/js-wall": (200, JS_WALL_PAGE),
+    "/throttled": (429, "Too Many Requests"),
+    "/unavailable": (503, "Service Unavailable"),
+}
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, body = ROUTES.get(self.path, (404, "Not Found"))
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="session")
+def http_server():
+    """Serve ROUTES on a free local port, yielding the server's base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def rate_limiter(monkeypatch):
+    """Replace the process-wide limiter with one that never waits, returning it."""
+    import phone_extractor
+    import src.http_fetcher
+    limiter = RateLimiter(dict(RATE_LIMIT_SETTINGS, rate=1000, max_rate=1000, burst=1000, penalty_pause=0))
+    monkeypatch.setattr(src.http_fetcher, "RATE_LIMITER", limiter)
+    monkeypatch.setattr(phone_extractor, "RATE_LIMITER", limiter)
+    METRICS.reset()
+    return limiter
@@ -0,0 +1,85 @@
+"""
+Tests of crawl checkpoints and resuming sharded crawls.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+import main
+from src.checkpoint import CheckpointStore
+from src.config import RATE_LIMIT_SETTINGS
+from src.rate_limiter import RateLimiter
+from src.shards import Shard
+
+BD = Shard("cloth", "BD", "all", "all", 0)
+US = Shard("cloth", "US", "all", "all", 0)
+
+class FakeDriver:
+    current_url = ""
+
+    def get(self, url):
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        return 1
+
+class FakePool:
+    @contextmanager
+    def driver(self):
+        yield FakeDriver()
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoint.sqlite3"))
+    yield store
+    store.close()
+
+def test_pairs_are_restored_per_shard(checkpoint):
+    checkpoint.record_pairs(BD.key, [("cloth", "https://www.facebook.com/a"), ("cloth", "https://www.facebook.com/b")])
+    checkpoint.record_pairs(US.key, [("cloth", "https://www.facebook.com/b")])
+
+    assert checkpoint.load_pairs(BD.key) == {("cloth", "https://www.facebook.com/a"), ("cloth", "https://www.facebook.com/b")}
+    assert checkpoint.load_pairs(US.key) == {("cloth", "https://www.facebook.com/b")}
+    assert checkpoint.load_pairs() == {("cloth", "https://www.facebook.com/a"), ("cloth", "https://www.facebook.com/b")}
+    assert checkpoint.progress()[US.key] == ("in_progress", 1)
+
+def test_resumed_shard_counts_only_its_own_pairs(checkpoint, monkeypatch):
+    # An interrupted run left pairs of both shards of the category behind
+    checkpoint.record_pairs(BD.key, [("cloth", f"https://www.facebook.com/bd{i}") for i in range(5)])
+    checkpoint.record_pairs(US.key, [("cloth", "https://www.facebook.com/us0")])
+
+    def extract_urls_from_page(driver, category, pairs, on_progress=None, **kwargs):
+        new = {(category, "https://www.facebook.com/us1")}
+        pairs.update(new)
+        on_progress(new)
+        return 2
+
+    monkeypatch.setattr("src.scraper_utils.extract_urls_from_page", extract_urls_from_page)
+    monkeypatch.setattr(main, "RATE_LIMITER", RateLimiter(dict(RATE_LIMIT_SETTINGS, rate=1000, burst=1000)))
+    pairs = set()
+
+    outcome = main.scrape_shard(FakePool(), US, pairs, threading.Lock(), checkpoint)
+
+    assert outcome["ok"]
+    assert outcome["pairs"] == 2
+    assert pairs == {("cloth", "https://www.facebook.com/us0"), ("cloth", "https://www.facebook.com/us1")}
+    assert checkpoint.completed_categories() == {US.key}
+
+def test_unsharded_checkpoint_is_migrated(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE pairs (category TEXT NOT NULL, url TEXT NOT NULL, PRIMARY KEY (category, url))")
+    conn.execute("INSERT INTO pairs VALUES ('cloth', 'https://www.facebook.com/a')")
+    conn.commit()
+    conn.close()
+
+    store = CheckpointStore(path)
+    try:
+        assert store.load_pairs("cloth") == {("cloth", "https://www.facebook.com/a")}
+        store.record_pairs(BD.key, [("cloth", "https://www.facebook.com/a")])
+        assert store.load_pairs(BD.key) == {("cloth", "https://www.facebook.com/a")}
+    finally:
+        store.close()
@@ -0,0 +1,103 @@
+"""
+Tests of the HTTP tier of phone extraction against the local fixture server.
+"""
+
+from conftest import PHONE_PAGE
+
+from phone_extractor import extract_phone_tiered, extract_phones_concurrently
+from src.driver_pool import DriverPool
+from src.http_fetcher import create_session, fetch_html
+from src.metrics import METRICS
+
+class _Element:
+    pass
+
+class FakeDriver:
+    """WebDriver stand-in rendering every page as `html`."""
+
+    def __init__(self, html):
+        self.page_source = html
+        self.current_url = ""
+        self.visited = []
+
+    def get(self, url):
+        self.current_url = url
+        self.visited.append(url)
+
+    def find_element(self, by, value):
+        return _Element()
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def quit(self):
+        pass
+
+def test_http_hit(http_server, rate_limiter):
+    matches, tier, browser_seconds = extract_phone_tiered(f"{http_server}/phone", create_session())
+
+    assert [match.number for match in matches] == ["+8801712345678"]
+    assert matches[0].source == "tel"
+    assert tier == "http"
+    assert browser_seconds == 0.0
+
+def test_http_page_without_phone_is_a_miss(http_server, rate_limiter):
+    matches, tier, _ = extract_phone_tiered(f"{http_server}/no-phone", create_session())
+
+    assert matches == []
+    assert tier == "http"
+
+def test_js_wall_falls_back_to_browser(http_server, rate_limiter):
+    url = f"{http_server}/js-wall"
+    initial_rate = rate_limiter.rate(url)
+    driver = FakeDriver(PHONE_PAGE)
+    with DriverPool(size=1, factory=lambda: driver) as pool:
+        matches, tier, _ = extract_phone_tiered(url, create_session(), pool)
+
+    assert [match.number for match in matches] == ["+8801712345678"]
+    assert tier == "browser"
+    assert driver.visited == [url]
+    # The wall is the cue to use the browser, not a throttling signal
+    assert rate_limiter.rate(url) == initial_rate
+    assert not any(name.startswith("rate_limit.") for name in METRICS.counters)
+
+def test_js_wall_without_browser_is_inconclusive(http_server, rate_limiter):
+    url = f"{http_server}/js-wall"
+    initial_rate = rate_limiter.rate(url)
+
+    matches, tier, _ = extract_phone_tiered(url, create_session(), pool=None)
+
+    assert matches is None
+    assert tier == ""
+    assert rate_limiter.rate(url) == initial_rate
+
+def test_no_browser_run_reports_js_wall_as_miss(http_server, rate_limiter):
+    results = []
+    url_data = [{"url": f"{http_server}/js-wall", "category": "cloth"},
+                {"url": f"{http_server}/phone", "category": "cloth"}]
+
+    stats = extract_phones_concurrently(url_data, results.append, workers=1, ordered=True,
+                                        http_first=True, browser_fallback=False)
+
+    assert [(result["phone_number"], result["tier"]) for result in results] == [
+        ("", ""), ("+8801712345678", "http")]
+    assert stats.hits == 1
+    assert stats.tiers[""] == 1
+
+def test_throttle_statuses_penalize_the_domain(http_server, rate_limiter):
+    session = create_session()
+    initial_rate = rate_limiter.rate(http_server)
+
+    assert fetch_html(session, f"{http_server}/throttled") is None
+    assert fetch_html(session, f"{http_server}/unavailable") is None
+
+    assert METRICS.counters["rate_limit.http_429"] == 1
+    assert METRICS.counters["rate_limit.http_503"] == 1
+    assert rate_limiter.rate(http_server) == initial_rate * rate_limiter.settings["decrease"] ** 2
+
+def test_healthy_response_raises_the_rate(http_server, rate_limiter):
+    rate_limiter.penalize(http_server, "http_429")
+    throttled_rate = rate_limiter.rate(http_server)
+
+    assert fetch_html(create_session(), f"{http_server}/no-phone") is not None
+    assert rate_limiter.rate(http_server) > throttled_rate
@@ -0,0 +1,31 @@
+"""
+Tests of run metrics and their merging across crawl worker processes.
+"""
+
+from src.metrics import Metrics
+
+def test_drained_worker_metrics_merge_into_the_parent():
+    parent, worker = Metrics(), Metrics()
+    parent.observe("page_load", 2.0)
+    parent.incr("shards_done")
+    worker.observe("page_load", 3.0, ok=False)
+    worker.observe("scroll_loop", 1.5)
+    worker.incr("shards_done")
+    worker.incr("driver_restarts", 2)
+    worker.set_max("peak_browser_mb", 900, shard="cloth|BD|all|all")
+
+    parent.merge(worker.drain())
+
+    assert parent.timers["page_load"] == {"count": 2, "errors": 1, "total_s": 5.0, "max_s": 3.0}
+    assert parent.timers["scroll_loop"]["count"] == 1
+    assert parent.counters == {"shards_done": 2, "driver_restarts": 2}
+    assert parent.summary()["gauges"] == [
+        {"name": "peak_browser_mb", "labels": {"shard": "cloth|BD|all|all"}, "value": 900}]
+
+def test_drain_clears_the_worker():
+    worker = Metrics()
+    worker.incr("shards_done")
+
+    worker.drain()
+
+    assert worker.drain() == {"timers": {}, "counters": {}, "gauges": {}}
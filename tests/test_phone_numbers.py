@@ -0,0 +1,58 @@
+"""
+Tests of phone number normalization and extraction.
+"""
+
+import pytest
+
+from src.phone_numbers import find_phone_numbers, normalize_phone
+
+@pytest.mark.parametrize("raw", [
+    "01712345678",
+    "01712-345678",
+    "+880 1712 345678",
+    "+880 01712345678",
+    "008801712345678",
+    "8801712345678",
+    "1712345678",
+    "tel:01712345678",
+    "tel:%2B8801712345678",
+    "০১৭১২-৩৪৫৬৭৮",
+    "01712345678 ext. 12",
+])
+def test_normalize_bangladeshi_mobile(raw):
+    assert normalize_phone(raw) == "+8801712345678"
+
+def test_normalize_bangladeshi_landline():
+    assert normalize_phone("02-9876543") == "+88029876543"
+
+def test_normalize_other_country():
+    assert normalize_phone("+44 20 7946 0958") == "+442079460958"
+
+def test_normalize_with_country_code():
+    assert normalize_phone("020 7946 0958", country_code="44") == "+442079460958"
+
+@pytest.mark.parametrize("raw", [None, "", "12345", "01234", "+1 234", "2024-05-17"])
+def test_normalize_rejects_invalid_numbers(raw):
+    assert normalize_phone(raw) is None
+
+def test_find_tel_link_first():
+    html = ('<html><body><p>Call 01812345678</p>'
+            '<a href="tel:+8801712345678">Call now</a></body></html>')
+
+    matches = find_phone_numbers(html)
+
+    assert [(match.number, match.source) for match in matches] == [("+8801712345678", "tel")]
+
+def test_find_json_ld_telephone():
+    html = ('<html><head><script type="application/ld+json">'
+            '{"@type": "LocalBusiness", "telephone": "+880 1712-345678"}</script></head><body></body></html>')
+
+    assert [match.number for match in find_phone_numbers(html)] == ["+8801712345678"]
+
+def test_find_distinct_numbers_in_text():
+    html = "<html><body><p>Hotline: 01712-345678, 01812 345678 or 01712345678</p></body></html>"
+
+    assert [match.number for match in find_phone_numbers(html)] == ["+8801712345678", "+8801812345678"]
+
+def test_find_nothing_on_page_without_number():
+    assert find_phone_numbers("<html><body><p>Open 10-8, since 2015</p></body></html>") == []
@@ -0,0 +1,100 @@
+"""
+Tests of href filtering and deduplication in the scraper.
+"""
+
+from src.scraper_utils import process_href, process_hrefs
+
+def test_host_variants_and_shims_dedupe_to_one_page():
+    pairs = set()
+    hrefs = [
+        "https://www.facebook.com/ShopBD/",
+        "https://fb.com/ShopBD",
+        "https://www.fb.com/ShopBD?ref=page",
+        "https://m.facebook.com/ShopBD/?fbclid=abc",
+        "https://l.facebook.com/l.php?u=https%3A%2F%2Fwww.fb.com%2FShopBD&h=AT0",
+        None,
+    ]
+
+    distinct, added = process_hrefs(hrefs, "cloth", pairs)
+
+    assert distinct == len(hrefs)
+    assert added == 1
+    assert pairs == {("cloth", "https://www.facebook.com/ShopBD")}
+
+def test_non_facebook_links_are_dropped():
+    pairs = set()
+    hrefs = [
+        "https://l.facebook.com/l.php?u=https%3A%2F%2Fshop.example.com%2F",
+        "https://www.facebook.com.example.net/ShopBD",
+        "https://example.com/?ref=facebook.com",
+        "/ads/library/?id=1",
+    ]
+
+    process_hrefs(hrefs, "cloth", pairs)
+    for href in hrefs:
+        process_href(href, "cloth", pairs)
+
+    assert pairs == set()
+
+def test_single_fb_com_href_is_kept():
+    pairs = set()
+
+    process_href("https://fb.com/profile.php?id=100012345678", "cloth", pairs)
+
+    assert pairs == {("cloth", "https://www.facebook.com/profile.php?id=100012345678")}
+
+class FeedDriver:
+    """WebDriver stand-in for a feed that loads one card per scroll, reset by every page load."""
+
+    current_url = "https://www.facebook.com/ads/library/?q=cloth"
+
+    def __init__(self):
+        self.loaded = 0
+        self.scrolls = 0
+
+    def get(self, url):
+        self.loaded = 0
+
+    def execute_script(self, script, *args):
+        return [self.loaded, self.loaded * 400]
+
+    def execute_async_script(self, script, *args):
+        self.scrolls += 1
+        self.loaded += 1
+        return {"cards": self.loaded, "height": self.loaded * 400}
+
+class FakeMemoryGuard:
+    """Reports the limit crossed once each tab reaches the next of `limits` cards."""
+
+    def __init__(self, limits, max_recycles=3):
+        self.limits = list(limits)
+        self.max_recycles = max_recycles
+        self.recycles = 0
+
+    def over_limit(self, driver):
+        return bool(self.limits) and driver.loaded >= self.limits[0]
+
+    def can_recycle(self):
+        return self.recycles < self.max_recycles
+
+def test_recycled_tab_skips_ahead_within_one_scroll_budget(monkeypatch):
+    import src.browser
+    from src.scraper_utils import scroll_with_recycling
+
+    driver = FeedDriver()
+    guard = FakeMemoryGuard([10, 25])
+
+    def recycle_tab(driver, url=None):
+        guard.limits.pop(0)
+        driver.get(url)
+
+    monkeypatch.setattr(src.browser, "recycle_tab", recycle_tab)
+    harvested_at = []
+
+    scroll_with_recycling(driver, "cloth", 30, lambda driver: harvested_at.append(driver.loaded), guard)
+
+    assert guard.recycles == 2
+    assert driver.loaded == 30
+    # Tabs stopped at 10 and 25 scrolls and skipped back there without harvesting
+    assert driver.scrolls == 10 + 25 + 30
+    assert harvested_at == [5, 10, 15, 20, 25, 30, 30]
@@ -0,0 +1,51 @@
+"""
+Tests of URL canonicalization.
+"""
+
+import pytest
+
+from src.url_utils import canonicalize_url
+
+@pytest.mark.parametrize("href", [
+    "https://www.facebook.com/ShopBD",
+    "https://www.facebook.com/ShopBD/",
+    "http://facebook.com/ShopBD",
+    "https://M.Facebook.com/ShopBD/?ref=bookmarks",
+    "https://web.facebook.com/ShopBD?fbclid=abc#about",
+    "https://fb.com/ShopBD/posts/123",
+    " https://mbasic.facebook.com/ShopBD/about/?__tn__=%2CO ",
+    "https://l.facebook.com/l.php?u=https%3A%2F%2Fm.facebook.com%2FShopBD%2F%3Ffbclid%3Dabc&h=AT0",
+])
+def test_facebook_page_variants_share_one_key(href):
+    assert canonicalize_url(href) == "https://www.facebook.com/ShopBD"
+
+def test_profile_php_keeps_its_id():
+    assert (canonicalize_url("https://m.facebook.com/profile.php?id=100012345678&fbclid=x&ref=page")
+            == "https://www.facebook.com/profile.php?id=100012345678")
+
+def test_profile_php_without_id_has_no_key():
+    assert canonicalize_url("https://www.facebook.com/profile.php") is None
+
+@pytest.mark.parametrize("href", [
+    "https://www.facebook.com/pages/Shop-BD/1234567890",
+    "https://m.facebook.com/pages/Shop-BD/1234567890/about/",
+    "https://www.facebook.com/pages/category/Clothing/Shop-BD-1234567890/",
+])
+def test_pages_path_maps_to_page_id(href):
+    assert canonicalize_url(href) == "https://www.facebook.com/1234567890"
+
+def test_people_path_maps_to_page_id():
+    assert canonicalize_url("https://www.facebook.com/people/Shop-BD/100012345678/") == \
+        "https://www.facebook.com/100012345678"
+
+def test_pages_path_without_id_keeps_the_path():
+    assert canonicalize_url("https://www.facebook.com/pages/Shop-BD/") == \
+        "https://www.facebook.com/pages/Shop-BD"
+
+def test_external_url_drops_tracking_state():
+    assert canonicalize_url("https://Example.com/shop/?utm_source=fb&page=2&fbclid=abc#top") == \
+        "https://example.com/shop?page=2"
+
+@pytest.mark.parametrize("href", [None, "", "mailto:shop@example.com", "javascript:void(0)", "/ShopBD"])
+def test_non_http_hrefs_have_no_key(href):
+    assert canonicalize_url(href) is None